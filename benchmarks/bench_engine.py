@@ -0,0 +1,59 @@
+""" Wall-clock time of a complete get-data run over several synthetic news sites, collected one homepage
+after the other (the default), with --workers homepages side by side, and with the asyncio engine.
+Every site is served by the same local server under its own hostname, with --latency seconds per response.
+
+    python benchmarks/bench_engine.py --sites 8 --articles 50 --latency 0.05
+"""
+import multiprocessing, os, sys, tempfile, time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import click
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from benchmarks.site import SyntheticNewsSite
+
+
+def site_urls(sites):
+    return [f"http://www.testzeitung-{number}.de/" for number in range(1, sites + 1)]
+
+
+def measure_run(proxy_url, sites, engine, workers, concurrency):
+    """ Runs in a fresh process, with the homepage config swapped for the synthetic sites. """
+    os.environ["TQDM_DISABLE"] = "1"
+    from loguru import logger as log
+    log.remove()
+    log.add(sys.stderr, level="CRITICAL")
+    from newsfeedback import main
+    from newsfeedback.sessions import get_session
+
+    get_session().proxies = {'http': proxy_url}
+    homepage_config = {homepage_url: {'pipeline': 'beautifulsoup', 'filter': 'on'} for homepage_url in site_urls(sites)}
+    retrieve_config = main.retrieve_config
+    main.retrieve_config = lambda type_config, *args: homepage_config if type_config == 'homepage' else retrieve_config(type_config, *args)
+    with tempfile.TemporaryDirectory() as output_folder:
+        started = time.perf_counter()
+        results = main.initiate_data_collection(output_folder, workers=workers, engine=engine, concurrency=concurrency)
+        seconds = time.perf_counter() - started
+    return seconds, sum(result['status'] == 'ok' for result in results)
+
+
+@click.command()
+@click.option('-s', '--sites', default=8, show_default=True, help="How many news sites the run collects.")
+@click.option('-n', '--articles', default=50, show_default=True, help="Articles on every site.")
+@click.option('--latency', default=0.05, show_default=True, help="Seconds the sites wait before every response.")
+@click.option('-w', '--workers', default=4, show_default=True, help="Homepages side by side for the threads engine.")
+@click.option('-c', '--concurrency', default=16, show_default=True, help="Downloads at the same time for the asyncio engine.")
+def main(sites, articles, latency, workers, concurrency):
+    context = multiprocessing.get_context("spawn")
+    runs = [("threads, one homepage at a time", 'threads', 1), (f"threads, {workers} homepages", 'threads', workers),
+            (f"asyncio, {concurrency} downloads", 'asyncio', 1)]
+    with SyntheticNewsSite(articles, latency) as site:
+        for label, engine, engine_workers in runs:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                seconds, collected = executor.submit(measure_run, site.proxy_url, sites, engine, engine_workers, concurrency).result()
+            click.echo(f"{label:>34}: {seconds:7.2f}s for {collected} of {sites} sites, "
+                       f"{sites * articles / seconds:7.1f} articles/s")
+
+
+if __name__ == "__main__":
+    main()
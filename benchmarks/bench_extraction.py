@@ -0,0 +1,49 @@
+""" Articles per second of newsfeedback's metadata extraction for different numbers of worker processes.
+
+    python benchmarks/bench_extraction.py --articles 400 -w 1 -w 2 -w 4
+"""
+import os, sys, time
+from pathlib import Path
+import click
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from benchmarks.corpus import article_corpus
+from newsfeedback.extraction import ExtractionPool
+
+
+def run(corpus, workers):
+    pool = ExtractionPool()
+    pool.configure(workers)
+    try:
+        # warm-up, so that starting the processes is not counted
+        list(pool.extract(enumerate(corpus[:workers]), include_links=True))
+        started = time.perf_counter()
+        extracted = list(pool.extract(enumerate(corpus), include_links=True))
+        seconds = time.perf_counter() - started
+    finally:
+        pool.shutdown()
+    failed = sum(1 for _, metadata in extracted if metadata is None)
+    return seconds, failed
+
+
+@click.command()
+@click.option('-n', '--articles', default=200, show_default=True, help="Size of the HTML corpus.")
+@click.option('-w', '--workers', multiple=True, type=int,
+              help="Worker counts to compare. Defaults to 1, 2, 4, ... up to the number of cores.")
+def main(articles, workers):
+    corpus = article_corpus(articles)
+    cores = os.cpu_count() or 1
+    if not workers:
+        workers = sorted({1, cores} | {2 ** power for power in range(1, 8) if 2 ** power < cores})
+    click.echo(f"{articles} articles ({sum(map(len, corpus)) / 1e6:.1f} MB of HTML), {cores} cores")
+    click.echo(f"{'workers':>8} {'seconds':>9} {'articles/s':>11} {'speed-up':>9}")
+    baseline = None
+    for count in workers:
+        seconds, failed = run(corpus, count)
+        rate = articles / seconds
+        baseline = baseline or rate
+        click.echo(f"{count:>8} {seconds:>9.2f} {rate:>11.1f} {rate / baseline:>8.2f}x" + (f"  ({failed} failed)" if failed else ""))
+
+
+if __name__ == "__main__":
+    main()
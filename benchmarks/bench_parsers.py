@@ -0,0 +1,64 @@
+""" Time and memory of the HTML parser backends that collect a homepage's links, over a folder of
+stored homepages or synthetic ones. Every backend runs in a fresh process, so that its peak
+memory (including lxml's, which Python's own allocation tracking does not see) can be compared.
+
+    python benchmarks/bench_parsers.py --homepages 10 --links 10000
+    python benchmarks/bench_parsers.py --folder saved-homepages/
+"""
+import multiprocessing, resource, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import click
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from benchmarks.corpus import homepage_html
+from newsfeedback.parsers import BACKENDS, available_parsers
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_pages(folder, homepages, links):
+    if folder:
+        return [path.read_text(encoding="utf-8", errors="replace") for path in sorted(Path(folder).glob("*.html"))]
+    return [homepage_html(links + number) for number in range(homepages)]
+
+
+def measure(parser, folder, homepages, links, repeat):
+    # the pages are loaded and the backend warmed up in this process, before the baseline is taken
+    pages = load_pages(folder, homepages, links)
+    backend = BACKENDS[parser]
+    backend('<a href="/">warm-up</a>')
+    before = peak_rss_mb()
+    best, hrefs = None, 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        hrefs = sum(len(backend(html)) for html in pages)
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+    return best, hrefs, peak_rss_mb() - before
+
+
+@click.command()
+@click.option('--folder', type=click.Path(exists=True, file_okay=False), help="Stored homepages (*.html) to parse.")
+@click.option('-n', '--homepages', default=5, show_default=True, help="How many synthetic homepages, without --folder.")
+@click.option('-l', '--links', default=10000, show_default=True, help="Links per synthetic homepage.")
+@click.option('-r', '--repeat', default=3, show_default=True, help="Best of this many runs.")
+def main(folder, homepages, links, repeat):
+    pages = load_pages(folder, homepages, links)
+    megabytes = sum(len(html.encode("utf-8")) for html in pages) / 1e6
+    click.echo(f"{len(pages)} homepages, {megabytes:.1f} MB")
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for parser in available_parsers():
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results[parser] = executor.submit(measure, parser, folder, homepages, links, repeat).result()
+    slowest = max(seconds for seconds, _, _ in results.values())
+    for parser, (seconds, hrefs, memory) in results.items():
+        click.echo(f"{parser:>12}: {seconds * 1000 / len(pages):8.1f} ms per homepage, {slowest / seconds:5.1f}x, "
+                   f"peak memory +{memory:6.1f} MB, {hrefs} hrefs")
+
+
+if __name__ == "__main__":
+    main()
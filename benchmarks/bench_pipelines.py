@@ -0,0 +1,182 @@
+""" End-to-end benchmark of the trafilatura and beautifulsoup pipelines against a synthetic news site on a
+local server. Every pipeline runs in a fresh process, which reports the latency percentiles of URL discovery,
+filter_urls, fetching, bare_extraction and export_dataframe, the articles per second of the complete chained
+pipeline, and its peak RSS. Results are saved as JSON, and --compare sets them against an earlier file.
+
+    python benchmarks/bench_pipelines.py --articles 200 --runs 3
+    python benchmarks/bench_pipelines.py --latency 0.05 --compare benchmarks/results/pipelines-20250101-1200.json
+"""
+import json, multiprocessing, os, platform, resource, subprocess, sys, tempfile, time
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
+from pathlib import Path
+import click
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from benchmarks.site import SyntheticNewsSite
+
+PIPELINES = ('trafilatura', 'beautifulsoup')
+STAGES = ('discovery', 'filter', 'fetch', 'extraction', 'export')
+RESULTS_FOLDER = Path(__file__).resolve().parent/"results"
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024 # bytes on macOS, KB elsewhere
+
+
+def summary(seconds):
+    if len(seconds) == 0:
+        return {'count': 0}
+    milliseconds = np.array(seconds) * 1000
+    return {'count': len(seconds), 'mean_ms': round(float(milliseconds.mean()), 3),
+            **{f"p{q}_ms": round(float(np.percentile(milliseconds, q)), 3) for q in (50, 90, 99)},
+            'total_s': round(float(milliseconds.sum()) / 1000, 3)}
+
+
+def timed(timings, function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    timings.append(time.perf_counter() - started)
+    return result
+
+
+def timed_iteration(timings, iterator):
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        timings.append(time.perf_counter() - started)
+        yield item
+
+
+def measure_pipeline(pipeline, proxy_url, homepage_url, runs, workers, extract_workers):
+    """ Runs in a fresh process: first the stages one after another, with every call timed on its own,
+    then the complete chained pipeline with its usual concurrency. """
+    os.environ["TQDM_DISABLE"] = "1"
+    from loguru import logger as log
+    log.remove()
+    log.add(sys.stderr, level="CRITICAL")
+    from newsfeedback import main
+    from newsfeedback.drivers import driver_pool
+    from newsfeedback.extraction import extract_metadata, extraction_pool
+    from newsfeedback.sessions import get_session
+
+    get_session().proxies = {'http': proxy_url}
+    extraction_pool.configure(extract_workers)
+    metadata_wanted = main.metadata_columns()
+    timings = {stage: [] for stage in STAGES}
+    articles, seconds = 0, 0.0
+    with tempfile.TemporaryDirectory() as output_folder:
+        for _ in range(runs):
+            if pipeline == 'trafilatura':
+                urls = timed(timings['discovery'], main.get_article_urls_trafilatura_pipeline, homepage_url)
+                filtered = timed(timings['filter'], main.filter_urls, urls, 'on')
+                downloads = [timed(timings['fetch'], main.download, url) for url in filtered]
+                options = {'include_links': True}
+            else:
+                urls = timed(timings['discovery'], main.get_article_urls_bs_pipeline, homepage_url)
+                filtered = timed(timings['filter'], main.filter_urls, urls, 'on')
+                with driver_pool.lazy_driver() as browser:
+                    downloads = [downloaded for _, downloaded in
+                                 timed_iteration(timings['fetch'], main.download_articles_bs(filtered, browser))]
+                options = {'include_links': False, 'include_comments': True}
+            extracted = [timed(timings['extraction'], extract_metadata, downloaded, fields=metadata_wanted, **options)
+                         for downloaded in downloads if downloaded]
+            df = main.metadata_dataframe([metadata for metadata in extracted if metadata is not None], metadata_wanted)
+            timed(timings['export'], main.export_dataframe, df, homepage_url, output_folder)
+
+            started = time.perf_counter()
+            if pipeline == 'trafilatura':
+                df_path = main.chained_trafilatura_pipeline(homepage_url, 'on', output_folder, workers)
+            else:
+                df_path = main.chained_beautifulsoup_pipeline(homepage_url, 'on', output_folder)
+            seconds += time.perf_counter() - started
+            articles += pd.read_csv(df_path).shape[0]
+    extraction_pool.shutdown()
+    driver_pool.shutdown()
+    return {'stages': {stage: summary(values) for stage, values in timings.items()},
+            'articles': articles, 'seconds': round(seconds, 3),
+            'articles_per_second': round(articles / seconds, 2) if seconds else None,
+            'peak_rss_mb': round(peak_rss_mb(), 1)}
+
+
+def newsfeedback_version():
+    try:
+        return metadata.version("newsfeedback")
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    for pipeline, result in results['pipelines'].items():
+        click.echo(f"{pipeline}: {result['articles_per_second']} articles/s end to end, peak RSS {result['peak_rss_mb']} MB")
+        for stage, stats in result['stages'].items():
+            if stats['count']:
+                click.echo(f"  {stage:>10}: p50 {stats['p50_ms']:9.2f} ms  p90 {stats['p90_ms']:9.2f} ms  "
+                           f"p99 {stats['p99_ms']:9.2f} ms  ({stats['count']} calls)")
+
+
+def print_comparison(before, after):
+    click.echo(f"Compared to {before.get('commit') or 'an unknown commit'} of {before.get('started')}:")
+    for pipeline, result in after['pipelines'].items():
+        old = before.get('pipelines', {}).get(pipeline)
+        if old is None:
+            continue
+        if old.get('articles_per_second') and result['articles_per_second']:
+            change = result['articles_per_second'] / old['articles_per_second'] - 1
+            click.echo(f"{pipeline}: {old['articles_per_second']} -> {result['articles_per_second']} articles/s ({change:+.0%})")
+        for stage, stats in result['stages'].items():
+            old_stats = old['stages'].get(stage, {})
+            if stats.get('p50_ms') and old_stats.get('p50_ms'):
+                change = stats['p50_ms'] / old_stats['p50_ms'] - 1
+                click.echo(f"  {stage:>10}: p50 {old_stats['p50_ms']:.2f} -> {stats['p50_ms']:.2f} ms ({change:+.0%})")
+
+
+@click.command()
+@click.option('-n', '--articles', default=100, show_default=True, help="Articles on the synthetic site.")
+@click.option('-r', '--runs', default=3, show_default=True, help="How often every pipeline collects the site.")
+@click.option('--latency', default=0.0, show_default=True, help="Seconds the site waits before every response.")
+@click.option('-w', '--workers', default=8, show_default=True, help="Download threads of the chained trafilatura pipeline.")
+@click.option('--extract-workers', default=1, show_default=True, help="Extraction processes of the chained pipelines.")
+@click.option('-p', '--pipeline', 'pipelines', multiple=True, type=click.Choice(PIPELINES), help="Defaults to both.")
+@click.option('--output', 'output_file', type=click.Path(dir_okay=False), default=None,
+              help="Where to save the results (default: benchmarks/results/pipelines-<time>.json).")
+@click.option('--compare', 'compare_file', type=click.Path(exists=True, dir_okay=False), default=None,
+              help="Results of an earlier run to compare with.")
+def main(articles, runs, latency, workers, extract_workers, pipelines, output_file, compare_file):
+    results = {'benchmark': 'pipelines', 'newsfeedback': newsfeedback_version(), 'commit': git_commit(),
+               'python': platform.python_version(), 'platform': platform.platform(),
+               'started': time.strftime(r"%Y-%m-%dT%H:%M:%S"),
+               'settings': {'articles': articles, 'runs': runs, 'latency': latency, 'workers': workers,
+                            'extract_workers': extract_workers},
+               'pipelines': {}}
+    context = multiprocessing.get_context("spawn")
+    with SyntheticNewsSite(articles, latency) as site:
+        for pipeline in pipelines or PIPELINES:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                results['pipelines'][pipeline] = executor.submit(measure_pipeline, pipeline, site.proxy_url, site.homepage_url,
+                                                                 runs, workers, extract_workers).result()
+    output_file = Path(output_file) if output_file else RESULTS_FOLDER/f"pipelines-{time.strftime(r'%Y%m%d-%H%M%S')}.json"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    output_file.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print_results(results)
+    click.echo(f"Saved to {output_file}.")
+    if compare_file:
+        print_comparison(json.loads(Path(compare_file).read_text(encoding="utf-8")), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+""" Time spent turning the hrefs of a large homepage into article URLs, compared to the former
+per-anchor regexes, which are kept here for the comparison.
+
+    python benchmarks/bench_urls.py --links 2000
+    python benchmarks/bench_urls.py --html saved-homepage.html --homepage https://www.faz.net/
+"""
+import re, sys, time
+from pathlib import Path
+import click
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from benchmarks.corpus import homepage_html
+from newsfeedback.urls import LinkNormalizer
+
+
+def former_links(homepage_url, hrefs):
+    article_url_list = []
+    for href in hrefs:
+        http_check = re.search(r'(http)', f'{href}')
+        if href != None:
+            if http_check == None:
+                http_url = f"{homepage_url}" + f"{href}"
+                double_slash_check = re.search(r"(?<!https:)(//)", http_url)
+                if double_slash_check:
+                    http_url = re.sub(r"(?<!https:)(//)", r"/", http_url)
+                double_de_check = re.search(r"/de/de/", http_url)
+                if double_de_check:
+                    http_url = re.sub(r"/de/de/", r"/de/", http_url)
+                double_url_check = re.search(r"(\/{2}www\..*?){2}", http_url)
+                if double_url_check:
+                    http_url = re.sub(r"\/{2}.*?\/{2}", "//", http_url)
+                article_url_list.append(http_url)
+            else:
+                homepage_de = re.search(r'(https://www\..+?\.\w{2,3}/de/)', homepage_url)
+                if homepage_de:
+                    homepage_split = homepage_de.group(0)
+                else:
+                    homepage_split = re.search(r'(https://www\..+?\.\w{2,3})', homepage_url).group(0)
+                homepage_check = re.search(fr'{homepage_split}/.+', href)
+                if homepage_check:
+                    article_url_list.append(href)
+    return list(dict.fromkeys(article_url_list))
+
+
+def timed(function, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+@click.command()
+@click.option('-n', '--links', default=1000, show_default=True, help="Links on the synthetic homepage.")
+@click.option('--html', 'html_file', type=click.Path(exists=True, dir_okay=False), help="A saved homepage to use instead.")
+@click.option('--homepage', 'homepage_url', default="https://www.testzeitung.de/", show_default=True,
+              help="The URL the saved homepage was downloaded from.")
+@click.option('-r', '--repeat', default=20, show_default=True, help="Best of this many runs.")
+def main(links, html_file, homepage_url, repeat):
+    html = Path(html_file).read_text(encoding="utf-8") if html_file else homepage_html(links)
+    hrefs = [a.get('href') for a in BeautifulSoup(html, 'html.parser').find_all('a', href=True)]
+    former_seconds, former = timed(lambda: former_links(homepage_url, hrefs), repeat)
+    # a fresh normalizer per run, so that working out the homepage prefix is counted
+    seconds, normalized = timed(lambda: LinkNormalizer(homepage_url).links(hrefs), repeat)
+    click.echo(f"{len(hrefs)} hrefs")
+    click.echo(f"  per-anchor regexes: {former_seconds * 1e6 / len(hrefs):6.2f} µs per href, {len(former)} links")
+    click.echo(f"  link normalizer:    {seconds * 1e6 / len(hrefs):6.2f} µs per href, {len(normalized)} links")
+    click.echo(f"  speed-up: {former_seconds / seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+""" Deterministic synthetic news articles for newsfeedback's benchmarks.
+"""
+import random
+
+WORDS = ("Regierung Bundestag Gesetz Wirtschaft Klima Energie Schule Stadt Polizei Gericht Wahl Partei "
+         "Kommission Haushalt Verkehr Bahn Gesundheit Forschung Kultur Fußball Verein Europa Grenze "
+         "Unternehmen Arbeit Preise Mieten Bürger Minister Kanzlerin Opposition Bericht Studie").split()
+
+ARTICLE_HTML = """<!DOCTYPE html>
+<html lang="de">
+<head>
+<meta charset="utf-8">
+<title>{title} - Testzeitung</title>
+<meta property="og:title" content="{title}">
+<meta name="description" content="{description}">
+<meta name="author" content="{author}">
+<meta property="article:published_time" content="2025-{month:02d}-{day:02d}T{hour:02d}:00:00+01:00">
+<link rel="canonical" href="{url}">
+<script>window.dataLayer = [{{"page": "{number}"}}];</script>
+</head>
+<body>
+<header><nav>{navigation}</nav></header>
+<main>
+<article>
+<h1>{title}</h1>
+<p class="byline">Von {author}</p>
+{paragraphs}
+</article>
+<aside>{related}</aside>
+</main>
+<footer><p>Impressum · Datenschutz · Kontakt</p></footer>
+</body>
+</html>"""
+
+
+def sentence(rng, length):
+    words = [rng.choice(WORDS) for _ in range(length)]
+    return " ".join(words).capitalize() + "."
+
+
+def article_html(number, base_url="https://www.testzeitung.de", section="politik", paragraphs=12):
+    """ The same article for the same number, so that runs stay comparable. """
+    rng = random.Random(number)
+    url = f"{base_url}/{section}/artikel-{number}"
+    title = sentence(rng, 6)[:-1]
+    body = "\n".join(f"<p>{' '.join(sentence(rng, rng.randint(8, 20)) for _ in range(rng.randint(3, 7)))}</p>"
+                     for _ in range(paragraphs))
+    navigation = " ".join(f'<a href="{base_url}/{name}/">{name}</a>' for name in ("politik", "wirtschaft", "kultur", "sport"))
+    related = " ".join(f'<a href="{base_url}/{section}/artikel-{rng.randint(1, 10000)}">{sentence(rng, 4)}</a>'
+                       for _ in range(5))
+    return ARTICLE_HTML.format(number=number, url=url, title=title, description=sentence(rng, 15),
+                               author=f"{rng.choice(WORDS)} {rng.choice(WORDS)}", month=rng.randint(1, 12),
+                               day=rng.randint(1, 28), hour=rng.randint(0, 23), navigation=navigation,
+                               paragraphs=body, related=related)
+
+
+def article_corpus(count, **kwargs):
+    return [article_html(number, **kwargs) for number in range(1, count + 1)]
+
+
+def homepage_html(links=800, base_url="https://www.testzeitung.de", sections=("politik", "wirtschaft", "kultur", "sport")):
+    """ A large homepage whose links come in the forms seen on news sites: relative, absolute,
+    protocol-relative, duplicated, with tracking parameters and fragments, and to other sites. """
+    rng = random.Random(links)
+    host = base_url.split("//", 1)[1]
+    forms = (lambda path: path, lambda path: base_url + path, lambda path: f"//{host}{path}",
+             lambda path: f"{path}?utm_source=homepage&utm_medium=teaser", lambda path: f"{path}#kommentare",
+             lambda path: f"https://www.andere-zeitung.de{path}")
+    anchors = []
+    for number in range(links):
+        path = f"/{rng.choice(sections)}/artikel-{rng.randint(1, links // 2)}.html"
+        anchors.append(f'<a href="{rng.choice(forms)(path)}">{sentence(rng, 5)}</a>')
+    navigation = " ".join(f'<a href="/{name}/">{name}</a>' for name in sections)
+    return (f'<!DOCTYPE html><html lang="de"><head><title>Testzeitung</title></head><body>'
+            f'<header><a href="/">Testzeitung</a><nav>{navigation}</nav></header><main>'
+            + "\n".join(f"<article>{anchor}</article>" for anchor in anchors) +
+            '</main><footer><a href="#top">Nach oben</a> <a href="mailto:leser@testzeitung.de">Kontakt</a></footer></body></html>')
@@ -0,0 +1,104 @@
+""" A synthetic news site on a local HTTP server, for benchmarking newsfeedback's pipelines without going online.
+"""
+import http.server, threading, time
+from urllib.parse import urlsplit
+from benchmarks.corpus import article_html
+
+SITE_URL = "http://www.testzeitung.de"
+SECTIONS = ("politik", "wirtschaft", "kultur", "sport")
+
+FEED_XML = """<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0"><channel><title>Testzeitung</title><link>{site_url}/</link>
+{items}
+</channel></rss>"""
+
+HOMEPAGE_HTML = """<!DOCTYPE html>
+<html lang="de"><head><meta charset="utf-8"><title>Testzeitung</title>
+<link rel="alternate" type="application/rss+xml" href="{site_url}/feed.xml"></head>
+<body><header><a href="/">Testzeitung</a><nav>{navigation}</nav></header>
+<main>{teasers}</main>
+<footer><a href="/impressum">Impressum</a> <a href="mailto:leser@testzeitung.de">Kontakt</a></footer></body></html>"""
+
+
+class SyntheticNewsSite(object):
+    """ Serves a homepage linking to every article, an RSS feed of them and the articles themselves, under
+    SITE_URL. The server also answers proxy-style requests for absolute URLs, so that the benchmarks reach it
+    through the requests session's proxy setting and every URL looks like a real news site's. latency
+    delays every response by that many seconds, to approximate a remote site. """
+
+    def __init__(self, articles=200, latency=0.0, site_url=SITE_URL):
+        self.articles = articles
+        self.latency = latency
+        self.site_url = site_url
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.proxy_url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+        return False
+
+    @property
+    def homepage_url(self):
+        return f"{self.site_url}/"
+
+    def article_path(self, number):
+        return f"/{SECTIONS[number % len(SECTIONS)]}/artikel-{number}.html"
+
+    def article_urls(self):
+        return [self.site_url + self.article_path(number) for number in range(1, self.articles + 1)]
+
+    def homepage(self):
+        navigation = " ".join(f'<a href="/{section}/">{section}</a>' for section in SECTIONS)
+        teasers = "\n".join(f'<article><a href="{self.article_path(number)}">Artikel {number}</a></article>'
+                            for number in range(1, self.articles + 1))
+        return HOMEPAGE_HTML.format(site_url=self.site_url, navigation=navigation, teasers=teasers)
+
+    def feed(self):
+        items = "\n".join(f"<item><title>Artikel {number}</title><link>{self.site_url}{self.article_path(number)}</link></item>"
+                          for number in range(1, self.articles + 1))
+        return FEED_XML.format(site_url=self.site_url, items=items)
+
+    def response_for(self, path):
+        if path == "/":
+            return 200, "text/html; charset=utf-8", self.homepage()
+        if path == "/feed.xml":
+            return 200, "application/rss+xml; charset=utf-8", self.feed()
+        section, _, name = path.strip("/").partition("/")
+        number = name[len("artikel-"):-len(".html")] if name.startswith("artikel-") and name.endswith(".html") else ""
+        if section in SECTIONS and number.isdigit() and 1 <= int(number) <= self.articles:
+            return 200, "text/html; charset=utf-8", article_html(int(number), self.site_url, section)
+        return 404, "text/plain", "not found"
+
+    def _handler(self):
+        site = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True # otherwise delayed ACKs add 40 ms to every keep-alive response
+
+            def do_GET(self):
+                with site._lock:
+                    site.requests += 1
+                if site.latency:
+                    time.sleep(site.latency)
+                status, content_type, text = site.response_for(urlsplit(self.path).path or "/")
+                body = text.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
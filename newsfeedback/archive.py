@@ -0,0 +1,177 @@
+""" Hostname/day-partitioned Parquet archive of collected metadata, and its compaction.
+"""
+import ast, re, time, uuid
+from pathlib import Path
+import pandas as pd
+from loguru import logger as log
+from newsfeedback.politeness import hostname_of
+from newsfeedback.sinks import ParquetSink, LIST_COLUMNS
+
+ARCHIVE_FOLDER_NAME = "archive"
+SNAPSHOT_NAME = re.compile(r"^(\d{8})-\d{4}-")
+DEDUP_COLUMNS = ('url', 'fingerprint')
+PARTITION_KEYS = ('hostname', 'day') # not 'date', which is the articles' own publication date
+IMPORTED_SNAPSHOTS_NAME = "_imported_snapshots.txt" # leading _, so that Parquet readers of the archive skip it
+
+
+def archive_folder_of(output_folder):
+    return Path(output_folder)/ARCHIVE_FOLDER_NAME
+
+
+def partition_folder(archive_folder, hostname, day):
+    return Path(archive_folder)/f"hostname={hostname}"/f"day={day}"
+
+
+def archive_path(homepage_url, output_folder):
+    """ Where a run's metadata of homepage_url goes in the archive, without the file suffix. """
+    folder = partition_folder(archive_folder_of(output_folder), hostname_of(homepage_url), time.strftime(r"%Y-%m-%d"))
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder/f"{time.strftime(r'%Y%m%d-%H%M')}-{uuid.uuid4().hex[:8]}"
+
+
+def partition_value(folder):
+    return folder.name.split("=", 1)[1]
+
+
+def archive_partitions(archive_folder, hostname=None, start=None, end=None):
+    """ (hostname, day, folder) of every partition, optionally only those of one hostname and
+    of days (YYYY-MM-DD) between start and end, both included. """
+    for host_folder in sorted(Path(archive_folder).glob("hostname=*")):
+        if hostname is not None and partition_value(host_folder) != hostname:
+            continue
+        for day_folder in sorted(host_folder.glob("day=*")):
+            day = partition_value(day_folder)
+            if (start is None or day >= start) and (end is None or day <= end):
+                yield partition_value(host_folder), day, day_folder
+
+
+def read_partition(hostname, day, folder, columns=None):
+    frames = [pd.read_parquet(path, columns=columns) for path in sorted(folder.glob("*.parquet"))]
+    frames = [frame for frame in frames if frame.shape[0] != 0]
+    if len(frames) == 0:
+        return None
+    df = pd.concat(frames, ignore_index=True)
+    df['hostname'] = hostname
+    df['day'] = day
+    return df
+
+
+def load_archive(archive_folder, hostname=None, start=None, end=None, columns=None):
+    """ The archived metadata of one or all hostnames as a single dataframe, with hostname and day columns
+    next to the metadata. After compaction, a month of one outlet is one file per day. """
+    frames = [read_partition(*partition, columns=columns) for partition in archive_partitions(archive_folder, hostname, start, end)]
+    frames = [frame for frame in frames if frame is not None]
+    if len(frames) == 0:
+        return pd.DataFrame(columns=list(columns or []) + list(PARTITION_KEYS))
+    return pd.concat(frames, ignore_index=True)
+
+
+def write_partition(df, folder, name):
+    columns = [column for column in df.columns if column not in PARTITION_KEYS]
+    folder.mkdir(parents=True, exist_ok=True)
+    with ParquetSink(folder/f"{name}.parquet", columns) as sink:
+        sink.write_many(df[columns].to_dict('records'))
+    return sink.path
+
+
+def parse_list(value):
+    # CSV snapshots hold categories and tags as the repr of a list
+    if isinstance(value, str) and value.startswith("["):
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            pass
+    return value
+
+
+def snapshot_hostname(snapshot, df, homepage_urls):
+    """ The homepage whose exports are named like the snapshot's folder, else the most common article hostname. """
+    for homepage_url in homepage_urls:
+        name = re.search(r"\..+?\.", homepage_url)
+        if name and name.group(0).replace(".", "") == snapshot.parent.name:
+            return hostname_of(homepage_url)
+    if 'url' in df.columns and df['url'].notna().any():
+        return df['url'].dropna().map(hostname_of).mode()[0]
+    return snapshot.parent.name
+
+
+def imported_snapshots(archive_folder):
+    path = Path(archive_folder)/IMPORTED_SNAPSHOTS_NAME
+    if not path.exists():
+        return set()
+    return set(path.read_text(encoding="utf-8").splitlines())
+
+
+def import_snapshots(output_folder, archive_folder, homepage_urls=(), delete_snapshots=False):
+    """ Copies the CSV snapshots of output_folder into the archive, once: the snapshots already
+    imported are listed in the archive's IMPORTED_SNAPSHOTS_NAME and skipped by later runs. """
+    already_imported = imported_snapshots(archive_folder)
+    imported = 0
+    for snapshot in sorted(Path(output_folder).glob("*/*.csv")):
+        name = snapshot.relative_to(output_folder).as_posix()
+        if Path(archive_folder) in snapshot.parents or name in already_imported:
+            continue
+        df = pd.read_csv(snapshot, dtype=str)
+        for column in LIST_COLUMNS:
+            if column in df.columns:
+                df[column] = df[column].map(parse_list)
+        hostname = snapshot_hostname(snapshot, df, homepage_urls)
+        if 'datetime' in df.columns and df['datetime'].notna().all():
+            days = df['datetime'].str.slice(0, 8)
+        else:
+            match = SNAPSHOT_NAME.match(snapshot.name)
+            days = pd.Series([match.group(1) if match else time.strftime(r"%Y%m%d")] * df.shape[0], index=df.index)
+        for day, rows in df.groupby(days):
+            write_partition(rows, partition_folder(archive_folder, hostname, f"{day[:4]}-{day[4:6]}-{day[6:]}"), f"snapshot-{snapshot.stem}")
+        # only listed once all of its days are written; a snapshot imported halfway is imported again under the same names
+        with open(Path(archive_folder)/IMPORTED_SNAPSHOTS_NAME, "a", encoding="utf-8") as listed:
+            listed.write(name + "\n")
+        imported += 1
+        if delete_snapshots:
+            snapshot.unlink()
+    return imported
+
+
+def deduplicate(df):
+    """ Keeps the first collected row of every article, identified by its URL or else its fingerprint. """
+    key = pd.Series(index=df.index, dtype=object)
+    for column in DEDUP_COLUMNS:
+        if column in df.columns:
+            key = key.fillna(df[column])
+    key = key.fillna(pd.Series(df.index.map(lambda index: f"row-{index}"), index=df.index))
+    if 'datetime' in df.columns:
+        df = df.sort_values('datetime', kind='stable', na_position='last')
+    return df[~key.loc[df.index].duplicated()]
+
+
+def compact_hostname(archive_folder, hostname):
+    """ Rewrites every day partition of a hostname as a single file without duplicates. """
+    partitions = list(archive_partitions(archive_folder, hostname))
+    old_files = [path for _, _, folder in partitions for path in folder.glob("*.parquet")]
+    frames = [frame for frame in (read_partition(*partition) for partition in partitions) if frame is not None]
+    if len(frames) == 0:
+        return 0, 0
+    df = pd.concat(frames, ignore_index=True)
+    compacted = deduplicate(df)
+    name = f"compacted-{time.strftime(r'%Y%m%d-%H%M%S')}"
+    new_files = set()
+    for day, rows in compacted.groupby('day'):
+        new_files.add(write_partition(rows, partition_folder(archive_folder, hostname, day), name))
+    # only once everything is written, so an interrupted compaction leaves duplicates behind, never gaps
+    for path in old_files:
+        if path not in new_files:
+            path.unlink()
+    return df.shape[0], compacted.shape[0]
+
+
+def compact(output_folder, archive_folder=None, homepage_urls=(), delete_snapshots=False):
+    archive_folder = Path(archive_folder) if archive_folder else archive_folder_of(output_folder)
+    imported = import_snapshots(output_folder, archive_folder, homepage_urls, delete_snapshots)
+    log.info(f"Imported {imported} CSV snapshots into {archive_folder}.")
+    results = {}
+    for host_folder in sorted(archive_folder.glob("hostname=*")):
+        hostname = partition_value(host_folder)
+        before, after = compact_hostname(archive_folder, hostname)
+        results[hostname] = (before, after)
+        log.info(f"{hostname}: kept {after} of {before} rows.")
+    return results
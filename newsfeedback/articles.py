@@ -0,0 +1,119 @@
+""" Cross-run index of every collected article, for querying the output without reading the snapshots.
+"""
+import sqlite3, threading, time
+from pathlib import Path
+import pandas as pd
+from loguru import logger as log
+from newsfeedback.archive import ARCHIVE_FOLDER_NAME, archive_partitions, read_partition, snapshot_hostname
+
+ARTICLE_INDEX_NAME = "articles.sqlite"
+QUERY_COLUMNS = ['url', 'hostname', 'title', 'date', 'first_seen', 'last_seen', 'times_seen']
+
+
+def seen_time(datetime=None):
+    """ ISO 8601 minutes, from a row's %Y%m%d-%H%M datetime or the current time. """
+    if isinstance(datetime, str) and len(datetime) == 13:
+        return f"{datetime[:4]}-{datetime[4:6]}-{datetime[6:8]}T{datetime[9:11]}:{datetime[11:]}"
+    return time.strftime(r"%Y-%m-%dT%H:%M")
+
+
+def text_or_none(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return str(value)
+
+
+class ArticleIndex(object):
+    """ SQLite table of the articles in an output folder: when each URL was first and last
+    seen on its homepage, with the outlet's hostname, title and date. Exports add to it as
+    they finish, so queries never have to rescan the CSV or Parquet files. """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS articles (url TEXT PRIMARY KEY, hostname TEXT, title TEXT, "
+                                     "date TEXT, first_seen TEXT, last_seen TEXT, times_seen INTEGER)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS articles_by_outlet ON articles (hostname, first_seen)")
+
+    def record(self, articles, hostname, seen_at=None):
+        """ articles are (url, metadata) pairs, seen on hostname's homepage at seen_at or their own datetime. """
+        rows = []
+        for url, metadata in articles:
+            url = text_or_none(url) or text_or_none(metadata.get('url'))
+            if url is None:
+                continue
+            rows.append((url, hostname, text_or_none(metadata.get('title')), text_or_none(metadata.get('date')),
+                         seen_at or seen_time(metadata.get('datetime'))))
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO articles VALUES (?, ?, ?, ?, ?5, ?5, 1) ON CONFLICT(url) DO UPDATE SET "
+                "title = COALESCE(excluded.title, title), date = COALESCE(excluded.date, date), "
+                "first_seen = MIN(first_seen, excluded.first_seen), last_seen = MAX(last_seen, excluded.last_seen), "
+                "times_seen = times_seen + 1", rows)
+        return len(rows)
+
+    def touch(self, urls, seen_at=None):
+        """ Notes that already collected articles were still linked from their homepage. """
+        seen_at = seen_at or seen_time()
+        with self._lock, self._connection:
+            self._connection.executemany("UPDATE articles SET last_seen = MAX(last_seen, ?), times_seen = times_seen + 1 "
+                                         "WHERE url = ?", [(seen_at, url) for url in urls])
+
+    def query(self, outlet=None, since=None, until=None):
+        """ Articles first seen between since and until (ISO dates or datetimes, both included),
+        of outlets whose hostname contains outlet, with their dwell time in hours. """
+        conditions, parameters = [], []
+        if outlet:
+            conditions.append("hostname LIKE ?")
+            parameters.append(f"%{outlet}%")
+        if since:
+            conditions.append("first_seen >= ?")
+            parameters.append(since)
+        if until:
+            conditions.append("first_seen <= ?")
+            parameters.append(until if "T" in until else f"{until}T23:59")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            rows = self._connection.execute(f"SELECT {', '.join(QUERY_COLUMNS)} FROM articles {where} "
+                                            "ORDER BY hostname, first_seen", parameters).fetchall()
+        df = pd.DataFrame(rows, columns=QUERY_COLUMNS)
+        dwell_time = pd.to_datetime(df['last_seen']) - pd.to_datetime(df['first_seen'])
+        df['dwell_hours'] = (dwell_time.dt.total_seconds() / 3600).round(2)
+        return df
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM articles")
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+
+def open_article_index(output_folder):
+    return ArticleIndex(Path(output_folder)/ARTICLE_INDEX_NAME)
+
+
+def rebuild_article_index(output_folder, homepage_urls=()):
+    """ Fills the index again from every CSV snapshot and the archive of output_folder. """
+    output_folder = Path(output_folder)
+    article_index = open_article_index(output_folder)
+    try:
+        article_index.clear()
+        for snapshot in sorted(output_folder.glob("*/*.csv")):
+            df = pd.read_csv(snapshot, dtype=str)
+            article_index.record(((None, row) for row in df.to_dict('records')), snapshot_hostname(snapshot, df, homepage_urls))
+        archive_folder = output_folder/ARCHIVE_FOLDER_NAME
+        for hostname, day, folder in archive_partitions(archive_folder):
+            df = read_partition(hostname, day, folder)
+            if df is not None:
+                article_index.record(((None, row) for row in df.to_dict('records')), hostname)
+        log.info(f"Indexed {len(article_index)} articles from {output_folder}.")
+    finally:
+        article_index.close()
@@ -0,0 +1,94 @@
+""" Cached loading and validation of newsfeedback's YAML configs.
+"""
+import copy, threading
+from pathlib import Path
+import yaml
+from loguru import logger as log
+from newsfeedback.drivers import BROWSER_MODES
+from newsfeedback.parsers import PARSERS
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError: # PyYAML built without libyaml
+    from yaml import SafeLoader
+
+PIPELINES = ('trafilatura', 'beautifulsoup', 'purabo')
+NUMERIC_HOMEPAGE_SETTINGS = ('workers', 'rate', 'jitter', 'refetch_after', 'interval')
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def config_kind(type_config):
+    """ 'metadata', 'homepage', 'filter_choice' or 'filter_sections' for any of retrieve_config's types. """
+    kind = type_config.lower()
+    for suffix in ('_default', '_test'):
+        if kind.endswith(suffix):
+            kind = kind[:-len(suffix)]
+    return kind
+
+
+def validate_config(data, config_file, kind=None):
+    """ Raises ConfigError if the file cannot be used at all and warns about single entries
+    that newsfeedback will not understand. An empty file counts as an empty config. """
+    if data is None:
+        return {}
+    if not isinstance(data, dict):
+        raise ConfigError(f"{config_file} must map names to settings, but holds a {type(data).__name__}.")
+    for key, value in data.items():
+        if kind == 'metadata' and not isinstance(value, bool):
+            log.warning(f"{config_file}: '{key}' should be Yes or No, '{value}' counts as No.")
+        elif kind == 'filter_choice' and value not in ('on', 'off'):
+            log.warning(f"{config_file}: '{key}' should be 'on' or 'off', '{value}' counts as off.")
+        elif kind == 'filter_sections' and not isinstance(value, str):
+            log.warning(f"{config_file}: the sections of '{key}' should be a list of -\"name\" entries.")
+        elif kind == 'homepage':
+            if not isinstance(value, dict):
+                log.warning(f"{config_file}: {key} has no pipeline and filter settings.")
+                continue
+            if value.get('pipeline') not in PIPELINES:
+                log.warning(f"{config_file}: {key} uses the unknown pipeline '{value.get('pipeline')}'.")
+            if 'parser' in value and value['parser'] not in PARSERS:
+                log.warning(f"{config_file}: {key} uses the unknown parser '{value['parser']}', which counts as the default.")
+            if 'browser' in value and value['browser'] not in BROWSER_MODES:
+                log.warning(f"{config_file}: {key} uses the unknown browser mode '{value['browser']}', which counts as full.")
+            if 'block' in value and not isinstance(value['block'], list):
+                log.warning(f"{config_file}: the block setting of {key} should be a list of URL patterns.")
+            for setting in NUMERIC_HOMEPAGE_SETTINGS:
+                if setting in value and not isinstance(value[setting], (int, float)):
+                    log.warning(f"{config_file}: {setting} of {key} should be a number, not '{value[setting]}'.")
+    return data
+
+
+class ConfigRegistry(object):
+    """ Parses each config file once and hands out copies of the result until the file's
+    modification time or size changes, so long-running collections pick up edits. """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def version(self, config_file):
+        stat = Path(config_file).stat()
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def load(self, config_file, kind=None):
+        config_file = Path(config_file).resolve()
+        version = self.version(config_file)
+        with self._lock:
+            entry = self._entries.get(config_file)
+            if entry is None or entry[0] != version:
+                with config_file.open(encoding="utf-8") as yamlfile:
+                    data = validate_config(yaml.load(yamlfile, Loader=SafeLoader), config_file, kind)
+                label = f"{kind} config" if kind else "config"
+                log.info(f"{'Reloaded' if entry is not None else 'Loaded'} the {label} at {config_file}.")
+                entry = self._entries[config_file] = (version, data)
+        return copy.deepcopy(entry[1])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+config_registry = ConfigRegistry()
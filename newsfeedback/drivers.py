@@ -0,0 +1,352 @@
+""" Shared Selenium WebDriver pool for newsfeedback's JavaScript downloads.
+"""
+import atexit, re, threading, time
+from contextlib import contextmanager
+from loguru import logger as log
+from selenium import webdriver
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.wait import WebDriverWait
+from newsfeedback.metrics import metrics
+from newsfeedback.politeness import hostname_of
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:134.0) Gecko/20100101 Firefox/134.0'
+DEFAULT_POOL_SIZE = 1
+DEFAULT_MAX_PAGES = 100
+BROWSER_MODES = ('full', 'light')
+DEFAULT_BROWSER_MODE = 'full'
+PAGE_LOAD_TIMEOUT = 30 # seconds a full page may take to finish loading
+READY_TIMEOUT = 10 # seconds a light page may take until wait_for is found
+BLOCKED_RESOURCES = ['*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico', '*.bmp',
+                     '*.mp4', '*.webm', '*.m3u8', '*.mp3', '*.woff', '*.woff2', '*.ttf', '*.otf']
+BLOCKED_HOSTS = ['*doubleclick.net*', '*googlesyndication.com*', '*googletagmanager.com*', '*google-analytics.com*',
+                 '*googletagservices.com*', '*amazon-adsystem.com*', '*adnxs.com*', '*criteo.*', '*taboola.com*',
+                 '*outbrain.com*', '*ioam.de*', '*chartbeat.*', '*facebook.net*', '*hotjar.com*', '*xiti.com*']
+
+
+def chrome_options():
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless=new') # comment out if you want to see what's happening
+    options.add_argument('--log-level=3')
+    # options.add_argument('--lang=en')
+    options.add_argument(f'--user-agent={USER_AGENT}')
+    options.add_experimental_option('excludeSwitches', ['enable-logging'])
+    options.add_argument('--enable-javascript')
+    # get() returns once the DOM is ready; full page loads then wait for the rest themselves
+    options.page_load_strategy = 'eager'
+    return options
+
+
+def new_chrome_driver():
+    log.info("Starting a new Chrome instance.")
+    return webdriver.Chrome(options=chrome_options())
+
+
+class PageLoads(object):
+    """ How Chrome loads the pages of each hostname. 'full' loads everything and waits for the page to
+    settle, as newsfeedback always did. 'light' blocks images, media, fonts, the usual ad and tracking
+    hosts and any further URL patterns in block, and reads the page as soon as its DOM is ready and an
+    element matching wait_for, a CSS selector, is there. """
+
+    def __init__(self):
+        self._settings = {}
+        self._lock = threading.Lock()
+
+    def configure(self, url, mode=DEFAULT_BROWSER_MODE, wait_for=None, block=()):
+        if mode not in BROWSER_MODES:
+            log.warning(f"{url}: unknown browser mode '{mode}', loading its pages in full.")
+            mode = DEFAULT_BROWSER_MODE
+        if isinstance(block, str):
+            block = [block]
+        with self._lock:
+            self._settings[hostname_of(url)] = (mode, wait_for, tuple(block or ()))
+
+    def settings_for(self, url):
+        return self._settings.get(hostname_of(url), (DEFAULT_BROWSER_MODE, None, ()))
+
+    def reset(self):
+        with self._lock:
+            self._settings = {}
+
+    def blocked_urls(self, url):
+        mode, _, block = self.settings_for(url)
+        if mode != 'light':
+            return []
+        return BLOCKED_RESOURCES + BLOCKED_HOSTS + list(block)
+
+
+page_loads = PageLoads()
+
+
+class BrowserRequired(Exception):
+    """ Raised by workers without a browser when a page turns out to need one. """
+
+
+def browser_required():
+    # the factory of workers that must hand pages needing a browser over to workers that have one
+    raise BrowserRequired("This worker has no browser.")
+
+
+class PooledDriver(object):
+    """ A pool's WebDriver, restarted in place once it has loaded max_pages pages.
+    consented_hosts remembers where the consent button was already clicked. """
+
+    def __init__(self, factory, max_pages):
+        self.factory = factory
+        self.max_pages = max_pages
+        self.driver = self.start()
+        self.pages = 0
+        self.consented_hosts = set()
+        self.blocked = []
+
+    def start(self):
+        with metrics.timer('browser_start'):
+            return self.factory()
+
+    def get(self, url):
+        if self.max_pages and self.pages >= self.max_pages:
+            self.restart()
+        self.pages += 1
+        self.block(page_loads.blocked_urls(url))
+        self.driver.get(url)
+
+    def block(self, urls):
+        # the browser keeps blocking until told otherwise, so this is only sent when the list changes
+        if urls == self.blocked:
+            return
+        try:
+            if not self.blocked:
+                self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': urls})
+            self.blocked = urls
+        except (AttributeError, WebDriverException) as e:
+            log.warning(f"The browser cannot block requests, loading the whole page ({e}).")
+
+    def wait_until_ready(self, url, settle_time=0):
+        mode, wait_for, _ = page_loads.settings_for(url)
+        if mode == 'light':
+            ready = lambda driver: (driver.execute_script("return document.readyState") != 'loading'
+                                    and (not wait_for or len(driver.find_elements(By.CSS_SELECTOR, wait_for)) != 0))
+            timeout = READY_TIMEOUT
+        else:
+            ready = lambda driver: driver.execute_script("return document.readyState") == 'complete'
+            timeout = PAGE_LOAD_TIMEOUT
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.1).until(ready)
+        except TimeoutException:
+            log.warning(f"{url} was not ready after {timeout}s, reading it as it is.")
+        if mode != 'light' and settle_time:
+            time.sleep(settle_time)
+
+    @property
+    def page_source(self):
+        return self.driver.page_source
+
+    def restart(self):
+        log.info(f"Recycling the browser after {self.pages} pages.")
+        self.quit()
+        self.driver = self.start()
+        self.pages = 0
+        self.consented_hosts = set()
+        self.blocked = []
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            log.warning(f"The browser could not be shut down cleanly ({e}).")
+
+
+class LazyDriver(object):
+    """ Stands in for a PooledDriver, but only borrows one from the pool on first use. """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.pooled = None
+
+    @property
+    def started(self):
+        return self.pooled is not None
+
+    def _borrow(self):
+        if self.pooled is None:
+            self.pooled = self.pool.acquire()
+        return self.pooled
+
+    def get(self, url):
+        self._borrow().get(url)
+
+    def wait_until_ready(self, url, settle_time=0):
+        self._borrow().wait_until_ready(url, settle_time)
+
+    @property
+    def driver(self):
+        return self._borrow().driver
+
+    @property
+    def page_source(self):
+        return self._borrow().page_source
+
+    @property
+    def consented_hosts(self):
+        return self._borrow().consented_hosts
+
+
+class DriverPool(object):
+    """ Lazily started, size-capped pool of browsers shared by all homepages of a run
+    and kept between runs. Callers block while every browser is in use. """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, max_pages=DEFAULT_MAX_PAGES, factory=new_chrome_driver):
+        self.size = size
+        self.max_pages = max_pages
+        self.factory = factory
+        self._idle = []
+        self._created = 0
+        self._condition = threading.Condition()
+
+    def configure(self, size=None, max_pages=None, factory=None):
+        self.shutdown()
+        with self._condition:
+            if size is not None:
+                self.size = max(1, int(size))
+            if max_pages is not None:
+                self.max_pages = int(max_pages)
+            if factory is not None:
+                self.factory = factory
+
+    def acquire(self):
+        with self._condition:
+            while not self._idle and self._created >= self.size:
+                self._condition.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+        try:
+            return PooledDriver(self.factory, self.max_pages)
+        except Exception:
+            with self._condition:
+                self._created -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, pooled):
+        with self._condition:
+            self._idle.append(pooled)
+            self._condition.notify()
+
+    def discard(self, pooled):
+        pooled.quit()
+        with self._condition:
+            self._created -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def driver(self):
+        pooled = self.acquire()
+        finished = False
+        try:
+            yield pooled
+            finished = True
+        finally:
+            # also covers generators that are closed before they are exhausted
+            if finished:
+                self.release(pooled)
+            else:
+                self.discard(pooled)
+
+    @contextmanager
+    def lazy_driver(self):
+        lazy = LazyDriver(self)
+        finished = False
+        try:
+            yield lazy
+            finished = True
+        finally:
+            if lazy.started and finished:
+                self.release(lazy.pooled)
+            elif lazy.started:
+                self.discard(lazy.pooled)
+
+    @property
+    def started(self):
+        return self._created
+
+    def shutdown(self):
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            self._condition.notify_all()
+        for pooled in idle:
+            pooled.quit()
+        if idle:
+            log.info(f"Shut down {len(idle)} browser(s).")
+
+
+class FakeElement(object):
+    def __init__(self, driver):
+        self.driver = driver
+
+    def click(self):
+        self.driver.clicks += 1
+        self.driver.page_source = re.sub(r"sp_(message|choice)\w*|message-overlay", "", self.driver.page_source)
+
+
+class FakeSwitchTo(object):
+    def frame(self, frame):
+        pass
+
+    def default_content(self):
+        pass
+
+
+class FakeDriver(object):
+    """ Offline stand-in for webdriver.Chrome, serving pages from a dict of URL to HTML.
+    Consent overlays are recognised by their sp_message_*/sp_choice_* markup. """
+
+    def __init__(self, pages=None):
+        self.pages = pages if pages is not None else {}
+        self.page_source = ""
+        self.current_url = None
+        self.visited = []
+        self.clicks = 0
+        self.closed = False
+        self.cdp_commands = []
+        self.switch_to = FakeSwitchTo()
+
+    def get(self, url):
+        page = self.pages.get(url, "")
+        self.current_url = url
+        self.visited.append(url)
+        self.page_source = page(url) if callable(page) else page
+
+    def find_element(self, by=None, value=None):
+        marker = re.search(r"'([^']+)'", value or "")
+        marker = marker.group(1) if marker else value
+        if marker and marker in self.page_source:
+            return FakeElement(self)
+        raise NoSuchElementException(f"{value} not found.")
+
+    def find_elements(self, by=None, value=None):
+        try:
+            return [self.find_element(by, value)]
+        except NoSuchElementException:
+            return []
+
+    def implicitly_wait(self, seconds):
+        pass
+
+    def execute_script(self, script, *args):
+        if "readyState" in script:
+            return "complete"
+        return None
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        self.cdp_commands.append((cmd, cmd_args))
+        return {}
+
+    def quit(self):
+        self.closed = True
+
+
+driver_pool = DriverPool()
+atexit.register(driver_pool.shutdown)
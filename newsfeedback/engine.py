@@ -0,0 +1,189 @@
+""" asyncio engine that collects all homepages of a run at once, as one graph of tasks: every homepage's
+discovery is followed by the downloads and extraction of its articles, and all of them share a global
+limit and a limit per hostname. The downloads, browsers and exports themselves are newsfeedback's
+usual blocking functions, run in a thread pool.
+"""
+import asyncio, functools, queue, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from loguru import logger as log
+from newsfeedback.extraction import extraction_pool, timed_extraction, QUEUED_PER_WORKER
+from newsfeedback.metrics import metrics
+from newsfeedback.politeness import hostname_of
+
+ENGINES = ('threads', 'asyncio')
+DEFAULT_CONCURRENCY = 16
+DEFAULT_PER_HOST = 4
+IN_FLIGHT_PER_SLOT = 2 # how far a homepage's articles may run ahead of the oldest one not yet exported
+END_OF_ROWS = object()
+
+
+class HomepageJob(object):
+    """ One homepage of a run. discover() returns the article URLs to collect, already filtered,
+    fetch(article_url) the HTML of one article or None, export(rows) writes the (article URL, metadata)
+    pairs, in the order of the URLs and as they are extracted, and returns the path of the file, and
+    close() tidies up. They all block and are run in threads. per_host caps how many of the homepage's
+    articles are collected at the same time. extracted(article_url, metadata), if given, is told how
+    each extraction went. """
+
+    def __init__(self, homepage_url, discover, fetch, export, extraction_options=None, per_host=None, close=None, extracted=None):
+        self.homepage_url = homepage_url
+        self.discover = discover
+        self.fetch = fetch
+        self.export = export
+        self.extraction_options = extraction_options or {}
+        self.per_host = per_host
+        self.close = close
+        self.extracted = extracted
+
+
+class CollectionEngine(object):
+    """ Runs HomepageJobs with at most concurrency downloads at the same time overall and at most a
+    job's per_host articles per hostname in flight, from download to extraction. A homepage only
+    starts another article once one of its slots is free and the article is close enough to the
+    oldest one not yet exported, and every row is handed to the export as soon as the rows before
+    it are, so neither downloads nor rows pile up in memory. """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST):
+        self.concurrency = max(1, int(concurrency))
+        self.per_host = max(1, int(per_host))
+
+    def run(self, jobs):
+        """ Collects the jobs' homepages and returns a result per job, as collect_homepage does. """
+        return asyncio.run(self._run(list(jobs)))
+
+    async def _run(self, jobs):
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._host_slots = {}
+        extract_workers = max(1, extraction_pool.workers)
+        self._extraction_slots = asyncio.Semaphore(extract_workers * QUEUED_PER_WORKER)
+        # room for the extractions and exports next to the downloads
+        self._threads = ThreadPoolExecutor(max_workers=self.concurrency + extract_workers * QUEUED_PER_WORKER + 1,
+                                           thread_name_prefix="newsfeedback")
+        try:
+            return await asyncio.gather(*(self._collect(job) for job in jobs))
+        finally:
+            self._threads.shutdown(wait=True)
+
+    def host_slots(self, url, per_host=None):
+        # homepages on the same host share their slots
+        host = hostname_of(url)
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(max(1, int(per_host or self.per_host)))
+        return self._host_slots[host]
+
+    async def in_thread(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._threads, functools.partial(function, *args))
+
+    def start_export(self, job, rows):
+        """ Runs job.export in a thread of its own, as it lasts as long as the homepage's collection, fed
+        with the rows put on rows until END_OF_ROWS. Anything else ending the rows, like an exception,
+        interrupts the export. Returns a future of its result. """
+        loop = asyncio.get_running_loop()
+        exported = loop.create_future()
+
+        def read_rows():
+            while True:
+                row = rows.get()
+                if row is END_OF_ROWS:
+                    return
+                if isinstance(row, BaseException):
+                    raise row
+                yield row
+
+        def export():
+            try:
+                df_path = job.export(read_rows())
+                loop.call_soon_threadsafe(exported.set_result, df_path)
+            except BaseException as e:
+                loop.call_soon_threadsafe(exported.set_exception, e)
+
+        threading.Thread(target=export, name=f"newsfeedback-export-{hostname_of(job.homepage_url)}", daemon=True).start()
+        return exported
+
+    async def _collect(self, job):
+        started = time.monotonic()
+        result = {'homepage': job.homepage_url, 'status': 'failed', 'path': None, 'error': None}
+        rows = queue.Queue()
+        exported = None
+        try:
+            host_slots = self.host_slots(job.homepage_url, job.per_host)
+            async with host_slots, self._slots:
+                article_url_list = await self.in_thread(job.discover)
+            exported = self.start_export(job, rows)
+            window = max(1, int(job.per_host or self.per_host)) * IN_FLIGHT_PER_SLOT
+            ready = {} # position: metadata of the articles finished before an earlier one
+            exported_up_to = [0]
+            progress = asyncio.Condition()
+
+            async def collect_article(position):
+                metadata = await self._collect_article(job, article_url_list[position], host_slots)
+                async with progress:
+                    ready[position] = metadata
+                    while exported_up_to[0] in ready:
+                        metadata = ready.pop(exported_up_to[0])
+                        if metadata is not None:
+                            rows.put((article_url_list[exported_up_to[0]], metadata))
+                        exported_up_to[0] += 1
+                    progress.notify_all()
+
+            articles = set()
+            for position in range(len(article_url_list)):
+                async with progress:
+                    await progress.wait_for(lambda: position < exported_up_to[0] + window)
+                await host_slots.acquire()
+                article = asyncio.create_task(collect_article(position))
+                articles.add(article)
+                article.add_done_callback(articles.discard)
+            await asyncio.gather(*articles)
+            rows.put(END_OF_ROWS)
+            df_path = await exported
+            if df_path is not None:
+                result.update({'status': 'ok', 'path': str(df_path)})
+        except Exception as e:
+            if exported is not None and not exported.done():
+                # the export keeps what it has written so far in its .part file
+                rows.put(e)
+                await asyncio.wait([exported])
+                exported.exception()
+            # one broken site must not take the other homepages of the run down with it
+            log.exception(f'{job.homepage_url}: data collection failed.')
+            result['error'] = repr(e)
+        finally:
+            if job.close is not None:
+                await self.in_thread(job.close)
+        result['seconds'] = round(time.monotonic() - started, 1)
+        return result
+
+    async def _collect_article(self, job, article_url, host_slots):
+        # holds one of the host's slots, taken by _collect, until the article is extracted
+        try:
+            async with self._slots:
+                downloaded = await self.in_thread(job.fetch, article_url)
+            if not downloaded:
+                return None
+            async with self._extraction_slots:
+                metadata, seconds = await self._extract(downloaded, job.extraction_options)
+            metrics.observe('extraction', article_url, seconds)
+            if metadata is None:
+                metrics.error('extraction', article_url)
+            if job.extracted is not None:
+                job.extracted(article_url, metadata)
+            return metadata
+        except Exception as e:
+            log.warning(f"{article_url} could not be collected ({e}). Continuing to next URL.")
+            return None
+        finally:
+            host_slots.release()
+
+    async def _extract(self, downloaded, options):
+        extract = functools.partial(timed_extraction, downloaded, **options)
+        if extraction_pool.workers <= 1:
+            return await asyncio.get_running_loop().run_in_executor(self._threads, extract)
+        executor = extraction_pool.executor()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, extract)
+        except BrokenProcessPool:
+            # this article is lost, the next one gets a new pool
+            extraction_pool.discard(executor)
+            raise
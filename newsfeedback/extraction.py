@@ -0,0 +1,150 @@
+""" Process pool for newsfeedback's CPU-bound metadata extraction.
+Kept free of main's imports so that worker processes start quickly.
+"""
+import atexit, multiprocessing, os, threading, time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+import trafilatura
+from lxml import etree
+from loguru import logger as log
+
+# all cores but one, which is left to the downloads and browsers; a single core extracts in process
+DEFAULT_EXTRACT_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+QUEUED_PER_WORKER = 4
+
+
+def extract_metadata(downloaded, include_links=False, include_comments=True, fields=None):
+    """ trafilatura.bare_extraction as a plain dict, with its lxml trees serialised to XML
+    strings so that the result can be sent back from a worker process. With fields, only
+    those keys are kept, which spares serialising and sending the rest. """
+    metadata = trafilatura.bare_extraction(downloaded, only_with_metadata=True, include_links=include_links,
+                                           include_comments=include_comments)
+    if metadata is None:
+        return None
+    metadata = metadata.as_dict()
+    if fields is not None:
+        metadata = {key: value for key, value in metadata.items() if key in fields}
+    for key, value in metadata.items():
+        if isinstance(value, etree._Element):
+            metadata[key] = etree.tostring(value, encoding="unicode")
+    return metadata
+
+
+def extract_or_none(downloaded, **options):
+    try:
+        return extract_metadata(downloaded, **options)
+    except Exception as e:
+        log.warning(f"Metadata could not be extracted ({e}). Continuing to next URL.")
+        return None
+
+
+def timed_extraction(downloaded, **options):
+    # timed where it runs, so that the time spent queueing for a worker process is left out
+    started = time.perf_counter()
+    metadata = extract_or_none(downloaded, **options)
+    return metadata, time.perf_counter() - started
+
+
+class ExtractionPool(object):
+    """ Streams downloaded HTML through a pool of extractor processes, shared by all homepages
+    and kept between runs. Only with a single worker, i.e. --extract-workers 1 or a single core,
+    extraction happens in the calling thread. """
+
+    def __init__(self, workers=DEFAULT_EXTRACT_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def configure(self, workers=None):
+        """ workers=0 or None sizes the pool to the machine's cores. """
+        self.shutdown()
+        with self._lock:
+            self.workers = max(1, int(workers)) if workers else (os.cpu_count() or 1)
+
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                log.info(f"Starting {self.workers} extraction processes.")
+                # spawn rather than fork, as the parent already runs download threads and browsers
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def discard(self, executor):
+        """ Drops a pool that a crashed worker process has broken, i.e. a segfault in lxml or the
+        OOM killer, so that the next extraction starts a new one instead of failing as well. """
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        log.error("An extraction process died, starting new ones for the next articles.")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def extract(self, downloads, observe=None, **options):
+        """ Takes (key, html) pairs as they are downloaded and yields (key, metadata) pairs
+        as they are extracted, so not necessarily in the same order. observe, if given, is
+        called with (key, seconds, metadata) for every extraction. """
+        if self.workers <= 1:
+            for key, downloaded in downloads:
+                if downloaded is None:
+                    yield key, None
+                    continue
+                metadata, seconds = timed_extraction(downloaded, **options)
+                if observe is not None:
+                    observe(key, seconds, metadata)
+                yield key, metadata
+            return
+        executor = self.executor()
+        pending = {}
+
+        def submit(key, downloaded):
+            nonlocal executor
+            try:
+                future = executor.submit(timed_extraction, downloaded, **options)
+            except BrokenProcessPool:
+                self.discard(executor)
+                executor = self.executor()
+                future = executor.submit(timed_extraction, downloaded, **options)
+            pending[future] = key, executor
+
+        def collect(futures):
+            for future in futures:
+                key, submitted_to = pending.pop(future)
+                try:
+                    metadata, seconds = future.result()
+                except BrokenProcessPool as e:
+                    # the article that was being extracted may well be what killed the process, so it is not retried
+                    self.discard(submitted_to)
+                    log.warning(f"Metadata could not be extracted ({e}). Continuing to next URL.")
+                    yield key, None
+                    continue
+                except Exception as e:
+                    log.warning(f"Metadata could not be extracted ({e}). Continuing to next URL.")
+                    yield key, None
+                    continue
+                if observe is not None:
+                    observe(key, seconds, metadata)
+                yield key, metadata
+
+        for key, downloaded in downloads:
+            if downloaded is None:
+                yield key, None
+                continue
+            submit(key, downloaded)
+            # hands back what is ready and holds the downloads back if extraction falls behind
+            done = [future for future in pending if future.done()]
+            if len(pending) >= self.workers * QUEUED_PER_WORKER:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield from collect(done)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield from collect(done)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+extraction_pool = ExtractionPool()
+atexit.register(extraction_pool.shutdown)
@@ -0,0 +1,42 @@
+""" Precompiled URL filter for the article URLs of the beautifulsoup and purabo pipelines.
+"""
+import re
+
+URL_SPECIFIC_BLACKLIST = frozenset(['https://www.zeit.de/exklusive-zeit-artikel', 'https://www.spiegel.de/__proto_url__',
+                                    'https://www.sueddeutsche.de/updates-mobileapps', 'https://www.sueddeutsche.de/updates-rss',
+                                    'https://www.sueddeutsche.de/mediadaten'])
+SECTION_WHITELIST = ["artikel"]
+GENERAL_PATTERN = re.compile(r"((\/.*?){2,}\/$|\/\/www\..*?\..{2,3}\/[^\/]*?$|\/\/www\..*?\..{2}$)")
+NEVER = re.compile(r"(?!)")
+
+
+def section_terms(filter_config, filter_sections):
+    """ The section names switched 'on' in the filter choice config, as listed in the filter sections config. """
+    filter_wanted = [k for k,v in filter_config.items() if v == 'on']
+    filter_sections_wanted = [str(v) for k,v in filter_sections.items() if k in filter_wanted]
+    return [term for section in filter_sections_wanted for term in section.replace('-"', '').replace('"', '').split(' ')]
+
+
+def section_pattern(sections):
+    # the terms are regex fragments, as they always were, so 'index.html' also matches 'index-html'
+    if len(sections) == 0:
+        return NEVER
+    return re.compile(fr"\/({'|'.join(sections)})\/?")
+
+
+class UrlFilter(object):
+    """ Keeps article URLs in a whitelisted section, or URLs that neither look like a section
+    front nor lie in a blacklisted section. Built once per version of the filter configs. """
+
+    def __init__(self, filter_config, filter_sections):
+        self.blacklist = section_pattern(section_terms(filter_config, filter_sections))
+        self.whitelist = section_pattern(SECTION_WHITELIST)
+
+    def viable(self, article):
+        if article not in URL_SPECIFIC_BLACKLIST and self.whitelist.search(article):
+            return True
+        return not GENERAL_PATTERN.search(article) and not self.blacklist.search(article)
+
+    def filter(self, article_url_list):
+        """ Returns the viable URLs, without duplicates, in their original order. """
+        return list(dict.fromkeys(article for article in article_url_list if self.viable(article)))
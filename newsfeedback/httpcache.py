@@ -0,0 +1,167 @@
+""" On-disk HTTP cache with conditional requests for newsfeedback's downloads.
+"""
+import hashlib, os, re, sqlite3, threading, time, uuid
+from pathlib import Path
+import requests
+from requests.structures import CaseInsensitiveDict
+from loguru import logger as log
+from newsfeedback.sessions import get_session
+
+DEFAULT_MAX_BYTES = 500 * 1000 * 1000
+INDEX_NAME = "index.sqlite"
+CHARSET_HEADER = re.compile(r"charset=[\"']?([\w.:-]+)", re.I)
+CHARSET_DOCUMENT = re.compile(rb"""<meta[^>]+charset=["']?([\w.:-]+)|<\?xml[^>]+encoding=["']([\w.:-]+)""", re.I)
+
+
+def decode_content(content, headers=None):
+    encodings = []
+    match = CHARSET_HEADER.search((headers or {}).get("Content-Type", ""))
+    if match:
+        encodings.append(match.group(1))
+    match = CHARSET_DOCUMENT.search(content[:4096])
+    if match:
+        encodings.append((match.group(1) or match.group(2)).decode("ascii"))
+    for encoding in encodings + ["utf-8"]:
+        try:
+            return content.decode(encoding)
+        except (LookupError, UnicodeDecodeError):
+            continue
+    return content.decode("utf-8", errors="replace")
+
+
+class CachedResponse(object):
+    """ The parts of requests.Response the pipelines use, for bodies served from the cache. """
+
+    def __init__(self, url, status_code, content, headers, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return decode_content(self.content, self.headers)
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} error for url: {self.url}", response=self)
+
+    def close(self):
+        pass
+
+
+class HttpCache(object):
+    """ Stores response bodies with their ETag/Last-Modified validators and revalidates them with
+    If-None-Match/If-Modified-Since, answering from disk on 304. The least recently used bodies
+    are evicted once the cache grows beyond max_bytes. Without a directory, requests pass through. """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self._lock = threading.Lock()
+        self._connection = None
+        self.configure(directory, max_bytes)
+
+    def configure(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            self.directory = Path(directory) if directory else None
+            self.max_bytes = int(max_bytes)
+            self.hits = 0
+            self.misses = 0
+            if self.directory is None:
+                return
+            (self.directory/"bodies").mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(str(self.directory/INDEX_NAME), timeout=30, check_same_thread=False)
+            with self._connection:
+                self._connection.execute("CREATE TABLE IF NOT EXISTS entries (url TEXT PRIMARY KEY, etag TEXT, "
+                                         "last_modified TEXT, content_type TEXT, size INTEGER, last_used REAL)")
+        log.info(f"Caching downloads in {self.directory} (at most {self.max_bytes / 1000000:.0f} MB).")
+
+    @property
+    def enabled(self):
+        return self._connection is not None
+
+    def _body_path(self, url):
+        return self.directory/"bodies"/hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _lookup(self, url):
+        with self._lock:
+            row = self._connection.execute("SELECT etag, last_modified, content_type FROM entries WHERE url = ?", (url,)).fetchone()
+        if row is None or not self._body_path(url).exists():
+            return None
+        return {"etag": row[0], "last_modified": row[1], "content_type": row[2]}
+
+    def _store(self, url, response):
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        if response.status_code != 200 or not (etag or last_modified):
+            return
+        # the body only takes the place of the old one once it is complete, and together with its row,
+        # so a validator never points at a truncated body or at another thread's version of the page
+        body_path = self._body_path(url)
+        part_path = body_path.with_name(f"{body_path.name}.{uuid.uuid4().hex[:8]}.part")
+        try:
+            part_path.write_bytes(response.content)
+            with self._lock, self._connection:
+                os.replace(part_path, body_path)
+                self._connection.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                                         (url, etag, last_modified, response.headers.get("Content-Type"), len(response.content), time.time()))
+        except OSError as e:
+            log.warning(f"{url} could not be cached ({e}).")
+            part_path.unlink(missing_ok=True)
+            return
+        self.evict()
+
+    def _touch(self, url):
+        with self._lock, self._connection:
+            self._connection.execute("UPDATE entries SET last_used = ? WHERE url = ?", (time.time(), url))
+
+    def get(self, url, session=None, **kwargs):
+        if session is None:
+            session = get_session()
+        if not self.enabled:
+            return session.get(url, **kwargs)
+        entry = self._lookup(url)
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        response = session.get(url, headers=headers, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            response.close()
+            try:
+                content = self._body_path(url).read_bytes()
+            except FileNotFoundError: # evicted in the meantime
+                return self.get(url, session, **kwargs)
+            self._touch(url)
+            self.hits += 1
+            return CachedResponse(url, 200, content, {"Content-Type": entry["content_type"] or ""}, from_cache=True)
+        self.misses += 1
+        self._store(url, response)
+        return response
+
+    def size(self):
+        with self._lock:
+            return self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def evict(self):
+        with self._lock, self._connection:
+            total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for url, size in self._connection.execute("SELECT url, size FROM entries ORDER BY last_used").fetchall():
+                self._connection.execute("DELETE FROM entries WHERE url = ?", (url,))
+                self._body_path(url).unlink(missing_ok=True)
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+
+http_cache = HttpCache()
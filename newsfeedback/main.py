@@ -1,16 +1,44 @@
-import trafilatura, click, re, time, yaml, os, schedule, requests, random, decimal
+import trafilatura, click, re, time, yaml, os, requests, socket, threading, sqlite3
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
 from pathlib import Path
 from trafilatura import feeds
 from loguru import logger as log
-from bs4 import BeautifulSoup
 from tqdm import tqdm
-from selenium import webdriver
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from newsfeedback.drivers import driver_pool, page_loads, browser_required, BrowserRequired, DEFAULT_POOL_SIZE, DEFAULT_MAX_PAGES, DEFAULT_BROWSER_MODE
+from newsfeedback.engine import CollectionEngine, HomepageJob, ENGINES, DEFAULT_CONCURRENCY
+from newsfeedback.extraction import extraction_pool, extract_or_none, DEFAULT_EXTRACT_WORKERS
+from newsfeedback.archive import archive_path, compact
+from newsfeedback.articles import open_article_index, rebuild_article_index, seen_time
+from newsfeedback.config import config_registry, config_kind
+from newsfeedback.filters import UrlFilter
+from newsfeedback.httpcache import http_cache, decode_content, DEFAULT_MAX_BYTES
+from newsfeedback.metrics import metrics
+from newsfeedback.parsers import anchor_hrefs
+from newsfeedback.politeness import rate_limiter, hostname_of
+from newsfeedback.postprocess import postprocess_metadata
+from newsfeedback.profiles import host_profiles, browser_wall
+from newsfeedback.replay import recording, ReplayDriver
+from newsfeedback.scheduler import Scheduler, MISSED_RUNS
+from newsfeedback.seen import open_seen_index
+from newsfeedback.urls import link_normalizer, unique_urls
+from newsfeedback.sinks import open_sink, SINKS, OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMAT
+from newsfeedback.sessions import configure_session, DEFAULT_CONNECTIONS_PER_HOST, DEFAULT_RETRIES
+from newsfeedback.taskqueue import TaskQueue, DEFAULT_LEASE, TASK_QUEUE_NAME
+
+
+DEFAULT_FETCH_WORKERS = 8
+IN_FLIGHT_PER_WORKER = 2 # how far downloads may run ahead of the oldest article that is not yet handed on
+POLITE_RATE = 1.0 # requests per second and host for the requests/Selenium paths, plus up to
+POLITE_JITTER = 3.0 # this many random seconds, which matches the former 1-4 s pauses
+BROWSER_SETTLE_TIME = 1.0
+DOWNLOAD_TIMEOUT = 30
 
 
 @click.group()
@@ -18,7 +46,7 @@ def cli():
     pass
 
 
-def retrieve_config(type_config, tmp_path=False):
+def resolve_config_path(type_config, tmp_path=False):
     directory = Path().resolve()
     path_user_metadata_config = directory/"user_metadata_config.yaml"
     path_default_metadata_config = directory/"newsfeedback"/"defaults"/"default_metadata_config.yaml"
@@ -27,6 +55,7 @@ def retrieve_config(type_config, tmp_path=False):
     path_user_filter_choice_config = directory/"user_filter_choice_config.yaml"
     path_default_filter_choice_config = directory/"newsfeedback"/"defaults"/"default_filter_choice_config.yaml"
     path_default_filter_sections_config = directory/"newsfeedback"/"defaults"/"default_filter_sections_config.yaml"
+    path_user_host_profiles = directory/"user_host_profiles.yaml"
     if tmp_path:
         path_tmp_metadata_config = tmp_path/"tmp_metadata_config.yaml"
         path_tmp_homepage_config = tmp_path/"tmp_homepage_config.yaml"
@@ -36,62 +65,70 @@ def retrieve_config(type_config, tmp_path=False):
     if type_config == "metadata":
         if Path(path_user_metadata_config).exists():
             config_file = Path(path_user_metadata_config)
-            log.info(f"Using the user-generated {type_config} config at {config_file}.")
+            log.debug(f"Using the user-generated {type_config} config at {config_file}.")
         else:
             config_file = Path(path_default_metadata_config)
-            log.info(f"Using the default {type_config} config at {config_file}.")
+            log.debug(f"Using the default {type_config} config at {config_file}.")
     elif type_config == "metadata_default":
         config_file = Path(path_default_metadata_config)
-        log.info(f"Using the default {type_config} config at {config_file}.")
+        log.debug(f"Using the default {type_config} config at {config_file}.")
     elif type_config == "metadata_test":
         config_file = Path(path_tmp_metadata_config)
         config_file.write_bytes(path_default_metadata_config.read_bytes())
-        log.info(f"Using the default {type_config} config at {config_file}.")
+        log.debug(f"Using the default {type_config} config at {config_file}.")
 
     elif type_config == "homepage":
         if Path(path_user_homepage_config).exists():
             config_file = Path(path_user_homepage_config)
-            log.info(f"Using the user-generated {type_config} config at {config_file}.")
+            log.debug(f"Using the user-generated {type_config} config at {config_file}.")
         else:
             config_file = Path(path_default_homepage_config)
-            log.info(f"Using the default {type_config} config at {config_file}.")
+            log.debug(f"Using the default {type_config} config at {config_file}.")
     elif type_config == "homepage_default":
         config_file = Path(path_default_homepage_config)
-        log.info(f"Using the default {type_config} config at {config_file}.")
+        log.debug(f"Using the default {type_config} config at {config_file}.")
     elif type_config == "homepage_test":
         config_file = Path(path_tmp_homepage_config)
         config_file.write_bytes(path_default_homepage_config.read_bytes())
-        log.info(f"Using the default {type_config} config at {config_file}.")
+        log.debug(f"Using the default {type_config} config at {config_file}.")
   
     elif type_config == "filter_choice":
         if Path(path_user_filter_choice_config).exists():
             config_file = Path(path_user_filter_choice_config)
-            log.info(f"Using the user-generated {type_config} config at {config_file}.")
+            log.debug(f"Using the user-generated {type_config} config at {config_file}.")
         else:
             config_file = Path(path_default_filter_choice_config)
-            log.info(f"Using the default {type_config} config at {config_file}.")
+            log.debug(f"Using the default {type_config} config at {config_file}.")
     elif type_config == "filter_choice_default":
         config_file = Path(path_default_filter_choice_config)
-        log.info(f"Using the default {type_config} config at {config_file}.")
+        log.debug(f"Using the default {type_config} config at {config_file}.")
     elif type_config == "filter_choice_test":
         config_file = Path(path_tmp_filter_choice_config)
         config_file.write_bytes(path_default_filter_choice_config.read_bytes())
-        log.info(f"Using the default {type_config} config at {config_file}.")
+        log.debug(f"Using the default {type_config} config at {config_file}.")
 
     elif type_config == "filter_sections":
         config_file = Path(path_default_filter_sections_config)
-        log.info(f"Using the default {type_config} config at {config_file}.")
+        log.debug(f"Using the default {type_config} config at {config_file}.")
     elif type_config == "filter_Sections_test":
         config_file = Path(path_tmp_filter_sections_config)
         config_file.write_bytes(path_default_filter_sections_config.read_bytes())
-        log.info(f"Using the default {type_config} config at {config_file}.")
+        log.debug(f"Using the default {type_config} config at {config_file}.")
+
+    elif type_config == "host_profiles":
+        # written by newsfeedback itself, on top of newsfeedback/defaults/default_host_profiles.yaml
+        config_file = Path(path_user_host_profiles)
+        log.debug(f"Keeping what was learned about the sites at {config_file}.")
+    return config_file
+
 
-    with config_file.open() as yamlfile:
-        data = yaml.load(yamlfile, Loader=yaml.FullLoader)
-        return data
+def retrieve_config(type_config, tmp_path=False):
+    # parsed once and then served from the registry until the file changes
+    return config_registry.load(resolve_config_path(type_config, tmp_path), config_kind(type_config))
 
 
 def click_popup(driver):
+    # True if there was a TCF consent banner and its button was clicked
     try:
         WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.XPATH, "//div[contains(@id, 'sp_message_container_')]")))
         find_container = driver.find_element(By.XPATH, "//iframe[contains(@id, 'sp_message_iframe_')]")
@@ -101,6 +138,7 @@ def click_popup(driver):
         driver.implicitly_wait(5)
         WebDriverWait(driver, 20).until(EC.none_of(EC.presence_of_element_located((By.CLASS_NAME, "message-overlay"))))
         log.info("TCF consent button was successfully clicked.")
+        return True
     except TimeoutException:
         log.error("TCF consent button could not be found, trying again.")
         try:
@@ -110,16 +148,92 @@ def click_popup(driver):
             driver.implicitly_wait(5)
             WebDriverWait(driver, 20).until(EC.none_of(EC.presence_of_element_located((By.CLASS_NAME, "message-overlay"))))
             log.info("TCF consent button was successfully clicked.")
+            return True
         except TimeoutException:
             log.error("TCF consent button could not be found, connection timed out.")    
     except NoSuchElementException:
         pass
-    return driver
+    return False
+
+def load_in_browser(browser, url):
+    with rate_limiter.request(url, POLITE_RATE, POLITE_JITTER):
+        browser.get(url)
+    host = hostname_of(url)
+    if host not in browser.consented_hosts and not recording.replaying:
+        # remembered even if the click timed out, so that a site without a banner only costs us once per
+        # browser, and not at all once its profile says so
+        if host_profiles.needs_consent(url) is not False:
+            with metrics.timer('consent_click', url):
+                host_profiles.consent_checked(url, click_popup(browser.driver))
+        browser.consented_hosts.add(host)
+    return settled_page_source(browser, url)
+
+def settled_page_source(browser, url):
+    # the page once its scripts have run, which is also what gets recorded, so a replayed page needs no waiting
+    if recording.replaying:
+        return browser.page_source
+    browser.wait_until_ready(url, BROWSER_SETTLE_TIME)
+    page_source = browser.page_source
+    if recording.recording:
+        recording.record_page(url, page_source)
+    return page_source
+
+def http_get(url, **kwargs):
+    # every download made with requests passes through here, so that it can be recorded or replayed
+    if recording.replaying:
+        return recording.replay_response(url)
+    response = http_cache.get(url, **kwargs)
+    if recording.recording:
+        recording.record_response(url, response)
+    return response
+
+def download(url, **kwargs):
+    # drop-in for trafilatura.fetch_url, using the shared session and the HTTP cache, if configured
+    try:
+        response = http_get(url, timeout=DOWNLOAD_TIMEOUT)
+    except requests.RequestException as e:
+        log.error(f"{url} could not be downloaded ({e}).")
+        return None
+    if response.status_code != 200 or len(response.content) == 0:
+        log.error(f"{url} returned status {response.status_code}.")
+        return None
+    return decode_content(response.content, response.headers)
+
+def download_homepage(url, **kwargs):
+    with metrics.timer('homepage_fetch', url):
+        downloaded = download(url, **kwargs)
+    if downloaded is None:
+        metrics.error('homepage_fetch', url)
+    return downloaded
+
+_feed_downloads = {'users': 0, 'fetch_url': None}
+_feed_downloads_lock = threading.Lock()
+
+@contextmanager
+def feed_downloads():
+    # trafilatura's feed discovery downloads the homepage and its feeds itself and takes no fetcher,
+    # so its fetch_url is swapped for download_homepage while any homepage is being discovered
+    with _feed_downloads_lock:
+        if _feed_downloads['users'] == 0:
+            _feed_downloads['fetch_url'] = feeds.fetch_url
+            feeds.fetch_url = download_homepage
+        _feed_downloads['users'] += 1
+    try:
+        yield
+    finally:
+        with _feed_downloads_lock:
+            _feed_downloads['users'] -= 1
+            if _feed_downloads['users'] == 0:
+                feeds.fetch_url = _feed_downloads['fetch_url']
 
 ### TRAFILATURA PIPELINE
 
 def get_article_urls_trafilatura_pipeline(homepage_url):
-    article_url_list = feeds.find_feed_urls(homepage_url)
+    # includes the downloads of the homepage and its feeds, which are also timed as homepage_fetch
+    with metrics.timer('link_extraction', homepage_url):
+        with feed_downloads():
+            article_url_list = unique_urls(feeds.find_feed_urls(homepage_url))
+    metrics.count('links_found', homepage_url, len(article_url_list))
     if len(article_url_list) != 0:
         log.info(f'{homepage_url}: {len(article_url_list)} articles were found.\r')
     else:
@@ -129,134 +243,137 @@ def get_article_urls_trafilatura_pipeline(homepage_url):
 
 
 
-def get_article_metadata_chain_trafilatura_pipeline(article_url_list):
+def fetch_article(article_url, fetch=None):
+    # one article of the trafilatura pipeline, or None if it could not be downloaded
+    if fetch is None:
+        fetch = download
+    try:
+        with metrics.timer('article_fetch', article_url):
+            with rate_limiter.request(article_url):
+                downloaded = fetch(article_url)
+    except Exception as e:
+        log.warning(f"{article_url} could not be downloaded ({e}). Continuing to next URL.")
+        return None
+    if downloaded is None:
+        metrics.error('article_fetch', article_url)
+    return downloaded
+
+
+def stream_articles(article_url_list, workers=DEFAULT_FETCH_WORKERS, fetch=None):
+    # yields (position in article_url_list, download) pairs as the downloads finish. Only articles within
+    # workers * IN_FLIGHT_PER_WORKER positions of the oldest unfinished one are started, and a download is
+    # let go of once it is handed on, so memory stays the same however many articles a homepage has
+    if len(article_url_list) == 0:
+        return
+    workers = max(1, min(int(workers), len(article_url_list)))
+    window = workers * IN_FLIGHT_PER_WORKER
+    pending = {}
+    next_index = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor, tqdm(total=len(article_url_list), colour="white") as progress:
+        while pending or next_index < len(article_url_list):
+            oldest = min(pending.values(), default=next_index)
+            while next_index < len(article_url_list) and next_index < oldest + window:
+                pending[executor.submit(fetch_article, article_url_list[next_index], fetch)] = next_index
+                next_index += 1
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            while done:
+                future = done.pop()
+                index = pending.pop(future)
+                downloaded = future.result()
+                del future
+                progress.update(1)
+                yield index, downloaded
+                del downloaded
+
+
+def fetch_articles(article_url_list, workers=DEFAULT_FETCH_WORKERS, fetch=None):
+    downloads = [None] * len(article_url_list)
+    for index, downloaded in stream_articles(article_url_list, workers, fetch):
+        downloads[index] = downloaded
+    return downloads
+
+
+def in_url_order(indexed_results):
+    # holds back results that finish early until those of all earlier URLs are through
+    waiting = {}
+    next_index = 0
+    for index, result in indexed_results:
+        waiting[index] = result
+        while next_index in waiting:
+            yield next_index, waiting.pop(next_index)
+            next_index += 1
+
+
+def extraction_observer(article_url_list):
+    # extraction_pool only knows the positions in article_url_list
+    def observe(index, seconds, metadata):
+        metrics.observe('extraction', article_url_list[index], seconds)
+        if metadata is None:
+            metrics.error('extraction', article_url_list[index])
+        host_profiles.extracted(article_url_list[index], metadata is not None)
+    return observe
+
+
+def metadata_columns():
     metadata_config = retrieve_config("metadata")
     metadata_wanted = [k for k,v in metadata_config.items() if v == True]
     metadata_wanted.append('datetime')
-    article_list = []
-    for article_url in tqdm(article_url_list, colour="white"):
-        downloaded = trafilatura.fetch_url(article_url)
-        metadata = trafilatura.bare_extraction(downloaded, only_with_metadata=True, include_links=True)
-        if metadata is not None:
-            metadata = metadata.as_dict()
-            dict_keys = list(metadata.keys())
-            dict_keys_to_pop = [key for key in dict_keys if key not in metadata_wanted]
-            if len(dict_keys_to_pop) != 0:
-                for key in dict_keys_to_pop: 
-                    metadata.pop(key, None)
-            else:
-                metadata = metadata
-            datetime = time.strftime(r"%Y%m%d-%H%M")
-            datetime_column = {'datetime':datetime}
-            metadata.update(datetime_column)
-        else:
-            metadata = []
-        if len(metadata) != 0:
-            for k,v in metadata.items():
-                        if k == 'text':
-                            v_new = v.replace('"',"“").replace("'","’").replace("\n","[¶]") # will this cause issues with URLs later? maybe!
-                            v = f'"{v_new}"'
-                            k_v_new ={k:v}
-                            metadata.update(k_v_new)
-                        elif k == 'comments':
-                            v_new = v.replace('"',"“").replace("'","’").replace("\n","[¶]") # will this cause issues with URLs later? maybe!
-                            v = f'"{v_new}"'
-                            k_v_new ={k:v}
-                            metadata.update(k_v_new)
-                        else:
-                            pass     
-        article_list.append(metadata)
-    try:
-        df = pd.DataFrame(article_list, columns = metadata_wanted)
+    return metadata_wanted
+
+
+def metadata_dataframe(article_list, metadata_wanted):
+    df = postprocess_metadata(pd.DataFrame(article_list, columns = metadata_wanted), metadata_wanted)
+    if df.shape[0] != 0:
         log.info(f'{df.shape[0]} articles with metadata were found.')
-    except ValueError or TypeError:
-        df = pd.DataFrame(columns=metadata_wanted)
-        log.error('No articles with metadata were found.')
+    else:
+        log.error(f'No articles with metadata were found.')
     return df
 
+
+def iter_article_metadata_trafilatura_pipeline(article_url_list, metadata_wanted, workers=DEFAULT_FETCH_WORKERS, fetch=None):
+    # yields (article URL, metadata) for every extracted article, in URL order, as soon as it is ready
+    downloads = stream_articles(article_url_list, workers, fetch)
+    extracted = extraction_pool.extract(downloads, extraction_observer(article_url_list), include_links=True, fields=metadata_wanted)
+    for index, metadata in in_url_order(extracted):
+        if metadata is not None:
+            yield article_url_list[index], metadata
+
+
+def get_article_metadata_chain_trafilatura_pipeline(article_url_list, workers=DEFAULT_FETCH_WORKERS, fetch=None):
+    metadata_wanted = metadata_columns()
+    article_list = [metadata for _, metadata in iter_article_metadata_trafilatura_pipeline(article_url_list, metadata_wanted, workers, fetch)]
+    return metadata_dataframe(article_list, metadata_wanted)
+
 ### BEAUTIFULSOUP PIPELINE
 
-def get_article_urls_bs_pipeline(homepage):
+def homepage_links(homepage_url, downloaded, parser=None):
+    with metrics.timer('link_extraction', homepage_url):
+        hrefs = anchor_hrefs(downloaded, parser)
+        return link_normalizer(homepage_url).links(hrefs)
+
+
+def get_article_urls_bs_pipeline(homepage, parser=None):
     article_url_list = []
     if len(homepage) < 80:
-        sites_blocked_trafilatura = ["https://www.spiegel.de/"]
-        sites_requiring_javascript = ["https://www.handelsblatt.com/", "https://www.derstandard.at/", "https://www.wiwo.de/"]
-        if homepage not in sites_blocked_trafilatura and homepage not in sites_requiring_javascript:
-            downloaded = trafilatura.fetch_url(homepage)
-        else:
-            r = requests.get(homepage, timeout=5)
-            if r.status_code == requests.codes.ok:                
-                downloaded = r.text
-                r.close()
-                time.sleep(float(decimal.Decimal(random.randrange(100, 400))/100))
-            else:
-                r.raise_for_status()
-                downloaded = ""
-            javascript_search = re.search('enable JavaScript', downloaded)
-            if homepage in sites_requiring_javascript or javascript_search:
-                log.info(f"{homepage}: turning on JavaScript.")
-                options = webdriver.ChromeOptions()
-                options.add_argument('--headless=new') # comment out if you want to see what's happening
-                options.add_argument('--log-level=3')
-                # options.add_argument('--lang=en')
-                options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:134.0) Gecko/20100101 Firefox/134.0')
-                options.add_experimental_option('excludeSwitches', ['enable-logging'])
-                options.add_argument('--enable-javascript')              
-                driver = webdriver.Chrome(options=options)
-                driver.get(homepage)
-                time.sleep(float(decimal.Decimal(random.randrange(100, 400))/100)) # randomize float 
-                old_driver = driver
-                driver = click_popup(old_driver)
-                time.sleep(float(decimal.Decimal(random.randrange(100, 400))/100)) # randomize float 
-                downloaded = driver.page_source
-                driver.quit()
         homepage_url = homepage
+        downloaded = None
+        if not host_profiles.needs_browser(homepage):
+            with rate_limiter.request(homepage, POLITE_RATE, POLITE_JITTER):
+                downloaded = download_homepage(homepage)
+            if downloaded is not None and not browser_wall(downloaded):
+                article_url_list = homepage_links(homepage_url, downloaded, parser)
+            # a homepage without links is most likely one that only renders them with JavaScript
+            host_profiles.plain_fetch(homepage, len(article_url_list) != 0)
+        if len(article_url_list) == 0:
+            log.info(f"{homepage}: turning on JavaScript.")
+            with driver_pool.driver() as pooled:
+                with metrics.timer('homepage_fetch', homepage):
+                    downloaded = load_in_browser(pooled, homepage)
+            article_url_list = homepage_links(homepage_url, downloaded, parser)
     else:
         downloaded = homepage
-    try:
-        soup = BeautifulSoup(downloaded, 'html.parser')
-    except TypeError as e:
-        log.info(f"{homepage}: trying again with Selenium.")
-        options = webdriver.ChromeOptions()
-        options.add_argument('--headless=new') # comment out if you want to see what's happening
-        options.add_argument('--log-level=3')
-        # options.add_argument('--lang=en')
-        options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:134.0) Gecko/20100101 Firefox/134.0')
-        options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        driver = webdriver.Chrome(options=options)
-
-        driver.get(homepage)
-        time.sleep(float(decimal.Decimal(random.randrange(100, 400))/100)) # randomize float 
-        downloaded = driver.page_source
-        driver.quit()
-        soup = BeautifulSoup(downloaded, 'html.parser')
-    for a in soup.find_all('a'):
-        href = a.get('href')
-        http_check = re.search(r'(http)', f'{href}')
-        if href != None:
-            if http_check == None:
-                http_url = f"{homepage_url}" + f"{href}"
-                double_slash_check = re.search(r"(?<!https:)(//)", http_url)
-                if double_slash_check:
-                    http_url = re.sub(r"(?<!https:)(//)", r"/", http_url)
-                double_de_check = re.search(r"/de/de/", http_url)
-                if double_de_check:
-                    http_url = re.sub(r"/de/de/", r"/de/", http_url)
-                double_url_check = re.search(r"(\/{2}www\..*?){2}", http_url)
-                if double_url_check:
-                    http_url = re.sub(r"\/{2}.*?\/{2}", "//", http_url)
-                article_url_list.append(http_url)
-            else:
-                homepage_de = re.search(r'(https://www\..+?\.\w{2,3}/de/)', homepage_url)
-                if homepage_de:
-                    homepage_split = homepage_de.group(0)
-                else:
-                    homepage_split = re.search(r'(https://www\..+?\.\w{2,3})', homepage_url).group(0)
-                homepage_check = re.search(fr'{homepage_split}/.+', href)
-                if homepage_check:
-                    article_url_list.append(href)
-    article_url_list = list(dict.fromkeys(article_url_list)) # refactor these!
-    article_url_list = list(filter(lambda item: item is not None, article_url_list))
+        article_url_list = homepage_links(homepage_url, downloaded, parser)
+    metrics.count('links_found', homepage_url, len(article_url_list))
     if len(article_url_list) != 0:
         log.info(f'{homepage_url}: {len(article_url_list)} links have been found.\r')
     else:
@@ -268,192 +385,80 @@ def get_article_urls_bs_pipeline(homepage):
     return article_url_list
 
 
+def iter_article_metadata_bs_pipeline(article_url_list, metadata_wanted):
+    with driver_pool.lazy_driver() as browser:
+        downloads = download_articles_bs(article_url_list, browser)
+        extracted = extraction_pool.extract(downloads, extraction_observer(article_url_list), include_links=False, include_comments=True,
+                                            fields=metadata_wanted)
+        for index, metadata in in_url_order(extracted):
+            if metadata is not None:
+                yield article_url_list[index], metadata
+
+
 def get_article_metadata_chain_bs_pipeline(article_url_list):
-    metadata_config = retrieve_config("metadata")
-    metadata_wanted = [k for k,v in metadata_config.items() if v == True]
-    article_list = []
-    metadata_wanted.append('datetime')
-    options = webdriver.ChromeOptions()
-    options.add_argument('--headless=new') # comment out if you want to see what's happening
-    options.add_argument('--log-level=3')
-    #options.add_argument('--lang=en')
-    options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:134.0) Gecko/20100101 Firefox/134.0')
-    options.add_experimental_option('excludeSwitches', ['enable-logging'])
-    options.add_argument('--enable-javascript')              
-    driver = webdriver.Chrome(options=options)
-
-    for article in tqdm(article_url_list, colour="white"):
-        if len(article) < 300:
-            sites_blocked_trafilatura = ["https://www.spiegel.de/"]
-            sites_requiring_javascript = ["https://www.handelsblatt.com/", "https://www.derstandard.at/", "https://www.wiwo.de/"]
-
-            homepage_finder = re.match(r".*?//www\..*?\..{2,3}/?", article)
-            homepage_found = homepage_finder.group()
-            if homepage_found not in sites_blocked_trafilatura and homepage_found not in sites_requiring_javascript:
-                downloaded = trafilatura.fetch_url(article)
-                if downloaded == None:
-                    downloaded = ""
-                if downloaded == None or len(downloaded) < 1:
-                        driver.get(article) 
-                        if article == article_url_list[0]:
-                            old_driver = driver
-                            driver = click_popup(old_driver)
-                            driver = old_driver
-                        time.sleep(float(decimal.Decimal(random.randrange(100, 400))/100)) # randomize float                
-                        downloaded = driver.page_source
-            else:
-                try:
-                    r = requests.get(article, timeout=5)
-                    if r.status_code == requests.codes.ok:                
-                        downloaded = r.text
-                        r.close()
-                        time.sleep(float(decimal.Decimal(random.randrange(100, 400))/100)) # randomize float
-                    else:
-                        r.raise_for_status()
-                except TimeoutError:
-                    log.warning(f"{article} timed out. Continuing to next URL.")
-                    downloaded = ""
-                
-                if downloaded == None:
-                    
-                    driver.get(article) 
-                    if article == article_url_list[0]:
-                        old_driver = driver
-                        driver = click_popup(old_driver)
-                        driver = old_driver
-                    time.sleep(float(decimal.Decimal(random.randrange(100, 400))/100)) # randomize float                
-                    downloaded = driver.page_source
-                   
-                else: # Handelsblatt, Der Standard
-                    try:
-                        driver.get(article) 
-                        if article == article_url_list[0]:
-                            old_driver = driver
-                            driver = click_popup(old_driver)
-                            driver = old_driver
-                        time.sleep(float(decimal.Decimal(random.randrange(100, 400))/100)) # randomize float                
-                        downloaded = driver.page_source
-                    except TimeoutError:
-                        log.warning(f"{article} timed out. Continuing to next URL.")
-                        downloaded = ""
-                    
-        else:
-            downloaded = article
-
-        if downloaded != None:
-            javascript_search = re.match('enable Javascript', downloaded)
-            if javascript_search:
-                options = webdriver.ChromeOptions()
-                options.add_argument('headless=new') # comment out if you want to see what's happening
-                options.add_argument('--log-level=3')
-                options.add_argument("--enable-javascript")              
-                options.add_argument('--lang=en')
-                options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:134.0) Gecko/20100101 Firefox/134.0')
-                options.add_experimental_option('excludeSwitches', ['enable-logging'])
-                driver = webdriver.Chrome(options=options)
-                downloaded = driver.page_source
-            metadata = trafilatura.bare_extraction(downloaded, only_with_metadata=True, include_links=False, include_comments=True)
-            if metadata != None:
-                metadata = metadata.as_dict()
-                dict_keys = list(metadata.keys())
-                dict_keys_to_pop = [key for key in dict_keys if key not in metadata_wanted]
-                if len(dict_keys_to_pop) != 0:
-                    for key in dict_keys_to_pop: 
-                        metadata.pop(key, None)
-                else:
-                    metadata = metadata
-                datetime = time.strftime(r"%Y%m%d-%H%M")
-                datetime_column = {'datetime':datetime}
-                metadata.update(datetime_column)
-            else:
-                metadata = {}
-        else:  
-            metadata = {}
-        if len(metadata) != 0:
-            
-            for k,v in metadata.items():
-                if k == 'text':
-                    v_new = v.replace('"',"“").replace("'","’").replace("\n","[¶]") # will this cause issues with URLs later? maybe!
-                    v = f'"{v_new}"'
-                    k_v_new ={k:v}
-                    metadata.update(k_v_new)
-                elif k == 'comments':
-                    v_new = v.replace('"',"“").replace("'","’").replace("\n","[¶]") # will this cause issues with URLs later? maybe!
-                    v = f'"{v_new}"'
-                    k_v_new ={k:v}
-                    metadata.update(k_v_new)
-                else:
-                    pass
-        if len(metadata) != 0:
-            article_list.append(metadata)
-    df = pd.DataFrame(article_list, columns = metadata_wanted)
-    if df.shape[0] != 0:
-        log.info(f'{df.shape[0]} articles with metadata were found.')
+    metadata_wanted = metadata_columns()
+    article_list = [metadata for _, metadata in iter_article_metadata_bs_pipeline(article_url_list, metadata_wanted)]
+    return metadata_dataframe(article_list, metadata_wanted)
+
+
+def download_article_bs(article, browser):
+    # the browser only steps in if the plain download fails or the site's profile says it is needed
+    started = time.perf_counter()
+    if len(article) < 300:
+        downloaded = None
+        if not host_profiles.needs_browser(article):
+            with rate_limiter.request(article, POLITE_RATE, POLITE_JITTER):
+                downloaded = download(article)
+            if browser_wall(downloaded):
+                log.info(f"{article} asks for JavaScript or consent, turning on JavaScript.")
+                downloaded = None
+            # whether the plain download really worked is only known once it is extracted
+            host_profiles.plain_download(article, downloaded)
+        if not downloaded:
+            try:
+                downloaded = load_in_browser(browser, article)
+            except TimeoutError:
+                log.warning(f"{article} timed out. Continuing to next URL.")
+                downloaded = ""
     else:
-        log.error(f'No articles with metadata were found.')
-    
-    return df
+        downloaded = article
+    if len(article) < 300:
+        metrics.observe('article_fetch', article, time.perf_counter() - started)
+        if not downloaded:
+            metrics.error('article_fetch', article)
+    return downloaded
+
+
+def download_articles_bs(article_url_list, browser):
+    for index, article in enumerate(tqdm(article_url_list, colour="white")):
+        yield index, download_article_bs(article, browser)
+
+
+def fetch_article_bs(article_url):
+    # one article of the beautifulsoup pipeline, borrowing a browser only if it needs one
+    with driver_pool.lazy_driver() as browser:
+        return download_article_bs(article_url, browser)
 
 
 ### Filter-related functions
 
+_url_filter = {'version': None, 'filter': None}
+_url_filter_lock = threading.Lock()
+
+def get_url_filter():
+    # rebuilt only when one of the two filter configs is swapped or edited
+    config_files = [resolve_config_path('filter_choice'), resolve_config_path('filter_sections')]
+    version = tuple((str(config_file), config_registry.version(config_file)) for config_file in config_files)
+    with _url_filter_lock:
+        if _url_filter['version'] != version:
+            _url_filter['filter'] = UrlFilter(config_registry.load(config_files[0], 'filter_choice'),
+                                              config_registry.load(config_files[1], 'filter_sections'))
+            _url_filter['version'] = version
+        return _url_filter['filter']
+
 def filter_urls(article_url_list, filter_choice):
-                     
-    if filter_choice == 'on': 
-        filter_config = retrieve_config('filter_choice')
-        filter_sections = retrieve_config('filter_sections')
-        filter_wanted = [k for k,v in filter_config.items() if v == 'on']
-        filter_sections_wanted = [str(v) for k,v in filter_sections.items() if k in filter_wanted]
-        filter_sections_wanted_clean = [section.replace('-"', '').replace('"', '').split(' ') for section in filter_sections_wanted]
-        
-        
-        url_specific_blacklist = ['https://www.zeit.de/exklusive-zeit-artikel', 'https://www.spiegel.de/__proto_url__', 'https://www.sueddeutsche.de/updates-mobileapps', 'https://www.sueddeutsche.de/updates-rss', 'https://www.sueddeutsche.de/mediadaten']
-        section_blacklist = [term for section in filter_sections_wanted_clean for term in section]
-        regex_blacklist_sections = ""
-
-        for section in section_blacklist:
-            regex_blacklist_sections = f"{regex_blacklist_sections}{section}|" 
-
-        if regex_blacklist_sections[-1] == "|":
-            regex_blacklist_sections = regex_blacklist_sections[:-1]
-        if len(regex_blacklist_sections) != 0:
-            regex_blacklist_sections = fr"\/({regex_blacklist_sections})\/?"
-
-        section_whitelist = ["artikel"]
-
-        regex_whitelist_sections = ""
-
-        for section in section_whitelist:
-            regex_whitelist_sections = f"{regex_whitelist_sections}{section}|" 
-
-        if regex_whitelist_sections[-1] == "|":
-            regex_whitelist_sections = regex_whitelist_sections[:-1]
-        if len(regex_whitelist_sections) != 0:
-            regex_whitelist_sections = fr"\/({regex_whitelist_sections})\/?"
-
-
-        regex_parameters_general = r"((\/.*?){2,}\/$|\/\/www\..*?\..{2,3}\/[^\/]*?$|\/\/www\..*?\..{2}$)"
-        regex_parameters_blacklist_sections = fr"({regex_blacklist_sections})"  
-        regex_parameters_whitelist_sections = fr"({regex_whitelist_sections})"
-
-        filtered_url_list = []
-        removed_url_list = []
-        for article in article_url_list:
-
-            not_viable_article_sections = re.search(regex_parameters_blacklist_sections, article) 
-            viable_article_sections = re.search(regex_parameters_whitelist_sections, article)
-            not_viable_article_general = re.search(regex_parameters_general, article)
-
-            if article not in url_specific_blacklist and viable_article_sections != None:
-                filtered_url_list.append(article)
-            else:
-                if not_viable_article_general == None and not_viable_article_sections == None:
-                    filtered_url_list.append(article)
-                else: 
-                    removed_url_list.append(article)
-                    ### if you want to add in an export
-
-        filtered_url_list = list(dict.fromkeys(filtered_url_list))    
+    if filter_choice == 'on':
+        filtered_url_list = get_url_filter().filter(article_url_list)
         removed = (len(article_url_list)-len(filtered_url_list))
         if removed != 0:
             log.info(f'Removed {removed} URLs.')
@@ -466,7 +471,7 @@ def filter_urls(article_url_list, filter_choice):
 
 ### Export
 
-def export_dataframe(df, homepage_url, output_folder):
+def export_path(homepage_url, output_folder, output_format=DEFAULT_OUTPUT_FORMAT):
     df_name = re.search(r"\..+?\.",f"{homepage_url}").group(0)
     df_name = df_name.replace(".","") 
     timestr = time.strftime(r"%Y%m%d-%H%M")
@@ -474,63 +479,265 @@ def export_dataframe(df, homepage_url, output_folder):
     Path(output_folder).mkdir(exist_ok=True)
     output_subfolder = Path(output_folder/df_name)
     Path(output_subfolder).mkdir(exist_ok=True)
+    df_path = output_subfolder/f"{timestr}-{df_name}"
+    # a second export within the same minute gets its own file instead of replacing the first
+    suffix = SINKS[output_format].suffix
+    number = 1
+    while Path(f"{df_path}{suffix}").exists() or Path(f"{df_path}{suffix}.part").exists():
+        number += 1
+        df_path = output_subfolder/f"{timestr}-{df_name}-{number}"
+    return df_path
+
+def index_articles(output_folder, homepage_url, articles=(), skipped_url_list=(), seen_at=None):
+    # the index only helps queries, so a locked or broken index must not cost us the export
     try:
-        df_path = Path(f"{output_subfolder}/{timestr}-{df_name}.csv")
-        df.to_csv(df_path, index=False, mode='a', encoding="utf-8")
-        filesize_byte = os.path.getsize(df_path)
-        filesize = int(filesize_byte) / 1000
-        if filesize <= 10:
-            log.warning(f'Caution! Suspiciously small file generated at: {df_path} @ {filesize} KB')
-        else:
-            log.info(f'File generated at: {df_path} @ {filesize} KB')
-    except:
-        log.error('Unexpected error occurred. File could not be generated.')
+        article_index = open_article_index(output_folder)
+        try:
+            article_index.record(articles, hostname_of(homepage_url), seen_at)
+            article_index.touch(skipped_url_list)
+        finally:
+            article_index.close()
+    except sqlite3.Error as e:
+        log.warning(f"{homepage_url}: the article index could not be updated ({e}).")
+
+def export_metadata(articles, homepage_url, output_folder, columns, output_format=DEFAULT_OUTPUT_FORMAT, postprocess=True, escape=None,
+                    seen_index=None):
+    # articles are (article URL, metadata) pairs and may come from a generator, which is then
+    # written out while the articles are still being extracted; escape=None escapes CSV only
+    if output_format == 'archive':
+        path = archive_path(homepage_url, output_folder)
+    else:
+        path = export_path(homepage_url, output_folder, output_format)
+    datetime = time.strftime(r"%Y%m%d-%H%M")
+    transform = None
+    if escape is None:
+        escape = output_format == 'csv'
+    if postprocess:
+        transform = lambda df: postprocess_metadata(df, columns, datetime, escape=escape)
+    indexed = []
+    writing = 0.0 # time spent exporting, leaving out the wait for the articles
+    with open_sink(path, columns, output_format, transform=transform) as sink:
+        for article_url, metadata in articles:
+            started = time.perf_counter()
+            sink.write(metadata)
+            indexed.append((article_url, {key: metadata.get(key) for key in ('url', 'title', 'date')}))
+            writing += time.perf_counter() - started
+        started = time.perf_counter()
+    df_path = sink.path
+    if seen_index is not None:
+        # only once the file is complete, so that an interrupted export is collected again
+        seen_index.mark([article_url for article_url, _ in indexed if article_url is not None])
+    index_articles(output_folder, homepage_url, indexed, seen_at=seen_time(datetime) if postprocess else None)
+    metrics.observe('export', homepage_url, writing + time.perf_counter() - started)
+    metrics.count('articles_exported', homepage_url, sink.rows)
+    if sink.rows != 0:
+        log.info(f'{sink.rows} articles with metadata were found.')
+    else:
+        log.error(f'No articles with metadata were found.')
+    filesize_byte = os.path.getsize(df_path)
+    filesize = int(filesize_byte) / 1000
+    if filesize <= 10:
+        log.warning(f'Caution! Suspiciously small file generated at: {df_path} @ {filesize} KB')
+    else:
+        log.info(f'File generated at: {df_path} @ {filesize} KB')
+    return df_path
+
+def export_dataframe(df, homepage_url, output_folder, output_format=DEFAULT_OUTPUT_FORMAT):
+    try:
+        articles = ((None, metadata) for metadata in df.to_dict('records'))
+        df_path = export_metadata(articles, homepage_url, output_folder, list(df.columns), output_format, postprocess=False)
+    except Exception:
+        log.exception('Unexpected error occurred. File could not be generated.')
+        df_path = None
     return df_path
 
 ### CHAINED PIPELINES
 
-def chained_trafilatura_pipeline(homepage_url, filter_choice, output_folder):
+def skip_seen_urls(seen_index, article_url_list, refetch_after=None):
+    new_url_list, skipped_url_list = seen_index.split(article_url_list, refetch_after)
+    if len(skipped_url_list) != 0:
+        log.info(f'Skipped {len(skipped_url_list)} URLs that were already collected, {len(new_url_list)} URLs remain.')
+    return new_url_list, skipped_url_list
+
+def chained_trafilatura_pipeline(homepage_url, filter_choice, output_folder, workers=DEFAULT_FETCH_WORKERS, skip_seen=False, refetch_after=None,
+                                 output_format=DEFAULT_OUTPUT_FORMAT, escape=None):
     article_url_list = get_article_urls_trafilatura_pipeline(homepage_url)
-    filtered_url_list = filter_urls(article_url_list, filter_choice)
-    df = get_article_metadata_chain_trafilatura_pipeline(filtered_url_list)
-    df_path = export_dataframe(df, homepage_url, output_folder)
+    with metrics.timer('filtering', homepage_url):
+        filtered_url_list = filter_urls(article_url_list, filter_choice)
+    metrics.count('links_kept', homepage_url, len(filtered_url_list))
+    metadata_wanted = metadata_columns()
+    seen_index = open_seen_index(output_folder) if skip_seen else None
+    try:
+        if seen_index is not None:
+            filtered_url_list, skipped_url_list = skip_seen_urls(seen_index, filtered_url_list, refetch_after)
+            # still on the homepage, which is what the article index's last_seen measures
+            index_articles(output_folder, homepage_url, skipped_url_list=skipped_url_list)
+        rows = iter_article_metadata_trafilatura_pipeline(filtered_url_list, metadata_wanted, workers)
+        df_path = export_metadata(rows, homepage_url, output_folder, metadata_wanted, output_format, escape=escape, seen_index=seen_index)
+    finally:
+        if seen_index is not None:
+            seen_index.close()
     return df_path
 
-def chained_beautifulsoup_pipeline(homepage_url, filter_choice, output_folder):
-    article_url_list = get_article_urls_bs_pipeline(homepage_url)
-    filtered_url_list = filter_urls(article_url_list, filter_choice)
-    df = get_article_metadata_chain_bs_pipeline(filtered_url_list)
-    df_path = export_dataframe(df, homepage_url, output_folder)             
+def chained_beautifulsoup_pipeline(homepage_url, filter_choice, output_folder, skip_seen=False, refetch_after=None,
+                                   output_format=DEFAULT_OUTPUT_FORMAT, parser=None, escape=None):
+    article_url_list = get_article_urls_bs_pipeline(homepage_url, parser)
+    with metrics.timer('filtering', homepage_url):
+        filtered_url_list = filter_urls(article_url_list, filter_choice)
+    metrics.count('links_kept', homepage_url, len(filtered_url_list))
+    metadata_wanted = metadata_columns()
+    seen_index = open_seen_index(output_folder) if skip_seen else None
+    try:
+        if seen_index is not None:
+            filtered_url_list, skipped_url_list = skip_seen_urls(seen_index, filtered_url_list, refetch_after)
+            # still on the homepage, which is what the article index's last_seen measures
+            index_articles(output_folder, homepage_url, skipped_url_list=skipped_url_list)
+        rows = iter_article_metadata_bs_pipeline(filtered_url_list, metadata_wanted)
+        df_path = export_metadata(rows, homepage_url, output_folder, metadata_wanted, output_format, escape=escape, seen_index=seen_index)
+    finally:
+        if seen_index is not None:
+            seen_index.close()
     return df_path
 
 ### CONFIG RELATED FUNCTIONS
 
-def get_pipeline_from_config(homepage_url, output_folder):
+def configure_host(homepage_url, data):
+    # the homepage's settings that apply to every download from its site
+    if 'rate' in data or 'jitter' in data:
+        rate_limiter.configure(homepage_url, data.get('rate', POLITE_RATE), data.get('jitter', POLITE_JITTER))
+    page_loads.configure(homepage_url, data.get('browser', DEFAULT_BROWSER_MODE), data.get('wait_for'), data.get('block'))
+
+def get_pipeline_from_config(homepage_url, output_folder, skip_seen=False, refetch_after=None, output_format=DEFAULT_OUTPUT_FORMAT, escape=None):
     homepage_config = retrieve_config('homepage')
     data = homepage_config.get(homepage_url)
     if data:
         pipeline = data.get('pipeline')
         filter_option = data.get('filter')
+        workers = data.get('workers', DEFAULT_FETCH_WORKERS)
+        refetch_after = data.get('refetch_after', refetch_after)
+        configure_host(homepage_url, data)
         log.info(f'{homepage_url} uses the {pipeline} pipeline and has filtering turned {filter_option}.')
         if pipeline == 'trafilatura':
-            chained_trafilatura_pipeline(homepage_url, filter_option, output_folder)
+            return chained_trafilatura_pipeline(homepage_url, filter_option, output_folder, workers, skip_seen, refetch_after, output_format,
+                                                escape)
         elif pipeline == 'beautifulsoup':
-            chained_beautifulsoup_pipeline(homepage_url, filter_option, output_folder)
+            return chained_beautifulsoup_pipeline(homepage_url, filter_option, output_folder, skip_seen, refetch_after, output_format,
+                                                  data.get('parser'), escape)
         else:
             log.error('Please check the pipeline information given for this URL.')
     else:
         log.error(f"Please check that the URL you have given ({homepage_url}) matches the required structure (https://www.name.de/) "
                   "and has already been added to the config. Otherwise add it to the config via the CLI "
                   "with 'newsfeedback add-homepage-url'. Data may be coming from an unintended config (default/custom). ")
-    
+    return None
+
+def homepage_job(homepage_url, output_folder, skip_seen=False, refetch_after=None, output_format=DEFAULT_OUTPUT_FORMAT, escape=None):
+    # the steps of the chained pipelines, cut up for the asyncio engine
+    data = retrieve_config('homepage').get(homepage_url)
+    if not data or data.get('pipeline') not in ('trafilatura', 'beautifulsoup'):
+        log.error(f"Please check that {homepage_url} has been added to the config with one of the pipelines trafilatura or beautifulsoup.")
+        return None
+    pipeline = data.get('pipeline')
+    filter_option = data.get('filter')
+    refetch_after = data.get('refetch_after', refetch_after)
+    configure_host(homepage_url, data)
+    log.info(f'{homepage_url} uses the {pipeline} pipeline and has filtering turned {filter_option}.')
+    metadata_wanted = metadata_columns()
+    if pipeline == 'trafilatura':
+        get_article_urls = get_article_urls_trafilatura_pipeline
+        fetch = fetch_article
+        options = {'include_links': True, 'fields': metadata_wanted}
+        per_host = data.get('workers', DEFAULT_FETCH_WORKERS)
+    else:
+        get_article_urls = lambda homepage_url: get_article_urls_bs_pipeline(homepage_url, data.get('parser'))
+        fetch = fetch_article_bs
+        options = {'include_links': False, 'include_comments': True, 'fields': metadata_wanted}
+        per_host = 1 # one page after the other, as download_articles_bs loads them
+    seen_index = open_seen_index(output_folder) if skip_seen else None
+
+    def discover():
+        article_url_list = get_article_urls(homepage_url)
+        with metrics.timer('filtering', homepage_url):
+            filtered_url_list = filter_urls(article_url_list, filter_option)
+        metrics.count('links_kept', homepage_url, len(filtered_url_list))
+        if seen_index is not None:
+            filtered_url_list, skipped_url_list = skip_seen_urls(seen_index, filtered_url_list, refetch_after)
+            index_articles(output_folder, homepage_url, skipped_url_list=skipped_url_list)
+        return filtered_url_list
+
+    def export(rows):
+        return export_metadata(rows, homepage_url, output_folder, metadata_wanted, output_format, escape=escape, seen_index=seen_index)
+
+    def extracted(article_url, metadata):
+        host_profiles.extracted(article_url, metadata is not None)
+
+    return HomepageJob(homepage_url, discover, fetch, export, options, per_host, seen_index.close if seen_index is not None else None,
+                       extracted)
+
+def configure_host_profiles():
+    # next to the user configs, unless a test or an embedding program has chosen a file already
+    if host_profiles.path is None:
+        host_profiles.configure(resolve_config_path('host_profiles'))
+
+def configure_recording(record_folder=None, replay_folder=None):
+    if record_folder and replay_folder:
+        raise click.UsageError("--record and --replay cannot be combined.")
+    if replay_folder:
+        recording.configure(replay_folder, 'replay')
+        driver_pool.configure(factory=lambda: ReplayDriver(recording))
+        rate_limiter.enabled = False
+        host_profiles.enabled = False
+    elif record_folder:
+        recording.configure(record_folder, 'record')
+
 @cli.command(help="Chooses and executes the pipeline saved in the config file.")
 @click.option('-u','--homepage-url',
               help='This is the URL you extract the article URLs from.')
 @click.option('-o', '--output-folder', default='newsfeedback/output',
               help="Defaults to newsfeedback's output folder.")
-
-def pipeline_picker(homepage_url, output_folder):
-    get_pipeline_from_config(homepage_url, output_folder)
+@click.option('--skip-seen', is_flag=True, default=False,
+              help="Only extract articles that are not yet listed in the output folder's index of collected URLs.")
+@click.option('--refetch-after', type=float, default=None,
+              help="With --skip-seen, extract already collected articles again after this many hours.")
+@click.option('--http-cache', 'http_cache_folder', default=None,
+              help="Cache downloaded pages in this folder and only download them again if they have changed.")
+@click.option('--http-cache-size', default=DEFAULT_MAX_BYTES // 1000000, show_default=True,
+              help="Size of the HTTP cache in MB. The least recently used pages are removed beyond it.")
+@click.option('--extract-workers', default=DEFAULT_EXTRACT_WORKERS, show_default="all cores but one",
+              help="How many processes extract metadata from the downloaded articles. 0 uses all cores, "
+              "1 extracts in the newsfeedback process itself.")
+@click.option('--output-format', type=click.Choice(OUTPUT_FORMATS), default=DEFAULT_OUTPUT_FORMAT, show_default=True,
+              help="Write the metadata as CSV, as Parquet or into the output folder's hostname/day-partitioned "
+              "Parquet archive (the latter two need pyarrow).")
+@click.option('--escape/--no-escape', default=None,
+              help="Replace quotes and line breaks in text and comments and wrap them in quotes, as the first CSV exports did. "
+              "Defaults to escaping CSV only.")
+@click.option('--record', 'record_folder', default=None,
+              help="Store every downloaded homepage and article in this folder, to replay them later with --replay.")
+@click.option('--replay', 'replay_folder', type=click.Path(exists=True, file_okay=False), default=None,
+              help="Answer every download from a folder recorded with --record, without going online.")
+@click.option('--metrics-report', 'report_file', type=click.Path(dir_okay=False), default=None,
+              help="Write the timings, counts and errors of every pipeline stage per hostname to this JSON file after each run.")
+@click.option('--prometheus-file', type=click.Path(dir_okay=False), default=None,
+              help="Keep the stage metrics in this file in Prometheus' text format, e.g. for node-exporter's textfile collector.")
+
+def pipeline_picker(homepage_url, output_folder, skip_seen, refetch_after, http_cache_folder, http_cache_size, extract_workers, output_format,
+                    escape, record_folder, replay_folder, report_file, prometheus_file):
+    if http_cache_folder:
+        http_cache.configure(http_cache_folder, http_cache_size * 1000000)
+    extraction_pool.configure(extract_workers)
+    configure_host_profiles()
+    configure_recording(record_folder, replay_folder)
+    metrics.configure(report_file, prometheus_file)
+    metrics.start_run()
+    try:
+        get_pipeline_from_config(homepage_url, output_folder, skip_seen, refetch_after, output_format, escape)
+    finally:
+        host_profiles.save()
+        metrics.finish_run()
+        recording.log_stats()
+        driver_pool.shutdown()
+        extraction_pool.shutdown()
 
 def copy_default_to_metadata_config(answer, tmp_path=False):
     if (answer != "Y" or answer != "y") and answer != "testing_tmp_path":
@@ -677,24 +884,323 @@ def write_in_homepage_config(homepage_url, chosen_pipeline, filter_option, tmp_p
 def add_homepage_url(homepage_url, chosen_pipeline, filter_option):
     write_in_homepage_config(homepage_url, chosen_pipeline, filter_option)
 
-def initiate_data_collection(output_folder):
-    homepage_config = retrieve_config('homepage')
-    homepage_url_list = list(homepage_config.keys())
+def collect_homepage(homepage_url, output_folder, skip_seen=False, refetch_after=None, output_format=DEFAULT_OUTPUT_FORMAT, escape=None):
+    started = time.monotonic()
+    result = {'homepage': homepage_url, 'status': 'failed', 'path': None, 'error': None}
+    try:
+        df_path = get_pipeline_from_config(homepage_url, output_folder, skip_seen, refetch_after, output_format, escape)
+        if df_path is not None:
+            result.update({'status': 'ok', 'path': str(df_path)})
+    except Exception as e:
+        # one broken site must not take the other homepages of the run down with it
+        log.exception(f'{homepage_url}: data collection failed.')
+        result['error'] = repr(e)
+    result['seconds'] = round(time.monotonic() - started, 1)
+    return result
+
+def collect_with_engine(homepage_url_list, output_folder, skip_seen=False, refetch_after=None, output_format=DEFAULT_OUTPUT_FORMAT,
+                        concurrency=DEFAULT_CONCURRENCY, escape=None):
+    jobs = {}
     for homepage_url in homepage_url_list:
-        get_pipeline_from_config(homepage_url, output_folder)
+        try:
+            jobs[homepage_url] = homepage_job(homepage_url, output_folder, skip_seen, refetch_after, output_format, escape)
+        except Exception as e:
+            log.exception(f'{homepage_url}: data collection failed.')
+            jobs[homepage_url] = repr(e)
+    collected = iter(CollectionEngine(concurrency).run([job for job in jobs.values() if isinstance(job, HomepageJob)]))
+    return [next(collected) if isinstance(job, HomepageJob) else
+            {'homepage': homepage_url, 'status': 'failed', 'path': None, 'error': job, 'seconds': 0.0}
+            for homepage_url, job in jobs.items()]
+
+def log_run_summary(results, seconds):
+    failed = [result for result in results if result['status'] != 'ok']
+    log.info(f'Collected {len(results) - len(failed)} of {len(results)} homepages in {seconds:.0f}s.')
+    for result in results:
+        log.info(f"{result['homepage']}: {result['status']} after {result['seconds']}s {result['path'] or result['error'] or ''}")
+    if len(failed) != 0:
+        log.error(f"Data collection failed for: {[result['homepage'] for result in failed]}")
+
+def homepage_intervals(default_interval):
+    # hours between two runs of every homepage in the config
+    intervals = {}
+    for homepage_url, data in retrieve_config('homepage').items():
+        interval = (data or {}).get('interval', default_interval)
+        if not isinstance(interval, (int, float)) or interval <= 0:
+            interval = default_interval
+        intervals[homepage_url] = interval
+    return intervals
+
+def initiate_data_collection(output_folder, skip_seen=False, refetch_after=None, workers=1, output_format=DEFAULT_OUTPUT_FORMAT,
+                             engine='threads', concurrency=DEFAULT_CONCURRENCY, homepage_url_list=None, escape=None):
+    if homepage_url_list is None:
+        homepage_url_list = list(retrieve_config('homepage').keys())
+    started = time.monotonic()
+    metrics.start_run()
+    if engine == 'asyncio':
+        results = collect_with_engine(homepage_url_list, output_folder, skip_seen, refetch_after, output_format, concurrency, escape)
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, int(workers))) as executor:
+            results = list(executor.map(lambda homepage_url: collect_homepage(homepage_url, output_folder, skip_seen, refetch_after, output_format,
+                                                                              escape),
+                                        homepage_url_list))
+    log_run_summary(results, time.monotonic() - started)
+    rate_limiter.log_stats()
+    rate_limiter.reset_stats()
+    host_profiles.save()
+    metrics.finish_run(results)
+    return results
 
 @cli.command(help="Runs the full pipeline for the URLs saveds in either the user or default "
               "config file on schedule.")
 @click.option('-t', '--hour', default='6',
-              help='Run data extraction once every X hours. This is X, but defaults to 6.')
+              help='Run data extraction once every X hours. This is X, but defaults to 6. A homepage\'s interval '
+              'setting overrides it.')
+@click.option('--missed-runs', type=click.Choice(MISSED_RUNS), default='catch-up', show_default=True,
+              help="What happens to a homepage's runs that were due while an earlier run was still going: one run "
+              "right after it makes up for all of them, or they are skipped until the next slot.")
 @click.option('-o', '--output-folder', default='newsfeedback/output',
               help="Defaults to newsfeedback's output folder.")
-def get_data(hour, output_folder):
-    initiate_data_collection(output_folder)
-    schedule.every(int(hour)).hours.do(initiate_data_collection, output_folder)
+@click.option('--max-browsers', default=DEFAULT_POOL_SIZE, show_default=True,
+              help="How many Chrome instances may run at the same time. They are shared by all homepages "
+              "and kept between runs.")
+@click.option('--recycle-browser-after', default=DEFAULT_MAX_PAGES, show_default=True,
+              help="Restart a Chrome instance after it has loaded this many pages.")
+@click.option('--skip-seen', is_flag=True, default=False,
+              help="Only extract articles that earlier runs have not collected yet.")
+@click.option('--refetch-after', type=float, default=None,
+              help="With --skip-seen, extract already collected articles again after this many hours.")
+@click.option('--http-cache', 'http_cache_folder', default=None,
+              help="Cache downloaded pages in this folder and only download them again if they have changed.")
+@click.option('--http-cache-size', default=DEFAULT_MAX_BYTES // 1000000, show_default=True,
+              help="Size of the HTTP cache in MB. The least recently used pages are removed beyond it.")
+@click.option('--connections-per-host', default=DEFAULT_CONNECTIONS_PER_HOST, show_default=True,
+              help="How many keep-alive connections to a news site are kept open for reuse.")
+@click.option('--retries', default=DEFAULT_RETRIES, show_default=True,
+              help="How often a failed download (connection errors, 429 and 5xx) is retried, with increasing pauses.")
+@click.option('-w', '--workers', default=1, show_default=True,
+              help="How many homepages are collected at the same time. Each still gets its own CSV.")
+@click.option('--engine', type=click.Choice(ENGINES), default='threads', show_default=True,
+              help="asyncio collects all homepages at once and shares --concurrency downloads among their articles, "
+              "instead of running --workers homepages side by side.")
+@click.option('--concurrency', default=DEFAULT_CONCURRENCY, show_default=True,
+              help="With --engine asyncio, how many downloads may run at the same time. A homepage's own limit is its "
+              "workers setting for the trafilatura pipeline and one page at a time for the beautifulsoup pipeline.")
+@click.option('--extract-workers', default=DEFAULT_EXTRACT_WORKERS, show_default="all cores but one",
+              help="How many processes extract metadata from the downloaded articles. 0 uses all cores, "
+              "1 extracts in the newsfeedback process itself.")
+@click.option('--output-format', type=click.Choice(OUTPUT_FORMATS), default=DEFAULT_OUTPUT_FORMAT, show_default=True,
+              help="Write the metadata as CSV, as Parquet or into the output folder's hostname/day-partitioned "
+              "Parquet archive (the latter two need pyarrow).")
+@click.option('--escape/--no-escape', default=None,
+              help="Replace quotes and line breaks in text and comments and wrap them in quotes, as the first CSV exports did. "
+              "Defaults to escaping CSV only.")
+@click.option('--record', 'record_folder', default=None,
+              help="Store every downloaded homepage and article in this folder, to replay them later with --replay.")
+@click.option('--replay', 'replay_folder', type=click.Path(exists=True, file_okay=False), default=None,
+              help="Answer every download from a folder recorded with --record, without going online.")
+@click.option('--metrics-report', 'report_file', type=click.Path(dir_okay=False), default=None,
+              help="Write the timings, counts and errors of every pipeline stage per hostname to this JSON file after each run.")
+@click.option('--prometheus-file', type=click.Path(dir_okay=False), default=None,
+              help="Keep the stage metrics in this file in Prometheus' text format, e.g. for node-exporter's textfile collector.")
+def get_data(hour, missed_runs, output_folder, max_browsers, recycle_browser_after, skip_seen, refetch_after, http_cache_folder, http_cache_size,
+             connections_per_host, retries, workers, engine, concurrency, extract_workers, output_format, escape, record_folder, replay_folder,
+             report_file, prometheus_file):
+    driver_pool.configure(size=max_browsers, max_pages=recycle_browser_after)
+    extraction_pool.configure(extract_workers)
+    configure_host_profiles()
+    configure_session(connections_per_host=connections_per_host, retries=retries)
+    if http_cache_folder:
+        http_cache.configure(http_cache_folder, http_cache_size * 1000000)
+    configure_recording(record_folder, replay_folder)
+    metrics.configure(report_file, prometheus_file)
+    scheduler = Scheduler(lambda homepage_url_list: initiate_data_collection(output_folder, skip_seen, refetch_after, workers, output_format,
+                                                                             engine, concurrency, homepage_url_list, escape),
+                          lambda: homepage_intervals(float(hour)), missed_runs)
+    try:
+        scheduler.run_forever()
+    finally:
+        recording.log_stats()
+        driver_pool.shutdown()
+        extraction_pool.shutdown()
+
+### WORK QUEUE
+
+def needs_browser(homepage_url, url):
+    # known before the task is queued, so that workers without a browser do not even try
+    data = retrieve_config('homepage').get(homepage_url) or {}
+    return data.get('pipeline') == 'beautifulsoup' and host_profiles.needs_browser(url)
+
+def enqueue_run(task_queue, homepage_url_list, output_folder, skip_seen=False, refetch_after=None, output_format=DEFAULT_OUTPUT_FORMAT,
+                run_id=None, escape=None):
+    run_id = run_id or time.strftime(r"%Y%m%d-%H%M%S")
+    settings = {'output_folder': str(output_folder), 'skip_seen': skip_seen, 'refetch_after': refetch_after, 'output_format': output_format,
+                'escape': escape}
+    task_queue.add_many([(run_id, 'homepage', homepage_url, '', 0, settings, needs_browser(homepage_url, homepage_url))
+                         for homepage_url in homepage_url_list])
+    log.info(f"Queued run {run_id} with {len(homepage_url_list)} homepages in {task_queue.path}.")
+    return run_id
+
+def run_homepage_task(task_queue, task):
+    # finds the homepage's articles and queues one task per article, plus the merge of their results
+    settings = task.payload
+    job = homepage_job(task.homepage_url, settings['output_folder'], settings['skip_seen'], settings['refetch_after'], settings['output_format'],
+                       settings.get('escape'))
+    if job is None:
+        raise ValueError(f"{task.homepage_url} is not in the homepage config.")
+    try:
+        article_url_list = job.discover()
+    finally:
+        if job.close is not None:
+            job.close()
+    article_settings = {'pipeline': retrieve_config('homepage')[task.homepage_url]['pipeline'], 'options': job.extraction_options}
+    follow_ups = [(task.run_id, 'article', task.homepage_url, article_url, position, article_settings,
+                   needs_browser(task.homepage_url, article_url)) for position, article_url in enumerate(article_url_list)]
+    follow_ups.append((task.run_id, 'merge', task.homepage_url, '', 0, dict(settings, columns=job.extraction_options['fields']), False))
+    task_queue.complete(task, len(article_url_list), follow_ups)
+
+def run_article_task(task_queue, task):
+    configure_host(task.homepage_url, retrieve_config('homepage').get(task.homepage_url) or {})
+    if task.payload['pipeline'] == 'trafilatura':
+        downloaded = fetch_article(task.article_url)
+    else:
+        downloaded = fetch_article_bs(task.article_url)
+    metadata = None
+    if downloaded:
+        with metrics.timer('extraction', task.article_url):
+            metadata = extract_or_none(downloaded, **task.payload['options'])
+    host_profiles.extracted(task.article_url, metadata is not None)
+    task_queue.complete(task, metadata)
+
+def run_merge_task(task_queue, task):
+    # the usual per-homepage export, from the articles that the workers have collected
+    settings = task.payload
+    rows = task_queue.results(task.run_id, task.homepage_url)
+    seen_index = open_seen_index(settings['output_folder']) if settings['skip_seen'] else None
+    try:
+        df_path = export_metadata(rows, task.homepage_url, settings['output_folder'], settings['columns'], settings['output_format'],
+                                  escape=settings.get('escape'), seen_index=seen_index)
+    finally:
+        if seen_index is not None:
+            seen_index.close()
+    task_queue.complete(task, str(df_path))
+
+QUEUE_TASKS = {'homepage': run_homepage_task, 'article': run_article_task, 'merge': run_merge_task}
+
+def work_on_queue(task_queue, browser=True, poll_interval=5, exit_when_empty=False, owner=None):
+    owner = owner or f"{socket.gethostname()}-{os.getpid()}"
+    done = 0
     while True:
-        schedule.run_pending()
-        time.sleep(1)
+        task = task_queue.claim(owner, browser)
+        if task is None:
+            if exit_when_empty and not task_queue.has_work(browser):
+                break
+            time.sleep(poll_interval)
+            continue
+        try:
+            QUEUE_TASKS[task.kind](task_queue, task)
+            done += 1
+        except BrowserRequired:
+            log.info(f"{task.article_url or task.homepage_url} needs a browser, handing it over to a worker that has one.")
+            task_queue.require_browser(task)
+        except Exception as e:
+            log.exception(f"{task} failed.")
+            task_queue.fail(task, repr(e))
+        host_profiles.save()
+    log.info(f"{owner} finished {done} tasks, the queue holds {task_queue.counts()}.")
+    return done
+
+@cli.command(help="Splits a collection of the homepages in the config into homepage and article tasks on a queue, "
+              "which any number of 'newsfeedback worker' processes then collect together.")
+@click.option('-u', '--homepage-url', 'homepage_urls', multiple=True,
+              help="Only queue this homepage; can be given several times. Defaults to all homepages in the config.")
+@click.option('-o', '--output-folder', default='newsfeedback/output',
+              help="Defaults to newsfeedback's output folder. Every worker must reach it under the same path.")
+@click.option('--queue', 'queue_path', default=None,
+              help=f"The queue's SQLite file, which every worker must reach (default: {TASK_QUEUE_NAME} in the output folder).")
+@click.option('--skip-seen', is_flag=True, default=False,
+              help="Only extract articles that earlier runs have not collected yet.")
+@click.option('--refetch-after', type=float, default=None,
+              help="With --skip-seen, extract already collected articles again after this many hours.")
+@click.option('--output-format', type=click.Choice(OUTPUT_FORMATS), default=DEFAULT_OUTPUT_FORMAT, show_default=True,
+              help="Write the metadata as CSV, as Parquet or into the output folder's hostname/day-partitioned "
+              "Parquet archive (the latter two need pyarrow).")
+@click.option('--escape/--no-escape', default=None,
+              help="Replace quotes and line breaks in text and comments and wrap them in quotes, as the first CSV exports did. "
+              "Defaults to escaping CSV only.")
+def enqueue(homepage_urls, output_folder, queue_path, skip_seen, refetch_after, output_format, escape):
+    task_queue = TaskQueue(queue_path or Path(output_folder)/TASK_QUEUE_NAME)
+    try:
+        enqueue_run(task_queue, list(homepage_urls) or list(retrieve_config('homepage').keys()), output_folder, skip_seen, refetch_after,
+                    output_format, escape=escape)
+    finally:
+        task_queue.close()
+
+@cli.command(help="Collects the tasks that 'newsfeedback enqueue' has put on a queue, next to any other workers of the same queue.")
+@click.option('-o', '--output-folder', default='newsfeedback/output',
+              help="Only used to find the queue if --queue is not given.")
+@click.option('--queue', 'queue_path', default=None,
+              help=f"The queue's SQLite file (default: {TASK_QUEUE_NAME} in the output folder).")
+@click.option('--browser/--no-browser', default=True, show_default=True,
+              help="Whether this worker may start Chrome. Workers without one hand pages that need it over to workers that have one.")
+@click.option('--max-browsers', default=DEFAULT_POOL_SIZE, show_default=True,
+              help="How many Chrome instances this worker may run at the same time.")
+@click.option('--lease', default=DEFAULT_LEASE, show_default=True,
+              help="Seconds after which other workers may take over a task this worker has not finished, i.e. because it died.")
+@click.option('--poll-interval', default=5.0, show_default=True,
+              help="Seconds to wait before looking for new tasks when there are none.")
+@click.option('--exit-when-empty', is_flag=True, default=False,
+              help="Stop once there is nothing left on the queue for this worker, instead of waiting for new tasks.")
+def worker(output_folder, queue_path, browser, max_browsers, lease, poll_interval, exit_when_empty):
+    driver_pool.configure(size=max_browsers, factory=None if browser else browser_required)
+    configure_host_profiles()
+    task_queue = TaskQueue(queue_path or Path(output_folder)/TASK_QUEUE_NAME, lease)
+    try:
+        work_on_queue(task_queue, browser, poll_interval, exit_when_empty)
+    finally:
+        task_queue.close()
+        driver_pool.shutdown()
+        extraction_pool.shutdown()
+
+@cli.command(name="compact", help="Merges the CSV snapshots of an output folder into its Parquet archive and removes "
+              "duplicate articles from the archive.")
+@click.option('-o', '--output-folder', default='newsfeedback/output',
+              help="Defaults to newsfeedback's output folder.")
+@click.option('--archive-folder', default=None,
+              help="Defaults to the archive folder inside the output folder.")
+@click.option('--delete-snapshots', is_flag=True, default=False,
+              help="Delete the CSV snapshots once they are in the archive.")
+def compact_archive(output_folder, archive_folder, delete_snapshots):
+    homepage_urls = list(retrieve_config('homepage').keys())
+    compact(output_folder, archive_folder, homepage_urls, delete_snapshots)
+
+@cli.command(help="Lists the collected articles from the output folder's article index, with the times they "
+              "were first and last seen on their homepage.")
+@click.option('-o', '--output-folder', default='newsfeedback/output',
+              help="Defaults to newsfeedback's output folder.")
+@click.option('--outlet', default=None,
+              help="Only articles of homepages whose hostname contains this, i.e. faz.")
+@click.option('--since', default=None,
+              help="Only articles first seen on or after this date (YYYY-MM-DD or YYYY-MM-DDTHH:MM).")
+@click.option('--until', default=None,
+              help="Only articles first seen on or before this date (YYYY-MM-DD or YYYY-MM-DDTHH:MM).")
+@click.option('--export', 'export_file', default=None,
+              help="Write the articles to this CSV file instead of printing them.")
+@click.option('--rebuild', is_flag=True, default=False,
+              help="Fill the index again from all CSV snapshots and the archive first.")
+def query(output_folder, outlet, since, until, export_file, rebuild):
+    if rebuild:
+        rebuild_article_index(output_folder, list(retrieve_config('homepage').keys()))
+    article_index = open_article_index(output_folder)
+    try:
+        df = article_index.query(outlet, since, until)
+    finally:
+        article_index.close()
+    log.info(f'{df.shape[0]} articles match.')
+    if export_file:
+        df.to_csv(export_file, index=False, encoding="utf-8")
+        log.info(f'Articles written to {export_file}.')
+    else:
+        click.echo(df.to_csv(index=False))
 
 if __name__ == "main":
     cli()
\ No newline at end of file
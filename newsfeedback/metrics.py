@@ -0,0 +1,198 @@
+""" Timings, counters and errors of newsfeedback's pipeline stages per hostname, written out as a JSON
+report of every run and as a Prometheus text file.
+"""
+import json, os, threading, time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+from loguru import logger as log
+from newsfeedback.politeness import hostname_of
+
+STAGES = ('homepage_fetch', 'link_extraction', 'filtering', 'article_fetch', 'extraction', 'export',
+          'browser_start', 'consent_click')
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+ANY_HOST = "all" # stages that serve every site, such as starting a browser
+
+
+def host_label(url):
+    return hostname_of(url) if url else ANY_HOST
+
+
+class Histogram(object):
+    """ Prometheus-style cumulative buckets of durations in seconds. With keep_values, the single
+    durations are kept as well, for exact percentiles. """
+
+    def __init__(self, keep_values=False):
+        self.buckets = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+        self.values = [] if keep_values else None
+
+    def observe(self, seconds):
+        index = bisect_left(BUCKETS, seconds)
+        if index < len(BUCKETS):
+            self.buckets[index] += 1
+        self.sum += seconds
+        self.count += 1
+        if self.values is not None:
+            self.values.append(seconds)
+
+    def merge(self, other):
+        self.buckets = [mine + theirs for mine, theirs in zip(self.buckets, other.buckets)]
+        self.sum += other.sum
+        self.count += other.count
+
+    def cumulative(self):
+        return list(np.cumsum(self.buckets)) + [self.count]
+
+    def summary(self):
+        summary = {'count': self.count, 'seconds': round(self.sum, 3)}
+        if self.values:
+            summary.update({f"p{q}": round(float(np.percentile(self.values, q)), 3) for q in (50, 90, 99)})
+            summary['max'] = round(max(self.values), 3)
+        return summary
+
+
+class Registry(object):
+    def __init__(self, keep_values=False):
+        self.keep_values = keep_values
+        self.histograms = {}
+        self.counters = {}
+        self.errors = {}
+
+    def histogram(self, host, stage):
+        key = (host, stage)
+        if key not in self.histograms:
+            self.histograms[key] = Histogram(self.keep_values)
+        return self.histograms[key]
+
+    def merge(self, other):
+        for key, histogram in other.histograms.items():
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(self.keep_values)
+            self.histograms[key].merge(histogram)
+        for name in ('counters', 'errors'):
+            mine = getattr(self, name)
+            for key, value in getattr(other, name).items():
+                mine[key] = mine.get(key, 0) + value
+
+    def hosts(self):
+        return sorted({key[0] for name in ('histograms', 'counters', 'errors') for key in getattr(self, name)})
+
+
+class Metrics(object):
+    """ Collects the stages' timings, counters and errors per hostname for the current run. finish_run()
+    writes the run as a JSON report and adds it to the totals since newsfeedback started, which go into the
+    Prometheus text file, so that its counters only ever grow, as Prometheus expects. Both files are optional. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.report_file = None
+        self.prometheus_file = None
+        self.total = Registry()
+        self.start_run()
+
+    def configure(self, report_file=None, prometheus_file=None):
+        with self._lock:
+            self.report_file = Path(report_file) if report_file else None
+            self.prometheus_file = Path(prometheus_file) if prometheus_file else None
+
+    def start_run(self):
+        with self._lock:
+            self.run = Registry(keep_values=True)
+            self.started = time.time()
+
+    def observe(self, stage, url, seconds):
+        with self._lock:
+            self.run.histogram(host_label(url), stage).observe(seconds)
+
+    def count(self, name, url, amount=1):
+        with self._lock:
+            key = (host_label(url), name)
+            self.run.counters[key] = self.run.counters.get(key, 0) + amount
+
+    def error(self, stage, url):
+        with self._lock:
+            key = (host_label(url), stage)
+            self.run.errors[key] = self.run.errors.get(key, 0) + 1
+
+    @contextmanager
+    def timer(self, stage, url=None):
+        """ Times the block as stage of url's hostname, and counts an error if it raises. """
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.error(stage, url)
+            raise
+        finally:
+            self.observe(stage, url, time.perf_counter() - started)
+
+    def report(self, results=None):
+        with self._lock:
+            registry, started = self.run, self.started
+            hosts = {}
+            for host in registry.hosts():
+                hosts[host] = {
+                    'stages': {stage: histogram.summary() for (key_host, stage), histogram in registry.histograms.items() if key_host == host},
+                    'counters': {name: value for (key_host, name), value in registry.counters.items() if key_host == host},
+                    'errors': {stage: value for (key_host, stage), value in registry.errors.items() if key_host == host},
+                }
+        report = {'started': time.strftime(r"%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+                  'finished': time.strftime(r"%Y-%m-%dT%H:%M:%S"), 'seconds': round(time.time() - started, 1), 'hosts': hosts}
+        if results is not None:
+            report['homepages'] = results
+        return report
+
+    def prometheus(self):
+        """ The totals in Prometheus' text exposition format. """
+        lines = ["# HELP newsfeedback_stage_seconds Time spent in a pipeline stage, per hostname.",
+                 "# TYPE newsfeedback_stage_seconds histogram"]
+        with self._lock:
+            registry = self.total
+            for (host, stage), histogram in sorted(registry.histograms.items()):
+                labels = f'host="{host}",stage="{stage}"'
+                for bound, count in zip([str(bound) for bound in BUCKETS] + ["+Inf"], histogram.cumulative()):
+                    lines.append(f'newsfeedback_stage_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f"newsfeedback_stage_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"newsfeedback_stage_seconds_count{{{labels}}} {histogram.count}")
+            lines += ["# HELP newsfeedback_stage_errors_total Failures in a pipeline stage, per hostname.",
+                      "# TYPE newsfeedback_stage_errors_total counter"]
+            lines += [f'newsfeedback_stage_errors_total{{host="{host}",stage="{stage}"}} {value}'
+                      for (host, stage), value in sorted(registry.errors.items())]
+            for name in sorted({name for _, name in registry.counters}):
+                lines += [f"# TYPE newsfeedback_{name}_total counter"]
+                lines += [f'newsfeedback_{name}_total{{host="{host}"}} {value}'
+                          for (host, key_name), value in sorted(registry.counters.items()) if key_name == name]
+        lines += ["# HELP newsfeedback_last_run_timestamp_seconds When the last collection run finished.",
+                  "# TYPE newsfeedback_last_run_timestamp_seconds gauge",
+                  f"newsfeedback_last_run_timestamp_seconds {time.time():.0f}"]
+        return "\n".join(lines) + "\n"
+
+    def finish_run(self, results=None):
+        """ Writes the configured files and starts a new run. Returns the finished run's report. """
+        report = self.report(results)
+        with self._lock:
+            self.total.merge(self.run)
+        try:
+            if self.report_file:
+                write_atomically(self.report_file, json.dumps(report, indent=2, ensure_ascii=False))
+                log.info(f"Run report written to {self.report_file}.")
+            if self.prometheus_file:
+                write_atomically(self.prometheus_file, self.prometheus())
+        except OSError as e:
+            log.warning(f"The metrics could not be written ({e}).")
+        self.start_run()
+        return report
+
+
+def write_atomically(path, text):
+    # node-exporter's textfile collector must never see a half-written file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    part_path = path.with_name(path.name + ".part")
+    part_path.write_text(text, encoding="utf-8")
+    os.replace(part_path, path)
+
+
+metrics = Metrics()
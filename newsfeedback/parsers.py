@@ -0,0 +1,80 @@
+""" Backends that collect the hrefs of a homepage's links, from BeautifulSoup's pure-Python
+html.parser to an lxml pass that never builds a tree.
+"""
+from bs4 import BeautifulSoup, SoupStrainer
+from loguru import logger as log
+
+try:
+    from lxml import etree
+except ImportError: # BeautifulSoup's html.parser needs nothing else
+    etree = None
+
+PARSERS = ('lxml-stream', 'lxml', 'soupstrainer', 'html.parser')
+
+
+class AnchorTarget(object):
+    """ lxml parser target that only keeps the href of every <a> start tag, so the document
+    is read once and no elements are ever created. """
+
+    def __init__(self):
+        self.hrefs = []
+
+    def start(self, tag, attrib):
+        if tag == 'a':
+            href = attrib.get('href')
+            if href is not None:
+                self.hrefs.append(href)
+
+    def close(self):
+        return self.hrefs
+
+
+def hrefs_lxml_stream(html):
+    parser = etree.HTMLParser(target=AnchorTarget())
+    parser.feed(html)
+    return parser.close()
+
+
+def hrefs_lxml(html):
+    if isinstance(html, str): # lxml refuses strings that declare their own encoding
+        html = html.encode("utf-8")
+    try:
+        tree = etree.fromstring(html, etree.HTMLParser(encoding="utf-8"))
+    except etree.ParserError: # an empty document
+        return []
+    return [] if tree is None else [a.get('href') for a in tree.iter('a') if a.get('href') is not None]
+
+
+def hrefs_soupstrainer(html):
+    soup = BeautifulSoup(html, 'lxml' if etree is not None else 'html.parser', parse_only=SoupStrainer('a', href=True))
+    return [a.get('href') for a in soup.find_all('a', href=True)]
+
+
+def hrefs_html_parser(html):
+    return [a.get('href') for a in BeautifulSoup(html, 'html.parser').find_all('a', href=True)]
+
+
+BACKENDS = {'lxml-stream': hrefs_lxml_stream, 'lxml': hrefs_lxml, 'soupstrainer': hrefs_soupstrainer,
+            'html.parser': hrefs_html_parser}
+NEEDS_LXML = ('lxml-stream', 'lxml')
+
+
+def available_parsers():
+    return [parser for parser in PARSERS if etree is not None or parser not in NEEDS_LXML]
+
+
+def default_parser():
+    """ The fastest installed backend. """
+    return available_parsers()[0]
+
+
+def anchor_hrefs(html, parser=None):
+    """ The hrefs of html's links in document order, read with the given backend (default: the fastest
+    installed one). Raises TypeError if there is no document, as BeautifulSoup did. """
+    if not isinstance(html, (str, bytes)):
+        raise TypeError(f"Cannot look for links in {type(html).__name__}.")
+    if parser not in available_parsers():
+        if parser is not None:
+            log.warning(f"The HTML parser '{parser}' is not available, using {default_parser()} instead.")
+        parser = default_parser()
+    return BACKENDS[parser](html)
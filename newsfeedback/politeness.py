@@ -0,0 +1,88 @@
+""" Per-host rate limiting for newsfeedback's downloads.
+"""
+import random, threading, time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from loguru import logger as log
+
+
+def hostname_of(url):
+    return urlsplit(url).hostname or url
+
+
+class HostRateLimiter(object):
+    """ Spaces out requests per hostname, so that different news sites can be fetched
+    at the same time while each one only sees a polite rate. A rate is given in requests
+    per second; jitter adds up to that many random seconds between two requests. """
+
+    def __init__(self):
+        self._settings = {}
+        self._next_slot = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self.enabled = True # off while replaying a recording, as nothing goes over the network
+
+    def configure(self, url, rate=None, jitter=0):
+        host = hostname_of(url)
+        with self._lock:
+            self._settings[host] = (rate, jitter)
+
+    def settings_for(self, url, default_rate=None, default_jitter=0):
+        return self._settings.get(hostname_of(url), (default_rate, default_jitter))
+
+    def reset(self):
+        # forgets every host's settings, reserved slots and statistics
+        with self._lock:
+            self._settings = {}
+            self._next_slot = {}
+            self._stats = {}
+        self.enabled = True
+
+    def wait(self, url, default_rate=None, default_jitter=0):
+        host = hostname_of(url)
+        rate, jitter = self.settings_for(url, default_rate, default_jitter)
+        if not rate or not self.enabled:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot.get(host, now))
+            # reserve the slot before sleeping, so concurrent callers queue up behind it
+            self._next_slot[host] = start + 1 / float(rate) + random.uniform(0, float(jitter or 0))
+        waited = start - now
+        if waited > 0:
+            time.sleep(waited)
+        self._record(host, waited=waited)
+        return waited
+
+    @contextmanager
+    def request(self, url, default_rate=None, default_jitter=0):
+        self.wait(url, default_rate, default_jitter)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._record(hostname_of(url), fetched=time.monotonic() - started)
+
+    def _record(self, host, waited=0, fetched=None):
+        with self._lock:
+            stats = self._stats.setdefault(host, {'requests': 0, 'waiting': 0.0, 'fetching': 0.0})
+            stats['waiting'] += waited
+            if fetched is not None:
+                stats['requests'] += 1
+                stats['fetching'] += fetched
+
+    def stats(self):
+        with self._lock:
+            return {host: dict(stats) for host, stats in self._stats.items()}
+
+    def log_stats(self):
+        for host, stats in sorted(self.stats().items()):
+            log.info(f"{host}: {stats['requests']} requests, {stats['waiting']:.1f}s spent waiting, "
+                     f"{stats['fetching']:.1f}s spent fetching.")
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {}
+
+
+rate_limiter = HostRateLimiter()
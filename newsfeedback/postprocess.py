@@ -0,0 +1,31 @@
+""" Column selection, timestamping and text escaping of extracted metadata, a whole frame at a time.
+"""
+import time
+import pandas as pd
+
+ESCAPED_COLUMNS = ('text', 'comments')
+
+
+def escape_text(values):
+    """ The quote and line break escaping of newsfeedback's first CSV exports: quotes become typographic
+    ones, line breaks [¶], and the whole text is wrapped in double quotes. """
+    # pandas' string dtype keeps missing values missing, and is backed by pyarrow where installed
+    escaped = (values.astype("string")
+               .str.replace('"', "“", regex=False)
+               .str.replace("'", "’", regex=False)
+               .str.replace("\n", "[¶]", regex=False))
+    return '"' + escaped + '"'
+
+
+def postprocess_metadata(df, metadata_wanted, datetime=None, escape=True):
+    """ Keeps the wanted columns in their configured order, stamps every row with datetime
+    (default: now, as %Y%m%d-%H%M) and, unless escape is False, escapes text and comments.
+    Parquet needs no escaping, and neither does a CSV reader that handles quoting. """
+    df = df.reindex(columns=metadata_wanted)
+    if 'datetime' in df.columns:
+        df['datetime'] = datetime or time.strftime(r"%Y%m%d-%H%M")
+    if escape:
+        for column in ESCAPED_COLUMNS:
+            if column in df.columns:
+                df[column] = escape_text(df[column])
+    return df
@@ -0,0 +1,174 @@
+""" What each news site needs to be downloaded by the beautifulsoup pipeline, learned from how its
+downloads went, so that later runs go straight to the cheapest way that works.
+"""
+import os, re, threading, time
+from pathlib import Path
+import yaml
+from loguru import logger as log
+from newsfeedback.config import config_registry
+from newsfeedback.politeness import hostname_of
+
+HOST_PROFILES_NAME = "user_host_profiles.yaml"
+DEFAULT_HOST_PROFILES = Path(__file__).parent/"defaults"/"default_host_profiles.yaml"
+FETCH_PATHS = ('plain', 'browser')
+LEARN_AFTER = 3 # outcomes in a row that have to agree before a site goes straight to the browser or skips the consent click
+RECHECK_AFTER = 7 # days after which learned settings are tried out again, in case the site has changed
+# pages that ask for JavaScript or consent in their visible text are walls, not articles; notices inside
+# <noscript> do not count, as most ordinary pages have one
+BROWSER_WALL = re.compile(r"enable JavaScript|JavaScript (?:aktivieren|einschalten)|sp_message_container_", re.IGNORECASE)
+NOSCRIPT = re.compile(r"<noscript\b.*?</noscript>", re.IGNORECASE | re.DOTALL)
+
+
+def browser_wall(downloaded):
+    """ Whether a page downloaded without a browser is a JavaScript or consent wall. """
+    if isinstance(downloaded, bytes):
+        downloaded = downloaded.decode("utf-8", errors="replace")
+    return bool(downloaded) and BROWSER_WALL.search(NOSCRIPT.sub("", downloaded)) is not None
+
+
+class HostProfiles(object):
+    """ Per hostname, 'fetch' is 'plain' if the shared requests session gets its pages and 'browser' if
+    they only load in Chrome, and 'consent' whether Chrome has to click away a consent banner there.
+    A plain download only counts as working once metadata could be extracted from it, and a site is
+    only switched to the browser, or to no consent click, after LEARN_AFTER such outcomes in a row.
+    Learning starts from the defaults. What was learned is kept in a YAML file next to the user
+    configs, with the day it was learned, and is tried out again after RECHECK_AFTER days; entries
+    without a 'checked' day, like the defaults or ones edited in by hand, are kept as they are. """
+
+    def __init__(self):
+        self.path = None
+        self.defaults = DEFAULT_HOST_PROFILES
+        self.clock = time.time
+        self.enabled = True # off while replaying a recording, which says nothing about the sites
+        self._profiles = None
+        self._failures = {}
+        self._consent_misses = {}
+        self._unconfirmed = set()
+        self._changed = set()
+        self._lock = threading.RLock()
+
+    def configure(self, path=None, defaults=DEFAULT_HOST_PROFILES, clock=time.time):
+        with self._lock:
+            self.path = Path(path) if path is not None else None
+            self.defaults = defaults
+            self.clock = clock
+            self._profiles = None
+            self._failures = {}
+            self._consent_misses = {}
+            self._unconfirmed = set()
+            self._changed = set()
+
+    def profiles_file(self):
+        # next to the user configs, unless configured otherwise
+        return self.path if self.path is not None else Path().resolve()/HOST_PROFILES_NAME
+
+    def _read(self, path):
+        if path is None or not Path(path).exists():
+            return {}
+        profiles = {}
+        for host, profile in config_registry.load(path).items():
+            if isinstance(profile, dict):
+                profiles[host] = profile
+            else:
+                log.warning(f"{path}: {host} should map to fetch and consent settings.")
+        return profiles
+
+    def _loaded(self):
+        if self._profiles is None:
+            self._profiles = self._read(self.defaults)
+            for host, profile in self._read(self.profiles_file()).items():
+                self._profiles.setdefault(host, {}).update(profile)
+        return self._profiles
+
+    def profile(self, url):
+        with self._lock:
+            return dict(self._loaded().get(hostname_of(url), {}))
+
+    def _current(self, profile, setting):
+        # a learned setting counts until it is due to be checked again
+        if setting not in profile:
+            return None
+        checked = profile.get('checked')
+        if checked is not None and str(checked) < time.strftime(r"%Y-%m-%d", time.localtime(self.clock() - RECHECK_AFTER * 86400)):
+            return None
+        return profile[setting]
+
+    def needs_browser(self, url):
+        return self._current(self.profile(url), 'fetch') == 'browser'
+
+    def needs_consent(self, url):
+        """ True or False once known, None if Chrome should look for a banner and find out. """
+        return self._current(self.profile(url), 'consent')
+
+    def _learn(self, url, setting, value):
+        host = hostname_of(url)
+        profile = self._loaded().setdefault(host, {})
+        if self._current(profile, setting) != value:
+            log.info(f"{host}: learned {setting} = {value}.")
+            profile[setting] = value
+            profile['checked'] = time.strftime(r"%Y-%m-%d", time.localtime(self.clock()))
+            self._changed.add(host)
+
+    def plain_fetch(self, url, worked):
+        """ Records whether the requests session got a usable page of url. """
+        if not self.enabled:
+            return
+        host = hostname_of(url)
+        with self._lock:
+            if worked:
+                self._failures[host] = 0
+                self._learn(url, 'fetch', 'plain')
+            else:
+                self._failures[host] = self._failures.get(host, 0) + 1
+                if self._failures[host] >= LEARN_AFTER:
+                    self._learn(url, 'fetch', 'browser')
+
+    def plain_download(self, url, downloaded):
+        """ Records a plain download of an article, which only counts as working once extracted() says so. """
+        if not downloaded:
+            self.plain_fetch(url, False)
+        elif self.enabled:
+            with self._lock:
+                self._unconfirmed.add(url)
+
+    def extracted(self, url, worked):
+        """ Records whether metadata could be extracted from url, which settles its plain download, if any. """
+        with self._lock:
+            if url not in self._unconfirmed:
+                return
+            self._unconfirmed.discard(url)
+        self.plain_fetch(url, worked)
+
+    def consent_checked(self, url, clicked):
+        if not self.enabled:
+            return
+        host = hostname_of(url)
+        with self._lock:
+            if clicked:
+                self._consent_misses[host] = 0
+                self._learn(url, 'consent', True)
+            else:
+                # the banner may just have been slow, so it takes several misses in a row
+                self._consent_misses[host] = self._consent_misses.get(host, 0) + 1
+                if self._consent_misses[host] >= LEARN_AFTER:
+                    self._learn(url, 'consent', False)
+
+    def save(self):
+        """ Adds what was learned since the last save to the profiles file, keeping what other
+        processes have written there in the meantime for the other hosts. """
+        with self._lock:
+            if not self._changed:
+                return
+            path = self.profiles_file()
+            profiles = self._read(path)
+            for host in self._changed:
+                profiles[host] = self._profiles[host]
+            path.parent.mkdir(parents=True, exist_ok=True)
+            part_path = path.with_name(f"{path.name}.{os.getpid()}.part")
+            part_path.write_text(yaml.safe_dump(profiles, sort_keys=True, allow_unicode=True), encoding="utf-8")
+            os.replace(part_path, path)
+            log.debug(f"Saved what was learned about {sorted(self._changed)} to {path}.")
+            self._changed = set()
+
+
+host_profiles = HostProfiles()
@@ -0,0 +1,115 @@
+""" Recording of the pages newsfeedback downloads, and offline replay of such a recording.
+"""
+import hashlib, json, threading, time
+from pathlib import Path
+from loguru import logger as log
+from newsfeedback.drivers import FakeDriver
+from newsfeedback.httpcache import CachedResponse
+
+RECORDING_MODES = ('record', 'replay')
+BROWSER_HEADERS = {'Content-Type': 'text/html; charset=utf-8'}
+
+
+class Recording(object):
+    """ A folder holding every downloaded URL as <sha1>.json (URL, status and headers) and <sha1>.body,
+    in http/ for downloads made with requests and in browser/ for pages loaded with Selenium. In record
+    mode, every download is written to it. In replay mode, downloads are answered from it, and URLs that
+    were never recorded count as not found, so that nothing goes over the network. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.configure()
+
+    def configure(self, directory=None, mode=None):
+        if mode is not None and mode not in RECORDING_MODES:
+            raise ValueError(f"Unknown recording mode '{mode}', expected one of {RECORDING_MODES}.")
+        with self._lock:
+            self.directory = Path(directory) if directory and mode else None
+            self.mode = mode if self.directory else None
+            self.recorded = 0
+            self.replayed = 0
+            self.missing = 0
+        if self.mode == 'record':
+            log.info(f"Recording every download in {self.directory}.")
+        elif self.mode == 'replay':
+            log.info(f"Replaying the downloads recorded in {self.directory}, without going online.")
+
+    @property
+    def recording(self):
+        return self.mode == 'record'
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    def _paths(self, kind, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        folder = self.directory/kind
+        return folder/f"{key}.json", folder/f"{key}.body"
+
+    def store(self, kind, url, status_code, content, headers=None):
+        meta_path, body_path = self._paths(kind, url)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        # the body first, so that a half-written entry is never replayed
+        body_path.write_bytes(content or b"")
+        meta_path.write_text(json.dumps({'url': url, 'status_code': status_code, 'headers': dict(headers or {}),
+                                         'recorded_at': time.strftime(r"%Y-%m-%dT%H:%M:%S")}, ensure_ascii=False),
+                             encoding="utf-8")
+        with self._lock:
+            self.recorded += 1
+
+    def load(self, kind, url):
+        """ (status_code, content, headers) of a recorded download, or None. """
+        meta_path, body_path = self._paths(kind, url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            content = body_path.read_bytes()
+        except FileNotFoundError:
+            with self._lock:
+                self.missing += 1
+            log.warning(f"{url} is not in the recording {self.directory}.")
+            return None
+        with self._lock:
+            self.replayed += 1
+        return meta['status_code'], content, meta['headers']
+
+    def record_response(self, url, response):
+        self.store('http', url, response.status_code, response.content, response.headers)
+        return response
+
+    def replay_response(self, url):
+        entry = self.load('http', url)
+        if entry is None:
+            return CachedResponse(url, 404, b"", {}, from_cache=True)
+        status_code, content, headers = entry
+        return CachedResponse(url, status_code, content, headers, from_cache=True)
+
+    def record_page(self, url, page_source):
+        self.store('browser', url, 200, (page_source or "").encode("utf-8"), BROWSER_HEADERS)
+        return page_source
+
+    def replay_page(self, url):
+        entry = self.load('browser', url)
+        return "" if entry is None else entry[1].decode("utf-8")
+
+    def log_stats(self):
+        if self.recording:
+            log.info(f"{self.recorded} downloads recorded in {self.directory}.")
+        elif self.replaying:
+            log.info(f"{self.replayed} downloads replayed from {self.directory}, {self.missing} were not recorded.")
+
+
+class ReplayDriver(FakeDriver):
+    """ Stands in for Chrome during a replay, loading the pages the browser recorded. """
+
+    def __init__(self, recording):
+        super().__init__()
+        self.recording = recording
+
+    def get(self, url):
+        self.current_url = url
+        self.visited.append(url)
+        self.page_source = self.recording.replay_page(url)
+
+
+recording = Recording()
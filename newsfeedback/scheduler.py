@@ -0,0 +1,107 @@
+""" Scheduling of get-data's runs: every homepage at its own interval, aligned to the clock.
+"""
+import datetime, math, threading, time
+from loguru import logger as log
+
+MISSED_RUNS = ('catch-up', 'skip')
+# midnight of 1 January 1970 on the local wall clock, so that an interval of 6 hours means 0:00, 6:00,
+# 12:00 and 18:00 on every day, whether summer time is in effect or not
+CLOCK_ANCHOR = datetime.datetime(1970, 1, 1)
+
+
+def next_slot(interval, after):
+    """ The first whole multiple of interval (hours) of local wall-clock time since CLOCK_ANCHOR later than
+    after (a timestamp). Wall-clock times skipped when summer time starts move on by the missing hour. """
+    step = datetime.timedelta(hours=float(interval))
+    wall_clock = datetime.datetime.fromtimestamp(after)
+    slot = CLOCK_ANCHOR + ((wall_clock - CLOCK_ANCHOR) // step + 1) * step
+    while True:
+        # mktime resolves the naive wall-clock time with the summer time rules of that day
+        timestamp = time.mktime(slot.timetuple()) + slot.microsecond / 1e6
+        if timestamp > after:
+            return timestamp
+        slot += step # an hour that occurs twice when summer time ends
+
+
+def format_time(timestamp):
+    return time.strftime(r"%Y-%m-%d %H:%M", time.localtime(timestamp))
+
+
+class Scheduler(object):
+    """ Collects every homepage at the slots of its interval, all homepages due at the same time in one
+    run. intervals() returns {homepage URL: interval in hours} and is asked again before every run, so
+    homepages added to the config are collected right away and then join their slots. Runs never
+    overlap: slots that pass while a run is still going are either made up for by a single run right
+    after it (catch-up) or left out (skip). Between runs, the scheduler sleeps until the next homepage
+    is due. """
+
+    def __init__(self, run, intervals, missed_runs='catch-up', clock=time.time):
+        if missed_runs not in MISSED_RUNS:
+            raise ValueError(f"Unknown handling of missed runs '{missed_runs}', expected one of {MISSED_RUNS}.")
+        self.run = run
+        self.intervals = intervals
+        self.missed_runs = missed_runs
+        self.clock = clock
+        self.due = {} # homepage URL: (interval, timestamp of its next run)
+        self._stopped = threading.Event()
+
+    def refresh(self, now):
+        intervals = self.intervals()
+        for homepage_url in list(self.due):
+            if homepage_url not in intervals:
+                del self.due[homepage_url]
+        for homepage_url, interval in intervals.items():
+            if homepage_url not in self.due:
+                self.due[homepage_url] = (interval, now)
+            elif self.due[homepage_url][0] != interval:
+                self.due[homepage_url] = (interval, next_slot(interval, now))
+
+    def run_pending(self):
+        """ Runs the homepages that are due, if any, and returns them. """
+        started = self.clock()
+        self.refresh(started)
+        homepage_url_list = [homepage_url for homepage_url, (_, due) in self.due.items() if due <= started]
+        if len(homepage_url_list) == 0:
+            return []
+        try:
+            self.run(homepage_url_list)
+        finally:
+            self.reschedule(homepage_url_list, started, self.clock())
+        return homepage_url_list
+
+    def reschedule(self, homepage_url_list, started, finished):
+        for homepage_url in homepage_url_list:
+            interval, _ = self.due[homepage_url]
+            due = next_slot(interval, started)
+            if due <= finished:
+                missed = math.floor((finished - due) / (float(interval) * 3600)) + 1
+                if self.missed_runs == 'catch-up':
+                    log.warning(f"{homepage_url}: the run took longer than its interval of {interval}h, collecting it "
+                                f"once more right away for {missed} missed run(s).")
+                    due = finished
+                else:
+                    due = next_slot(interval, finished)
+                    log.warning(f"{homepage_url}: the run took longer than its interval of {interval}h, skipping {missed} run(s) "
+                                f"until {format_time(due)}.")
+            self.due[homepage_url] = (interval, due)
+
+    def seconds_until_next(self):
+        if len(self.due) == 0:
+            return None
+        return max(0.0, min(due for _, due in self.due.values()) - self.clock())
+
+    def run_forever(self):
+        while not self._stopped.is_set():
+            self.run_pending()
+            wait = self.seconds_until_next()
+            if wait is None:
+                log.error("No homepages to collect, checking the config again in an hour.")
+                wait = 3600
+            elif wait > 0:
+                next_due = min(due for _, due in self.due.values())
+                log.info(f"Next run at {format_time(next_due)} for "
+                         f"{sum(due == next_due for _, due in self.due.values())} homepage(s).")
+            self._stopped.wait(wait)
+
+    def stop(self):
+        self._stopped.set()
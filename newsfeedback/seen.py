@@ -0,0 +1,62 @@
+""" Cross-run index of the article URLs newsfeedback has already extracted.
+"""
+import sqlite3, threading, time
+from pathlib import Path
+from loguru import logger as log
+
+SEEN_INDEX_NAME = "seen_urls.sqlite"
+
+
+class SeenIndex(object):
+    """ SQLite-backed record of extracted article URLs, kept in the output folder so that
+    scheduled runs only download and extract articles they have not collected before. """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS seen ("
+                                     "url TEXT PRIMARY KEY, first_seen REAL, last_fetched REAL)")
+
+    def split(self, article_url_list, refetch_after=None):
+        """ Returns the URLs still to be fetched and the ones skipped as already seen.
+        With refetch_after (hours), URLs last fetched longer ago count as new again. """
+        cutoff = time.time() - float(refetch_after) * 3600 if refetch_after is not None else None
+        with self._lock:
+            last_fetched = {}
+            for start in range(0, len(article_url_list), 500):
+                chunk = article_url_list[start:start + 500]
+                rows = self._connection.execute(
+                    f"SELECT url, last_fetched FROM seen WHERE url IN ({','.join('?' * len(chunk))})", chunk)
+                last_fetched.update(rows.fetchall())
+        new_url_list, skipped_url_list = [], []
+        for article_url in article_url_list:
+            fetched = last_fetched.get(article_url)
+            if fetched is None or (cutoff is not None and fetched < cutoff):
+                new_url_list.append(article_url)
+            else:
+                skipped_url_list.append(article_url)
+        return new_url_list, skipped_url_list
+
+    def mark(self, article_url_list):
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO seen (url, first_seen, last_fetched) VALUES (?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET last_fetched = excluded.last_fetched",
+                [(article_url, now, now) for article_url in article_url_list])
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+
+def open_seen_index(output_folder):
+    path = Path(output_folder)/SEEN_INDEX_NAME
+    log.info(f"Skipping articles already listed in {path}.")
+    return SeenIndex(path)
@@ -0,0 +1,51 @@
+""" Shared, connection-pooled requests session for newsfeedback's non-browser downloads.
+"""
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from newsfeedback.drivers import USER_AGENT
+
+DEFAULT_CONNECTIONS_PER_HOST = 10
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'de,en-US;q=0.7,en;q=0.3',
+}
+
+_session = None
+_settings = {'connections_per_host': DEFAULT_CONNECTIONS_PER_HOST, 'retries': DEFAULT_RETRIES, 'backoff': DEFAULT_BACKOFF}
+_lock = threading.Lock()
+
+
+def new_session(connections_per_host=DEFAULT_CONNECTIONS_PER_HOST, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(['GET', 'HEAD']), raise_on_status=False)
+    # keeps up to connections_per_host open keep-alive connections for each of the last 100 hosts
+    adapter = HTTPAdapter(pool_connections=100, pool_maxsize=connections_per_host, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+def get_session():
+    global _session
+    with _lock:
+        if _session is None:
+            _session = new_session(**_settings)
+        return _session
+
+
+def configure_session(connections_per_host=None, retries=None, backoff=None):
+    global _session
+    with _lock:
+        for key, value in (('connections_per_host', connections_per_host), ('retries', retries), ('backoff', backoff)):
+            if value is not None:
+                _settings[key] = value
+        if _session is not None:
+            _session.close()
+            _session = None
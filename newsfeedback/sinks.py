@@ -0,0 +1,131 @@
+""" Streaming CSV and Parquet writers for newsfeedback's metadata exports.
+"""
+import os
+from pathlib import Path
+import pandas as pd
+from loguru import logger as log
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # Parquet output is optional
+    pa = pq = None
+
+OUTPUT_FORMATS = ('csv', 'parquet', 'archive')
+DEFAULT_OUTPUT_FORMAT = 'csv'
+DEFAULT_BATCH_SIZE = 50
+LIST_COLUMNS = ('categories', 'tags')
+
+
+class Sink(object):
+    """ Appends metadata rows to <path>.part, writing them out every batch_size rows, and only
+    renames the file to <path> once close() is reached. A crashed run leaves its rows so far
+    in the .part file instead of losing them, and never a half-written file under the final name.
+    transform, if given, is applied to every batch as a dataframe before it is written. """
+
+    suffix = None
+
+    def __init__(self, path, columns, batch_size=DEFAULT_BATCH_SIZE, transform=None):
+        self.path = Path(path)
+        self.part_path = self.path.with_name(self.path.name + ".part")
+        self.columns = list(columns)
+        self.batch_size = max(1, int(batch_size))
+        self.transform = transform
+        self.rows = 0
+        self._batch = []
+        self.open()
+
+    def write(self, row):
+        self._batch.append(row)
+        self.rows += 1
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        if self._batch:
+            df = pd.DataFrame(self._batch, columns=self.columns)
+            if self.transform is not None:
+                df = self.transform(df)
+            self.write_batch(df)
+            self._batch = []
+
+    def close(self):
+        self.flush()
+        self.finish()
+        os.replace(self.part_path, self.path)
+        return self.path
+
+    def abort(self):
+        self.flush()
+        self.finish()
+        log.warning(f"Export interrupted after {self.rows} rows, which were kept in {self.part_path}.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class CsvSink(Sink):
+    suffix = ".csv"
+
+    def open(self):
+        self._file = self.part_path.open("w", encoding="utf-8", newline="")
+        pd.DataFrame(columns=self.columns).to_csv(self._file, index=False)
+
+    def write_batch(self, df):
+        df.to_csv(self._file, index=False, header=False)
+        self._file.flush()
+
+    def finish(self):
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+
+class ParquetSink(Sink):
+    """ Writes every batch as a row group. Categories and tags are lists of strings,
+    all other columns strings. """
+
+    suffix = ".parquet"
+
+    def open(self):
+        if pa is None:
+            raise ImportError("Parquet output needs pyarrow, which can be installed with 'pip install pyarrow'.")
+        self.schema = pa.schema([(column, pa.list_(pa.string()) if column in LIST_COLUMNS else pa.string())
+                                 for column in self.columns])
+        self._writer = pq.ParquetWriter(str(self.part_path), self.schema)
+
+    def write_batch(self, df):
+        arrays = {column: [parquet_value(value, column) for value in df[column]] for column in self.columns}
+        self._writer.write_table(pa.Table.from_pydict(arrays, schema=self.schema))
+
+    def finish(self):
+        self._writer.close()
+
+
+def parquet_value(value, column):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if column in LIST_COLUMNS:
+        if hasattr(value, 'tolist'): # read back from Parquet as an array
+            value = value.tolist()
+        return [str(item) for item in value] if isinstance(value, (list, tuple)) else [str(value)]
+    return str(value)
+
+
+SINKS = {'csv': CsvSink, 'parquet': ParquetSink, 'archive': ParquetSink}
+
+
+def open_sink(path, columns, output_format=DEFAULT_OUTPUT_FORMAT, batch_size=DEFAULT_BATCH_SIZE, transform=None):
+    """ path without its suffix, which the output format decides. """
+    sink_class = SINKS[output_format]
+    return sink_class(Path(f"{path}{sink_class.suffix}"), columns, batch_size, transform)
@@ -0,0 +1,162 @@
+""" SQLite-backed queue that splits get-data's work into homepage, article and merge tasks, so that
+several worker processes, on one machine or on several sharing a folder, can collect a run together.
+"""
+import json, sqlite3, threading, time
+from pathlib import Path
+from loguru import logger as log
+
+TASK_QUEUE_NAME = "task_queue.sqlite"
+TASK_KINDS = ('homepage', 'article', 'merge')
+DEFAULT_LEASE = 600 # seconds a worker may hold a task before others may take it over
+MAX_ATTEMPTS = 3
+
+SCHEMA = """CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    homepage_url TEXT NOT NULL,
+    article_url TEXT NOT NULL DEFAULT '',
+    position INTEGER NOT NULL DEFAULT 0,
+    needs_browser INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL DEFAULT '{}',
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    updated REAL,
+    UNIQUE (run_id, kind, homepage_url, article_url))"""
+INDEX = "CREATE INDEX IF NOT EXISTS tasks_by_state ON tasks (state, run_id, homepage_url, kind)"
+
+CLAIMABLE = """(state = 'pending' OR (state = 'leased' AND lease_expires < :now))
+    AND attempts < :max_attempts AND (:browser OR needs_browser = 0)
+    AND (kind != 'merge' OR NOT EXISTS (
+        SELECT 1 FROM tasks AS article WHERE article.run_id = tasks.run_id AND article.homepage_url = tasks.homepage_url
+        AND article.kind = 'article' AND article.state IN ('pending', 'leased')))"""
+
+
+class Task(object):
+    def __init__(self, row):
+        self.id, self.run_id, self.kind, self.homepage_url, self.article_url, self.position, self.needs_browser, payload, self.owner = row
+        self.payload = json.loads(payload)
+
+    def __repr__(self):
+        return f"<{self.kind} task {self.id} of run {self.run_id}: {self.article_url or self.homepage_url}>"
+
+
+class TaskQueue(object):
+    """ Tasks are claimed for lease seconds, in a transaction that locks the database, so that no two
+    workers ever hold the same task, and only the worker holding a task can complete it. A task whose
+    worker died is taken over once its lease expires, up to MAX_ATTEMPTS times. Tasks that need a
+    browser are only handed to workers that have one. A homepage's merge task becomes available once
+    none of its articles is pending or being worked on anymore. Adding a task twice has no effect. """
+
+    def __init__(self, path, lease=DEFAULT_LEASE, clock=time.time):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease = lease
+        self.clock = clock
+        self._lock = threading.Lock()
+        # autocommit, so that every write below is wrapped in its own BEGIN IMMEDIATE
+        self._connection = sqlite3.connect(str(self.path), timeout=60, isolation_level=None, check_same_thread=False)
+        self._connection.execute(SCHEMA)
+        self._connection.execute(INDEX)
+
+    def _transaction(self, statements):
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(cursor)
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            return result
+
+    def add(self, run_id, kind, homepage_url, article_url='', position=0, payload=None, needs_browser=False):
+        self.add_many([(run_id, kind, homepage_url, article_url, position, payload, needs_browser)])
+
+    def add_many(self, tasks, cursor=None):
+        rows = [(run_id, kind, homepage_url, article_url or '', position, json.dumps(payload or {}), int(bool(needs_browser)), self.clock())
+                for run_id, kind, homepage_url, article_url, position, payload, needs_browser in tasks]
+        statement = ("INSERT OR IGNORE INTO tasks (run_id, kind, homepage_url, article_url, position, payload, needs_browser, updated) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+        if cursor is not None:
+            return cursor.executemany(statement, rows)
+        return self._transaction(lambda cursor: cursor.executemany(statement, rows))
+
+    def claim(self, owner, browser=False):
+        """ The next task this worker may take, now leased to it, or None. Workers with a browser take
+        the tasks that need one first, and everyone finishes homepages before starting new ones. """
+        now = self.clock()
+
+        def statements(cursor):
+            cursor.execute("UPDATE tasks SET state = 'failed', error = 'abandoned by its workers', updated = :now "
+                           "WHERE state = 'leased' AND lease_expires < :now AND attempts >= :max_attempts",
+                           {'now': now, 'max_attempts': MAX_ATTEMPTS})
+            row = cursor.execute(f"SELECT id FROM tasks WHERE {CLAIMABLE} ORDER BY needs_browser DESC, "
+                                 "CASE kind WHEN 'merge' THEN 0 WHEN 'article' THEN 1 ELSE 2 END, id LIMIT 1",
+                                 {'now': now, 'max_attempts': MAX_ATTEMPTS, 'browser': int(bool(browser))}).fetchone()
+            if row is None:
+                return None
+            cursor.execute("UPDATE tasks SET state = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, updated = ? "
+                           "WHERE id = ?", (owner, now + self.lease, now, row[0]))
+            return Task(cursor.execute("SELECT id, run_id, kind, homepage_url, article_url, position, needs_browser, payload, lease_owner "
+                                       "FROM tasks WHERE id = ?", row).fetchone())
+
+        return self._transaction(statements)
+
+    def _finish(self, cursor, task, state, result=None, error=None):
+        cursor.execute("UPDATE tasks SET state = ?, result = ?, error = ?, lease_owner = NULL, lease_expires = NULL, updated = ? "
+                       "WHERE id = ? AND lease_owner = ? AND state = 'leased'",
+                       (state, None if result is None else json.dumps(result), error, self.clock(), task.id, task.owner))
+        if cursor.rowcount == 0:
+            log.warning(f"{task} was taken over by another worker, dropping this worker's result.")
+            return False
+        return True
+
+    def complete(self, task, result=None, follow_ups=()):
+        """ Marks the task as done with result and adds its follow-up tasks, all at once. """
+        def statements(cursor):
+            if self._finish(cursor, task, 'done', result):
+                self.add_many(follow_ups, cursor)
+                return True
+            return False
+        return self._transaction(statements)
+
+    def fail(self, task, error):
+        """ Hands the task back for another attempt, or gives up on it after MAX_ATTEMPTS. """
+        def statements(cursor):
+            attempts = cursor.execute("SELECT attempts FROM tasks WHERE id = ?", (task.id,)).fetchone()[0]
+            return self._finish(cursor, task, 'pending' if attempts < MAX_ATTEMPTS else 'failed', error=error)
+        return self._transaction(statements)
+
+    def require_browser(self, task):
+        """ Hands the task back for a worker with a browser, without counting it as an attempt. """
+        def statements(cursor):
+            if self._finish(cursor, task, 'pending'):
+                cursor.execute("UPDATE tasks SET needs_browser = 1, attempts = attempts - 1 WHERE id = ?", (task.id,))
+        return self._transaction(statements)
+
+    def results(self, run_id, homepage_url):
+        """ (article URL, result) of the homepage's finished articles, in the order of the homepage's links. """
+        with self._lock:
+            rows = self._connection.execute("SELECT article_url, result FROM tasks WHERE run_id = ? AND homepage_url = ? "
+                                            "AND kind = 'article' AND state = 'done' ORDER BY position",
+                                            (run_id, homepage_url)).fetchall()
+        return [(article_url, json.loads(result)) for article_url, result in rows if result is not None]
+
+    def has_work(self, browser=False):
+        """ Whether this worker may still get a task, now or once the tasks being worked on are finished. """
+        with self._lock:
+            return self._connection.execute(f"SELECT COUNT(*) FROM tasks WHERE state = 'leased' OR ({CLAIMABLE})",
+                                            {'now': self.clock(), 'max_attempts': MAX_ATTEMPTS, 'browser': int(bool(browser))}).fetchone()[0] > 0
+
+    def counts(self):
+        with self._lock:
+            return dict(self._connection.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall())
+
+    def close(self):
+        self._connection.close()
@@ -0,0 +1,132 @@
+""" Normalization of the links found on a homepage into clean, absolute and deduplicated article URLs.
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+from urllib.parse import urljoin
+
+TRACKING_PARAMETER = re.compile(r"^(utm_.+|wt_.+|at_.+|ns_.+|fbclid|gclid|dclid|msclkid|mc_cid|mc_eid|igshid|icid|ocid|xtor|_ga)$",
+                                re.IGNORECASE)
+URL_PARTS = re.compile(r"^([a-zA-Z][a-zA-Z0-9+.-]*)://(?:[^@/?#]*@)?(\[[^\]/?#]*\]|[^:/?#]*)(?::(\d*))?([^?#]*)(?:\?([^#]*))?")
+DOUBLE_SLASH = re.compile(r"/{2,}")
+LANGUAGE_SECTION = re.compile(r"^/[a-z]{2}/")
+WEB_SCHEMES = ('http', 'https')
+DEFAULT_PORTS = {'http': "80", 'https': "443"}
+
+UrlParts = namedtuple('UrlParts', ['scheme', 'host', 'port', 'path', 'query'])
+
+
+def bare_host(hostname):
+    return hostname[4:] if hostname.startswith("www.") else hostname
+
+
+def clean_parts(url):
+    """ The parts of url without its fragment, user and tracking parameters, with a lowercase scheme
+    and host, no default port and no doubled slashes in its path; None if it is no web address. """
+    match = URL_PARTS.match(url)
+    if match is None:
+        return None
+    scheme, host, port, path, query = match.groups("")
+    scheme = scheme.lower()
+    if scheme not in WEB_SCHEMES or not host:
+        return None
+    if port == DEFAULT_PORTS[scheme]:
+        port = ""
+    if "//" in path:
+        path = DOUBLE_SLASH.sub("/", path)
+    if query:
+        # the remaining parameters keep their order and encoding
+        query = "&".join(parameter for parameter in query.split("&")
+                         if parameter and not TRACKING_PARAMETER.match(parameter.partition("=")[0]))
+    return UrlParts(scheme, host.lower(), port, path, query)
+
+
+def join_parts(parts):
+    port = f":{parts.port}" if parts.port else ""
+    query = f"?{parts.query}" if parts.query else ""
+    return f"{parts.scheme}://{parts.host}{port}{parts.path}{query}"
+
+
+def clean_url(url):
+    parts = clean_parts(url)
+    return None if parts is None else join_parts(parts)
+
+
+def parts_key(parts):
+    path = parts.path.rstrip("/") or "/"
+    query = "&".join(sorted(parts.query.split("&"))) if parts.query else ""
+    return f"{bare_host(parts.host)}:{parts.port}{path}?{query}"
+
+
+def canonical_url(url):
+    """ The dedup key of url: the same for http and https, with and without www., a trailing
+    slash, tracking parameters or a fragment, and for any order of the query parameters. """
+    parts = clean_parts(url)
+    return None if parts is None else parts_key(parts)
+
+
+def unique_urls(urls):
+    """ The cleaned web addresses among urls, each article once, in their original order. """
+    keys, unique = set(), []
+    for url in urls:
+        parts = clean_parts(url) if url else None
+        if parts is None:
+            continue
+        key = parts_key(parts)
+        if key not in keys:
+            keys.add(key)
+            unique.append(join_parts(parts))
+    return unique
+
+
+class LinkNormalizer(object):
+    """ Turns the hrefs of a homepage into article URLs of the same site: relative links are
+    resolved against the homepage, other sites, other languages of a /de/-style homepage,
+    the homepage itself and anything that is not a web address are dropped. Everything
+    derived from the homepage URL is worked out once, not for every link. """
+
+    def __init__(self, homepage_url):
+        self.homepage_url = homepage_url
+        homepage = clean_parts(homepage_url) or UrlParts("https", "", "", "/", "")
+        self.scheme = homepage.scheme
+        self.origin = join_parts(homepage._replace(path="", query=""))
+        self.host = bare_host(homepage.host)
+        language = LANGUAGE_SECTION.match(homepage.path)
+        self.prefix = language.group(0) if language else "/"
+        self.homepage_key = canonical_url(homepage_url)
+
+    def resolve(self, href):
+        if href.startswith(("https://", "http://")):
+            return href
+        if href.startswith("//"):
+            return f"{self.scheme}:{href}"
+        if href.startswith("/") and "/." not in href:
+            return self.origin + href
+        return urljoin(self.homepage_url, href)
+
+    def normalize(self, href):
+        """ The parts of href's cleaned absolute URL if it is an article link of this homepage, else None. """
+        if not href:
+            return None
+        parts = clean_parts(self.resolve(href.strip()))
+        if parts is None or bare_host(parts.host) != self.host or not parts.path.startswith(self.prefix):
+            return None
+        return parts
+
+    def links(self, hrefs):
+        """ The article URLs among hrefs, each once, in their order on the page. """
+        keys, links = {self.homepage_key}, []
+        for href in hrefs:
+            parts = self.normalize(href)
+            if parts is None:
+                continue
+            key = parts_key(parts)
+            if key not in keys:
+                keys.add(key)
+                links.append(join_parts(parts))
+        return links
+
+
+@lru_cache(maxsize=256)
+def link_normalizer(homepage_url):
+    return LinkNormalizer(homepage_url)
@@ -0,0 +1,136 @@
+""" Shared fixtures for the newsfeedback test suite.
+"""
+import http.server, threading, time
+import pytest
+from newsfeedback.drivers import driver_pool, page_loads, new_chrome_driver, DEFAULT_POOL_SIZE, DEFAULT_MAX_PAGES
+from newsfeedback.politeness import rate_limiter
+from newsfeedback.profiles import host_profiles
+
+ARTICLE_HTML = """<!DOCTYPE html>
+<html lang="de">
+<head>
+<meta charset="utf-8">
+<title>Artikel {number} - Testzeitung</title>
+<meta property="og:title" content="Artikel {number}">
+<meta name="description" content="Beschreibung von Artikel {number}">
+<meta property="article:published_time" content="2025-01-{day:02d}T10:00:00+01:00">
+<link rel="canonical" href="https://www.testzeitung.de{path}">
+</head>
+<body>
+<article>
+<h1>Artikel {number}</h1>
+<p>{text}</p>
+</article>
+</body>
+</html>"""
+
+
+def article_html(path, number):
+    text = f"Dies ist der Text von Artikel {number}, ein längerer Absatz über Politik und Gesellschaft. " * 20
+    return ARTICLE_HTML.format(number=number, day=(number % 28) + 1, path=path, text=text)
+
+
+class StandInServer(object):
+    """ Local HTTP stand-in for a news site. Serves canned article HTML for every path
+    ending in -<number>, or whatever has been registered in pages. """
+
+    def __init__(self):
+        self.pages = {}
+        self.delays = {}
+        self.requests = []
+        self.connections = set()
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def _handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests.append((self.path, dict(self.headers)))
+                    server.connections.add(self.client_address)
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                try:
+                    time.sleep(server.delays.get(self.path, 0))
+                    status, headers, body = server.response_for(self.path, self.headers)
+                    self.send_response(status)
+                    for key, value in headers.items():
+                        self.send_header(key, value)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with server._lock:
+                        server.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def response_for(self, path, request_headers):
+        page = self.pages.get(path)
+        if callable(page):
+            return page(path, request_headers)
+        if page is not None:
+            return page
+        number = path.rstrip("/").split("-")[-1]
+        if not number.isdigit():
+            return 404, {"Content-Type": "text/plain"}, b"not found"
+        body = article_html(path, int(number)).encode("utf-8")
+        return 200, {"Content-Type": "text/html; charset=utf-8"}, body
+
+    def article_urls(self, count, section="politik"):
+        return [f"{self.url}/{section}/artikel-{number}" for number in range(1, count + 1)]
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stand_in_server():
+    server = StandInServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture(autouse=True)
+def host_profiles_file(tmp_path):
+    # what a test teaches the host profiles must neither reach other tests nor the working directory
+    host_profiles.configure(tmp_path/"user_host_profiles.yaml")
+    yield host_profiles.profiles_file()
+    host_profiles.configure()
+    host_profiles.enabled = True
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limiter():
+    # the rate limits that a test configures for its hosts must not reach other tests
+    yield
+    rate_limiter.reset()
+
+
+@pytest.fixture(autouse=True)
+def fresh_page_loads():
+    # nor the browser modes, waits and blocked URLs
+    yield
+    page_loads.reset()
+
+
+@pytest.fixture(autouse=True)
+def fresh_driver_pool():
+    # neither the browsers of a test nor its pool settings or fake drivers may reach other tests
+    yield
+    driver_pool.shutdown()
+    driver_pool.configure(size=DEFAULT_POOL_SIZE, max_pages=DEFAULT_MAX_PAGES, factory=new_chrome_driver)
@@ -0,0 +1,82 @@
+""" Test suite for newsfeedback.archive
+"""
+import pandas as pd
+import pytest
+from unittest import mock
+from newsfeedback.archive import archive_folder_of, compact, load_archive, partition_folder, write_partition
+from newsfeedback.main import chained_trafilatura_pipeline
+
+pytest.importorskip("pyarrow")
+
+
+def snapshot(output_folder, name, rows):
+    folder = output_folder/"testzeitung"
+    folder.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(rows, columns=['title', 'url', 'tags', 'datetime', 'date']).to_csv(folder/f"{name}-testzeitung.csv", index=False)
+
+
+def article(number, datetime, date=None):
+    return {'title': f"Artikel {number}", 'url': f"https://www.testzeitung.de/artikel-{number}", 'tags': ['a'], 'datetime': datetime,
+            'date': date}
+
+
+class TestArchive(object):
+    def test_archive_export(self, tmp_path, stand_in_server):
+        """ Asserts that archive mode writes a run into the homepage's hostname and day partition. """
+        article_url_list = stand_in_server.article_urls(3)
+        with mock.patch("newsfeedback.main.get_article_urls_trafilatura_pipeline", return_value=article_url_list):
+            df_path = chained_trafilatura_pipeline("https://www.testzeitung.de/", 'off', tmp_path, output_format='archive')
+        df = load_archive(archive_folder_of(tmp_path), hostname="www.testzeitung.de")
+        message = ("The run was archived at {0} with {1} rows.".format(df_path, df.shape[0]))
+        assert df_path.parent.parent.name == "hostname=www.testzeitung.de" and df.shape[0] == 3, message
+
+    def test_compact_imports_and_deduplicates(self, tmp_path):
+        """ Asserts that CSV snapshots are merged into one file per day, keeping the first copy of every article. """
+        snapshot(tmp_path, "20250101-0600", [article(1, "20250101-0600"), article(2, "20250101-0600")])
+        snapshot(tmp_path, "20250101-1200", [article(2, "20250101-1200"), article(3, "20250101-1200")])
+        snapshot(tmp_path, "20250102-0600", [article(3, "20250102-0600"), article(4, "20250102-0600")])
+        compact(tmp_path, homepage_urls=["https://www.testzeitung.de/"])
+        archive_folder = archive_folder_of(tmp_path)
+        df = load_archive(archive_folder, hostname="www.testzeitung.de")
+        files = sorted(path.parent.name for path in archive_folder.rglob("*.parquet"))
+        message = ("The archive holds {0} in the files {1}.".format(list(df['title']), files))
+        assert sorted(df['title']) == [f"Artikel {number}" for number in range(1, 5)] and files == ["day=2025-01-01", "day=2025-01-02"], message
+        assert list(df.loc[df['title'] == "Artikel 2", 'datetime']) == ["20250101-0600"], message
+        assert list(df['tags'][0]) == ['a'], message
+
+    def test_compact_is_repeatable(self, tmp_path):
+        """ Asserts that compacting again, with the snapshots still in place, imports only the new snapshots
+        and adds no duplicates. """
+        snapshot(tmp_path, "20250101-0600", [article(1, "20250101-0600"), article(2, "20250101-0600")])
+        compact(tmp_path)
+        repeated = compact(tmp_path)
+        snapshot(tmp_path, "20250101-1200", [article(2, "20250101-1200"), article(3, "20250101-1200")])
+        with mock.patch("newsfeedback.archive.pd.read_csv", wraps=pd.read_csv) as read_csv:
+            added = compact(tmp_path)
+        actual = (repeated, added, read_csv.call_count)
+        expected = ({"www.testzeitung.de": (2, 2)}, {"www.testzeitung.de": (4, 3)}, 1)
+        message = ("The compactions kept {0} and {1} after reading {2} snapshots, despite expecting {3}.".format(*actual, expected))
+        assert actual == expected, message
+
+    def test_load_archive_date_range(self, tmp_path):
+        """ Asserts that only the partitions of the given hostname and dates are read. """
+        archive_folder = archive_folder_of(tmp_path)
+        for hostname, date in [("www.faz.net", "2025-01-31"), ("www.faz.net", "2025-02-01"), ("www.welt.de", "2025-02-01")]:
+            rows = pd.DataFrame([article(1, date.replace("-", "") + "-0600")])
+            write_partition(rows, partition_folder(archive_folder, hostname, date), "run")
+        df = load_archive(archive_folder, hostname="www.faz.net", start="2025-02-01", end="2025-02-28")
+        message = ("load_archive() returned {0}.".format(df[['hostname', 'day']].values.tolist()))
+        assert df[['hostname', 'day']].values.tolist() == [["www.faz.net", "2025-02-01"]], message
+
+    def test_article_dates_survive_compaction(self, tmp_path):
+        """ Asserts that every article keeps its own publication date through import and compaction,
+        next to the day partition it was collected on. """
+        snapshot(tmp_path, "20250101-0600", [article(1, "20250101-0600", "2024-12-30"), article(2, "20250101-0600", "2024-12-31")])
+        snapshot(tmp_path, "20250102-0600", [article(3, "20250102-0600", "2025-01-02")])
+        compact(tmp_path)
+        compact(tmp_path)
+        df = load_archive(archive_folder_of(tmp_path), hostname="www.testzeitung.de").sort_values('title')
+        actual = df[['title', 'date', 'day']].values.tolist()
+        expected = [["Artikel 1", "2024-12-30", "2025-01-01"], ["Artikel 2", "2024-12-31", "2025-01-01"], ["Artikel 3", "2025-01-02", "2025-01-02"]]
+        message = ("The archive holds {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
@@ -0,0 +1,69 @@
+""" Test suite for newsfeedback.articles
+"""
+import pandas as pd
+import pytest
+from unittest import mock
+from newsfeedback.archive import archive_folder_of, partition_folder, write_partition
+from newsfeedback.articles import ArticleIndex, ARTICLE_INDEX_NAME, open_article_index, rebuild_article_index
+from newsfeedback.main import chained_trafilatura_pipeline
+
+
+def row(number, datetime):
+    return {'title': f"Artikel {number}", 'url': f"https://www.faz.net/artikel-{number}", 'datetime': datetime}
+
+
+class TestArticleIndex(object):
+    def test_first_and_last_seen(self, tmp_path):
+        """ Asserts that an article collected in several runs keeps its first-seen time and gets the
+        latest last-seen time, from which the dwell time on the homepage follows. """
+        article_index = ArticleIndex(tmp_path/ARTICLE_INDEX_NAME)
+        article_index.record([(None, row(1, "20250101-0600"))], "www.faz.net")
+        article_index.record([(None, row(1, "20250101-1200")), (None, row(2, "20250101-1200"))], "www.faz.net")
+        df = article_index.query()
+        first = df[df['url'] == "https://www.faz.net/artikel-1"].iloc[0]
+        message = ("Artikel 1 was indexed as {0}.".format(first.to_dict()))
+        assert (first['first_seen'], first['last_seen'], first['dwell_hours'], first['times_seen']) == \
+            ("2025-01-01T06:00", "2025-01-01T12:00", 6.0, 2) and df.shape[0] == 2, message
+
+    def test_query_filters(self, tmp_path):
+        """ Asserts that queries only return the articles of the given outlet and time range. """
+        article_index = ArticleIndex(tmp_path/ARTICLE_INDEX_NAME)
+        article_index.record([(None, row(1, "20250131-0600")), (None, row(2, "20250201-0600"))], "www.faz.net")
+        article_index.record([(f"https://www.welt.de/artikel-3", row(3, "20250201-0600"))], "www.welt.de")
+        df = article_index.query(outlet="faz", since="2025-02-01", until="2025-02-28")
+        message = ("The query returned {0}.".format(list(df['url'])))
+        assert list(df['url']) == ["https://www.faz.net/artikel-2"], message
+
+    def test_export_updates_index(self, tmp_path, stand_in_server):
+        """ Asserts that every export adds its articles to the index, and that articles skipped as already
+        collected are still noted as seen on the homepage. """
+        article_url_list = stand_in_server.article_urls(3)
+        with mock.patch("newsfeedback.main.get_article_urls_trafilatura_pipeline", return_value=article_url_list):
+            chained_trafilatura_pipeline("https://www.testzeitung.de/", 'off', tmp_path, skip_seen=True)
+            with mock.patch("newsfeedback.articles.seen_time", return_value="2099-01-01T00:00"):
+                chained_trafilatura_pipeline("https://www.testzeitung.de/", 'off', tmp_path, skip_seen=True)
+        article_index = open_article_index(tmp_path)
+        df = article_index.query(outlet="testzeitung")
+        message = ("The index holds {0}.".format(df[['url', 'last_seen', 'times_seen']].values.tolist()))
+        assert list(df['url']) == article_url_list and set(df['last_seen']) == {"2099-01-01T00:00"} \
+            and set(df['times_seen']) == {2}, message
+
+    def test_rebuild_from_snapshots(self, tmp_path):
+        """ Asserts that the index can be filled again from the CSV snapshots of the output folder. """
+        (tmp_path/"faz").mkdir()
+        pd.DataFrame([row(1, "20250101-0600"), row(2, "20250101-0600")]).to_csv(tmp_path/"faz"/"20250101-0600-faz.csv", index=False)
+        pd.DataFrame([row(2, "20250101-1200")]).to_csv(tmp_path/"faz"/"20250101-1200-faz.csv", index=False)
+        rebuild_article_index(tmp_path, ["https://www.faz.net/"])
+        df = open_article_index(tmp_path).query()
+        message = ("The rebuilt index holds {0}.".format(df[['url', 'hostname', 'last_seen']].values.tolist()))
+        assert df[['hostname', 'last_seen']].values.tolist() == [["www.faz.net", "2025-01-01T06:00"], ["www.faz.net", "2025-01-01T12:00"]], message
+
+    def test_rebuild_from_archive_keeps_article_dates(self, tmp_path):
+        """ Asserts that an index rebuilt from the archive records the articles' publication dates, not the day partition. """
+        pytest.importorskip("pyarrow")
+        rows = pd.DataFrame([dict(row(1, "20250102-0600"), date="2024-12-30"), dict(row(2, "20250102-0600"), date="2025-01-01")])
+        write_partition(rows, partition_folder(archive_folder_of(tmp_path), "www.faz.net", "2025-01-02"), "run")
+        rebuild_article_index(tmp_path)
+        df = open_article_index(tmp_path).query()
+        message = ("The rebuilt index holds {0}.".format(df[['url', 'date']].values.tolist()))
+        assert df['date'].tolist() == ["2024-12-30", "2025-01-01"], message
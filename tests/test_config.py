@@ -0,0 +1,64 @@
+""" Test suite for newsfeedback.config
+"""
+import os
+import pytest
+import yaml
+from unittest import mock
+from newsfeedback.config import ConfigRegistry, ConfigError, config_kind
+
+
+def touch_later(path):
+    # coarse file system clocks may not tell two quick writes apart
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+
+
+class TestConfigRegistry(object):
+    def test_config_is_parsed_once(self, tmp_path):
+        """ Asserts that an unchanged config file is only parsed on its first load. """
+        config_file = tmp_path/"homepage.yaml"
+        config_file.write_text(yaml.dump({'https://www.faz.net/': {'pipeline': 'trafilatura', 'filter': 'off'}}))
+        registry = ConfigRegistry()
+        with mock.patch("newsfeedback.config.yaml.load", wraps=yaml.load) as parse:
+            first, second = registry.load(config_file, 'homepage'), registry.load(config_file, 'homepage')
+        message = ("The config was parsed {0} times for two loads.".format(parse.call_count))
+        assert parse.call_count == 1 and first == second, message
+
+    def test_changed_config_is_reloaded(self, tmp_path):
+        """ Asserts that an edited config file is parsed again. """
+        config_file = tmp_path/"filter_choice.yaml"
+        config_file.write_text("service: 'on'\n")
+        registry = ConfigRegistry()
+        registry.load(config_file, 'filter_choice')
+        config_file.write_text("service: 'off'\n")
+        touch_later(config_file)
+        actual = registry.load(config_file, 'filter_choice')
+        message = ("The edited config was read as {0}.".format(actual))
+        assert actual == {'service': 'off'}, message
+
+    def test_callers_get_copies(self, tmp_path):
+        """ Asserts that changing a loaded config does not change what the next caller gets. """
+        config_file = tmp_path/"homepage.yaml"
+        config_file.write_text(yaml.dump({'https://www.faz.net/': {'pipeline': 'trafilatura', 'filter': 'off'}}))
+        registry = ConfigRegistry()
+        registry.load(config_file)['https://www.faz.net/']['pipeline'] = 'beautifulsoup'
+        actual = registry.load(config_file)['https://www.faz.net/']['pipeline']
+        message = ("The cached config was changed to {0} by a caller.".format(actual))
+        assert actual == 'trafilatura', message
+
+    def test_validation(self, tmp_path):
+        """ Asserts that an empty config is read as empty and a config that is not a mapping is rejected. """
+        empty_file, list_file = tmp_path/"empty.yaml", tmp_path/"list.yaml"
+        empty_file.write_text("")
+        list_file.write_text("- https://www.faz.net/\n")
+        registry = ConfigRegistry()
+        message = ("The empty config was not read as an empty mapping or the list was accepted.")
+        assert registry.load(empty_file, 'homepage') == {}, message
+        with pytest.raises(ConfigError):
+            registry.load(list_file, 'homepage')
+
+    def test_config_kind(self):
+        """ Asserts that the default and test variants of a config are validated like the config itself. """
+        actual = [config_kind(type_config) for type_config in ('metadata_test', 'homepage_default', 'filter_Sections_test')]
+        message = ("config_kind() returned {0}.".format(actual))
+        assert actual == ['metadata', 'homepage', 'filter_sections'], message
@@ -0,0 +1,182 @@
+""" Test suite for newsfeedback.drivers
+"""
+import threading, time
+import pytest
+from unittest import mock
+from newsfeedback.drivers import DriverPool, FakeDriver, PooledDriver, driver_pool, page_loads, new_chrome_driver, DEFAULT_POOL_SIZE, DEFAULT_MAX_PAGES, BLOCKED_RESOURCES
+from newsfeedback.httpcache import CachedResponse
+from newsfeedback.main import get_article_metadata_chain_bs_pipeline
+from newsfeedback.politeness import rate_limiter
+from conftest import article_html
+
+CONSENT_HTML = ('<div id="sp_message_container_1" class="message-overlay">'
+                '<iframe id="sp_message_iframe_1"></iframe><button class="sp_choice_type_11">OK</button></div>')
+
+
+class LoadingDriver(FakeDriver):
+    """ A FakeDriver whose DOM is still loading for the first few checks. """
+
+    def __init__(self, pages=None, loading_checks=2):
+        super().__init__(pages)
+        self.loading_checks = loading_checks
+        self.checks = 0
+
+    def execute_script(self, script, *args):
+        self.checks += 1
+        return "loading" if self.checks <= self.loading_checks else "complete"
+
+
+class CountingFactory(object):
+    def __init__(self, pages=None):
+        self.pages = pages if pages is not None else {}
+        self.drivers = []
+
+    def __call__(self):
+        driver = FakeDriver(self.pages)
+        self.drivers.append(driver)
+        return driver
+
+
+@pytest.fixture
+def fake_driver_pool():
+    factory = CountingFactory()
+    driver_pool.configure(size=1, max_pages=DEFAULT_MAX_PAGES, factory=factory)
+    yield factory
+    driver_pool.configure(size=DEFAULT_POOL_SIZE, max_pages=DEFAULT_MAX_PAGES, factory=new_chrome_driver)
+
+
+class TestDriverPool(object):
+    def test_pool_starts_lazily(self):
+        """ Asserts that no browser is started before one is acquired. """
+        factory = CountingFactory()
+        pool = DriverPool(factory=factory)
+        before = len(factory.drivers)
+        with pool.driver():
+            pass
+        message = ("{0} browsers were started before and {1} after acquiring one.".format(before, len(factory.drivers)))
+        assert before == 0 and len(factory.drivers) == 1, message
+
+    def test_pool_reuses_drivers(self):
+        """ Asserts that a released browser is handed out again instead of starting a new one. """
+        factory = CountingFactory()
+        pool = DriverPool(factory=factory)
+        with pool.driver() as first:
+            pass
+        with pool.driver() as second:
+            pass
+        message = ("The pool started {0} browsers for two consecutive uses.".format(len(factory.drivers)))
+        assert first is second and len(factory.drivers) == 1, message
+
+    def test_pool_is_capped(self):
+        """ Asserts that a caller waits for a free browser once the pool is at its size. """
+        factory = CountingFactory()
+        pool = DriverPool(size=1, factory=factory)
+        events = []
+        first = pool.acquire()
+        def second_caller():
+            with pool.driver():
+                events.append("second")
+        thread = threading.Thread(target=second_caller)
+        thread.start()
+        time.sleep(0.1)
+        events.append("release")
+        pool.release(first)
+        thread.join(timeout=5)
+        message = ("Events happened in the order {0} with {1} browsers.".format(events, len(factory.drivers)))
+        assert events == ["release", "second"] and len(factory.drivers) == 1, message
+
+    def test_pool_recycles_after_max_pages(self):
+        """ Asserts that a browser is restarted once it has loaded max_pages pages. """
+        factory = CountingFactory()
+        pool = DriverPool(max_pages=2, factory=factory)
+        with pool.driver() as pooled:
+            for number in range(3):
+                pooled.get(f"https://www.handelsblatt.com/artikel-{number}")
+        message = ("{0} browsers were started for three pages.".format(len(factory.drivers)))
+        assert len(factory.drivers) == 2 and factory.drivers[0].closed, message
+
+    def test_pool_shutdown_quits_browsers(self):
+        """ Asserts that shutting down the pool quits every idle browser. """
+        factory = CountingFactory()
+        pool = DriverPool(size=2, factory=factory)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+        pool.shutdown()
+        message = ("Not all browsers were quit on shutdown.")
+        assert all(driver.closed for driver in factory.drivers) and pool.started == 0, message
+
+    def test_pool_discards_broken_driver(self):
+        """ Asserts that a browser whose use raised an error is quit instead of being reused. """
+        factory = CountingFactory()
+        pool = DriverPool(factory=factory)
+        with pytest.raises(RuntimeError):
+            with pool.driver():
+                raise RuntimeError("Chrome crashed.")
+        with pool.driver():
+            pass
+        message = ("The broken browser was handed out again.")
+        assert factory.drivers[0].closed and len(factory.drivers) == 2, message
+
+    def test_bs_pipeline_shares_pool(self, fake_driver_pool):
+        """ Asserts that consecutive runs of the BeautifulSoup metadata chain share one browser. """
+        article_url_list = ["https://www.derstandard.at/story/1/erster-artikel", "https://www.derstandard.at/story/2/zweiter-artikel"]
+        for number, article_url in enumerate(article_url_list, 1):
+            path = article_url.replace("https://www.derstandard.at", "")
+            fake_driver_pool.pages[article_url] = article_html(path, number).replace("<body>", f"<body>{CONSENT_HTML}")
+        rate_limiter.configure("https://www.derstandard.at/", rate=1000, jitter=0)
+        refused = CachedResponse(article_url_list[0], 403, b"", {})
+        with mock.patch("newsfeedback.main.http_cache.get", return_value=refused), \
+             mock.patch("newsfeedback.main.BROWSER_SETTLE_TIME", 0):
+            first = get_article_metadata_chain_bs_pipeline(article_url_list)
+            second = get_article_metadata_chain_bs_pipeline(article_url_list)
+        message = ("{0} and {1} articles were extracted with {2} browsers.".format(first.shape[0], second.shape[0], len(fake_driver_pool.drivers)))
+        assert first.shape[0] == 2 and second.shape[0] == 2 and len(fake_driver_pool.drivers) == 1, message
+
+    def test_bs_pipeline_static_articles_start_no_browser(self, fake_driver_pool):
+        """ Asserts that no browser is started when every article downloads without JavaScript. """
+        article_url_list = ["https://www.welt.de/politik/artikel-1", "https://www.welt.de/politik/artikel-2"]
+        with mock.patch("newsfeedback.main.download", side_effect=lambda url: article_html(url, 1)), \
+             mock.patch("newsfeedback.main.POLITE_RATE", None):
+            actual = get_article_metadata_chain_bs_pipeline(article_url_list)
+        message = ("{0} browsers were started for {1} static articles.".format(len(fake_driver_pool.drivers), actual.shape[0]))
+        assert actual.shape[0] == 2 and len(fake_driver_pool.drivers) == 0, message
+
+    def test_bs_pipeline_consent_clicked_once_per_host(self, fake_driver_pool):
+        """ Asserts that the consent button is clicked once per host, not once per article. """
+        article_url_list = ["https://www.welt.de/politik/artikel-1", "https://www.stern.de/politik/artikel-2",
+                            "https://www.welt.de/politik/artikel-3", "https://www.stern.de/politik/artikel-4"]
+        for number, article_url in enumerate(article_url_list, 1):
+            fake_driver_pool.pages[article_url] = article_html(article_url, number).replace("<body>", f"<body>{CONSENT_HTML}")
+        rate_limiter.configure("https://www.welt.de/", rate=1000, jitter=0)
+        rate_limiter.configure("https://www.stern.de/", rate=1000, jitter=0)
+        with mock.patch("newsfeedback.main.download", return_value=None), \
+             mock.patch("newsfeedback.main.BROWSER_SETTLE_TIME", 0):
+            actual = get_article_metadata_chain_bs_pipeline(article_url_list)
+        clicks = sum(driver.clicks for driver in fake_driver_pool.drivers)
+        message = ("The consent button was clicked {0} times for {1} articles on two hosts.".format(clicks, actual.shape[0]))
+        assert actual.shape[0] == 4 and clicks == 2 and len(fake_driver_pool.drivers) == 1, message
+
+
+class TestPageLoads(object):
+    def test_light_pages_block_resources_and_skip_the_sleep(self):
+        """ Asserts that a light page's site gets its requests blocked once per browser, that the page is read as soon
+        as its DOM is ready and its wait_for element is there, and that a full page unblocks and settles as before. """
+        page_loads.configure("https://www.handelsblatt.com/", 'light', wait_for="article", block=["*.handelsblatt-static.com*"])
+        page_loads.configure("https://www.welt.de/", 'full')
+        pooled = PooledDriver(lambda: LoadingDriver({"https://www.handelsblatt.com/artikel-1": "<article>Text</article>"}), DEFAULT_MAX_PAGES)
+        with mock.patch("newsfeedback.drivers.time") as fake_time:
+            sleep = fake_time.sleep
+            for url in ("https://www.handelsblatt.com/artikel-2", "https://www.handelsblatt.com/artikel-1"):
+                pooled.get(url)
+            pooled.wait_until_ready("https://www.handelsblatt.com/artikel-1", 3)
+            light_sleeps = sleep.call_count
+            pooled.get("https://www.welt.de/artikel-1")
+            pooled.wait_until_ready("https://www.welt.de/artikel-1", 3)
+        commands = pooled.driver.cdp_commands
+        actual = (commands[0][0], commands[1][1]['urls'][:len(BLOCKED_RESOURCES)], commands[1][1]['urls'][-1], commands[2], len(commands),
+                  pooled.driver.checks, light_sleeps, sleep.call_args_list)
+        expected = ('Network.enable', BLOCKED_RESOURCES, "*.handelsblatt-static.com*", ('Network.setBlockedURLs', {'urls': []}), 3,
+                    4, 0, [mock.call(3)])
+        message = ("The browser got {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
@@ -0,0 +1,118 @@
+""" Test suite for newsfeedback.engine
+"""
+import threading, time
+import pandas as pd
+import pytest
+from unittest import mock
+from newsfeedback.drivers import FakeDriver, driver_pool, new_chrome_driver, DEFAULT_POOL_SIZE, DEFAULT_MAX_PAGES
+from newsfeedback.engine import CollectionEngine, HomepageJob, IN_FLIGHT_PER_SLOT
+from newsfeedback.httpcache import CachedResponse
+from newsfeedback.main import fetch_article, get_pipeline_from_config, initiate_data_collection, retrieve_config
+from conftest import article_html
+
+HOMEPAGE_URLS = ["https://www.testzeitung.de/", "https://www.testblatt.de/"]
+CONSENT_HTML = ('<div id="sp_message_container_1" class="message-overlay">'
+                '<iframe id="sp_message_iframe_1"></iframe><button class="sp_choice_type_11">OK</button></div>')
+HOMEPAGE_HTML = "<html><body>" + "".join(f'<a href="/politik/artikel-{number}">Artikel</a>' for number in (1, 2, 3)) + "</body></html>"
+
+
+def online_response(url, **kwargs):
+    if url in HOMEPAGE_URLS:
+        return CachedResponse(url, 200, HOMEPAGE_HTML.encode("utf-8"), {"Content-Type": "text/html; charset=utf-8"})
+    if url.endswith("artikel-2"): # only loads in the browser
+        return CachedResponse(url, 403, b"", {})
+    return CachedResponse(url, 200, article_html(url[url.index("/politik"):], int(url[-1])).encode("utf-8"),
+                          {"Content-Type": "text/html; charset=utf-8"})
+
+
+def browser_pages():
+    return {homepage_url + "politik/artikel-2": article_html("/politik/artikel-2", 2).replace("<body>", f"<body>{CONSENT_HTML}")
+            for homepage_url in HOMEPAGE_URLS}
+
+
+@pytest.fixture
+def offline_setup():
+    homepage_config = {homepage_url: {'pipeline': 'beautifulsoup', 'filter': 'off'} for homepage_url in HOMEPAGE_URLS}
+    driver_pool.configure(size=1, factory=lambda: FakeDriver(browser_pages()))
+    with mock.patch("newsfeedback.main.retrieve_config",
+                    side_effect=lambda type_config, *args: homepage_config if type_config == 'homepage' else retrieve_config(type_config, *args)), \
+         mock.patch("newsfeedback.main.BROWSER_SETTLE_TIME", 0), \
+         mock.patch("newsfeedback.main.POLITE_RATE", None), \
+         mock.patch("newsfeedback.main.http_cache.get", side_effect=online_response):
+        yield
+    driver_pool.shutdown()
+    driver_pool.configure(size=DEFAULT_POOL_SIZE, max_pages=DEFAULT_MAX_PAGES, factory=new_chrome_driver)
+
+
+def stand_in_job(homepage_url, article_url_list, exported, per_host):
+    def export(rows):
+        exported[homepage_url] = list(rows)
+        return homepage_url
+    return HomepageJob(homepage_url, lambda: article_url_list, fetch_article, export, per_host=per_host)
+
+
+class TestCollectionEngine(object):
+    def test_limits_hold_across_homepages(self, stand_in_server):
+        """ Asserts that two hosts are collected side by side without exceeding the global limit, and that
+        every homepage's articles are exported in the order of its URLs, leaving out those that failed. """
+        exported = {}
+        # two hostnames for the same stand-in server
+        urls = {"127.0.0.1": stand_in_server.article_urls(6), "localhost": [url.replace("127.0.0.1", "localhost") for url in stand_in_server.article_urls(6)]}
+        urls["localhost"][2] = urls["localhost"][2].replace("artikel-3", "fehlt")
+        for number in range(1, 7):
+            stand_in_server.delays[f"/politik/artikel-{number}"] = 0.1
+        jobs = [stand_in_job(f"http://{host}/", article_url_list, exported, per_host=3) for host, article_url_list in urls.items()]
+        results = CollectionEngine(concurrency=4).run(jobs)
+        actual = [result['status'] for result in results]
+        message = ("The engine reported {0}, despite expecting both homepages to be collected.".format(actual))
+        assert actual == ['ok', 'ok'], message
+        message = ("{0} downloads ran at the same time, despite expecting more than one host's 3 and at most 4.".format(stand_in_server.max_active))
+        assert 3 < stand_in_server.max_active <= 4, message
+        actual = {homepage_url: [article_url for article_url, _ in rows] for homepage_url, rows in exported.items()}
+        expected = {"http://127.0.0.1/": urls["127.0.0.1"], "http://localhost/": urls["localhost"][:2] + urls["localhost"][3:]}
+        message = ("The engine exported {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
+
+    def test_articles_run_only_a_window_ahead_of_the_export(self):
+        """ Asserts that while a homepage's oldest article is still being collected, only a window of later ones is
+        started, and that the export receives the rows in URL order while they are collected. """
+        article_url_list = [f"https://www.testzeitung.de/politik/artikel-{number}" for number in range(1, 41)]
+        started, started_while_first_ran, exported = [], [], []
+        def fetch(article_url):
+            started.append(article_url)
+            if article_url == article_url_list[0]:
+                time.sleep(0.3)
+                started_while_first_ran.append(len(started))
+            return article_html(article_url[26:], 1)
+        def export(rows):
+            for article_url, _ in rows:
+                exported.append((article_url, threading.current_thread().name))
+            return "exported"
+        job = HomepageJob("https://www.testzeitung.de/", lambda: article_url_list, fetch, export, per_host=2)
+        results = CollectionEngine(concurrency=4).run([job])
+        actual = (results[0]['status'], started_while_first_ran, [article_url for article_url, _ in exported], exported[0][1].startswith("newsfeedback-export"))
+        expected = ('ok', [2 * IN_FLIGHT_PER_SLOT], article_url_list, True)
+        message = ("The engine gave {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
+
+    def test_failing_homepage_is_isolated(self, stand_in_server):
+        """ Asserts that a homepage whose discovery raises is reported as failed, while the other one is collected. """
+        exported = {}
+        broken = HomepageJob("https://www.spiegel.de/", mock.Mock(side_effect=RuntimeError("Consent button timed out.")), fetch_article, list)
+        results = CollectionEngine().run([broken, stand_in_job(f"{stand_in_server.url}/", stand_in_server.article_urls(2), exported, per_host=2)])
+        actual = [(result['status'], result['error']) for result in results]
+        message = ("The engine reported {0}.".format(actual))
+        assert actual[0][0] == 'failed' and 'Consent button' in actual[0][1] and actual[1] == ('ok', None), message
+
+
+class TestAsyncioDataCollection(object):
+    def test_matches_chained_pipeline(self, tmp_path, offline_setup):
+        """ Asserts that a run with the asyncio engine collects every homepage with the same articles as the
+        chained beautifulsoup pipeline, including those only a browser could load. """
+        expected = pd.read_csv(get_pipeline_from_config(HOMEPAGE_URLS[0], tmp_path/"chained"))
+        results = initiate_data_collection(tmp_path/"asyncio", engine='asyncio')
+        message = ("The asyncio run reported {0}.".format(results))
+        assert [result['status'] for result in results] == ['ok', 'ok'], message
+        actual = pd.read_csv(results[0]['path'])
+        message = ("The asyncio run found the titles {0}, despite expecting {1}.".format(list(actual['title']), list(expected['title'])))
+        assert expected.shape[0] == 3 and actual.drop(columns='datetime').equals(expected.drop(columns='datetime')), message
@@ -0,0 +1,75 @@
+""" Test suite for newsfeedback.extraction
+"""
+import os, pickle, signal, time
+import pytest
+from conftest import article_html
+from newsfeedback.extraction import ExtractionPool, extract_metadata, DEFAULT_EXTRACT_WORKERS
+from newsfeedback.main import get_article_metadata_chain_trafilatura_pipeline
+
+
+@pytest.fixture
+def process_pool():
+    pool = ExtractionPool()
+    pool.configure(2)
+    yield pool
+    pool.shutdown()
+
+
+class TestExtraction(object):
+    def test_extract_metadata_is_picklable(self):
+        """ Asserts that the extracted metadata, including the body trees, can be sent back from a worker process. """
+        metadata = extract_metadata(article_html("/politik/artikel-1", 1), include_comments=True)
+        message = ("extract_metadata() returned the title {0}.".format(metadata['title']))
+        assert pickle.loads(pickle.dumps(metadata))['title'] == "Artikel 1" and isinstance(metadata['body'], str), message
+
+    def test_process_pool_matches_in_process(self, process_pool):
+        """ Asserts that extracting in worker processes gives the same metadata as extracting in-process,
+        keyed by the position of each download. """
+        downloads = [(number, article_html(f"/politik/artikel-{number}", number)) for number in range(1, 7)]
+        expected = dict(ExtractionPool(1).extract(downloads, include_links=True))
+        actual = dict(process_pool.extract(iter(downloads), include_links=True))
+        message = ("The worker processes returned the titles {0}.".format({k: v['title'] for k, v in actual.items()}))
+        assert actual == expected, message
+
+    def test_only_one_worker_extracts_in_process(self):
+        """ Asserts that the pool leaves a core to the downloads by default, and that only a single worker
+        extracts without starting a worker process. """
+        pool = ExtractionPool(1)
+        extracted = dict(pool.extract([(0, article_html("/politik/artikel-1", 1))]))
+        actual = (DEFAULT_EXTRACT_WORKERS, pool._executor, extracted[0]['title'])
+        expected = (max(1, (os.cpu_count() or 1) - 1), None, "Artikel 1")
+        message = ("The default workers, the executor and the title were {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
+
+    def test_crashed_worker_process_is_replaced(self, process_pool):
+        """ Asserts that once a worker process has died, the broken pool is dropped and the next
+        articles are extracted by new worker processes instead of failing as well. """
+        downloads = [(number, article_html(f"/politik/artikel-{number}", number)) for number in range(1, 4)]
+        dict(process_pool.extract(iter(downloads[:1])))
+        broken = process_pool._executor
+        for process in list(broken._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+        deadline = time.monotonic() + 30
+        while not broken._broken and time.monotonic() < deadline:
+            time.sleep(0.05)
+        actual = {key: metadata['title'] for key, metadata in process_pool.extract(iter(downloads))}
+        message = ("After a worker process died, the pool returned {0}.".format(actual))
+        assert actual == {1: "Artikel 1", 2: "Artikel 2", 3: "Artikel 3"} and process_pool._executor is not broken, message
+
+    def test_failed_downloads_pass_through(self, process_pool):
+        """ Asserts that missing downloads come back as None without being sent to a worker. """
+        downloads = [(0, None), (1, article_html("/politik/artikel-1", 1)), (2, "<html></html>")]
+        actual = dict(process_pool.extract(downloads))
+        message = ("The pool returned {0} for the missing and the empty download.".format((actual[0], actual[2])))
+        assert actual[0] is None and actual[2] is None and actual[1]['title'] == "Artikel 1", message
+
+    def test_chain_reassembles_url_order(self, stand_in_server, process_pool, monkeypatch):
+        """ Asserts that the metadata dataframe keeps the order of the article URLs when the
+        articles are extracted in worker processes. """
+        monkeypatch.setattr("newsfeedback.main.extraction_pool", process_pool)
+        article_url_list = stand_in_server.article_urls(8)
+        actual = get_article_metadata_chain_trafilatura_pipeline(article_url_list, workers=4)
+        expected = [f"Artikel {number}" for number in range(1, 9)]
+        message = ("get_article_metadata_chain_trafilatura_pipeline(article_url_list) "
+                   "returned the titles {0}, despite expecting {1}.".format(list(actual['title']), expected))
+        assert list(actual['title']) == expected, message
@@ -0,0 +1,59 @@
+""" Test suite for newsfeedback.filters
+"""
+import os
+import yaml
+from newsfeedback.filters import UrlFilter
+from newsfeedback.main import filter_urls, get_url_filter
+
+ARTICLE_URL_LIST = ["https://www.welt.de/politik/deutschland/article123/Titel.html",
+                    "https://www.welt.de/politik/",
+                    "https://www.welt.de/",
+                    "https://www.welt.de/impressum",
+                    "https://www.spiegel.de/__proto_url__",
+                    "https://www.zeit.de/exklusive-zeit-artikel",
+                    "https://www.bild.de/anzeigen/angebote/foo-123.html",
+                    "https://www.bild.de/spiele/foo-123.html",
+                    "https://www.handelsblatt.com/unternehmen/industrie/foo/100000.html",
+                    "https://www.faz.net/aktuell/politik/artikel/foo-1.html",
+                    "https://www.sueddeutsche.de/updates-rss",
+                    "https://www.tagesschau.de/index.html",
+                    "https://www.welt.de/politik/deutschland/article123/Titel.html",
+                    "https://www.n-tv.de/games/Spielen-article1.html",
+                    "https://www.focus.de/gutscheine/",
+                    "https://www.stern.de/de/de/foo"]
+
+
+class TestUrlFilter(object):
+    def test_filter_urls_default_config(self):
+        """ Asserts that the default filter keeps the same URLs, in the same order and without duplicates,
+        as the uncompiled filter did. """
+        actual = filter_urls(ARTICLE_URL_LIST, 'on')
+        expected = ["https://www.welt.de/politik/deutschland/article123/Titel.html",
+                    "https://www.handelsblatt.com/unternehmen/industrie/foo/100000.html",
+                    "https://www.faz.net/aktuell/politik/artikel/foo-1.html",
+                    "https://www.stern.de/de/de/foo"]
+        message = ("filter_urls(article_url_list) returned {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
+
+    def test_no_sections_chosen(self):
+        """ Asserts that without any section switched on, only section fronts are removed. """
+        url_filter = UrlFilter({'service': 'off'}, {'service': '-"spiele"'})
+        actual = url_filter.filter(["https://www.bild.de/spiele/foo-123.html", "https://www.bild.de/"])
+        message = ("UrlFilter.filter() returned {0}.".format(actual))
+        assert actual == ["https://www.bild.de/spiele/foo-123.html"], message
+
+    def test_filter_is_rebuilt_when_config_changes(self, tmp_path, monkeypatch):
+        """ Asserts that the compiled filter is reused while the configs are unchanged and rebuilt once one is edited. """
+        filter_choice, filter_sections = tmp_path/"filter_choice.yaml", tmp_path/"filter_sections.yaml"
+        filter_choice.write_text(yaml.dump({'service': 'on'}))
+        filter_sections.write_text('"service":\n  -"spiele"\n')
+        monkeypatch.setattr("newsfeedback.main.resolve_config_path",
+                            lambda type_config: filter_choice if type_config == 'filter_choice' else filter_sections)
+        first, second = get_url_filter(), get_url_filter()
+        filter_sections.write_text('"service":\n  -"spiele"\n  -"games"\n')
+        stat = filter_sections.stat() # coarse file system clocks may not tell the two writes apart
+        os.utime(filter_sections, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+        third = get_url_filter()
+        actual = third.filter(["https://www.n-tv.de/games/foo-1.html"])
+        message = ("The filter was not reused ({0}) or not rebuilt after the edit ({1}).".format(first is second, actual))
+        assert first is second and third is not first and actual == [], message
@@ -0,0 +1,118 @@
+""" Test suite for newsfeedback.httpcache
+"""
+import pytest
+from pathlib import Path
+from unittest import mock
+from newsfeedback.httpcache import HttpCache, decode_content, http_cache
+from newsfeedback.main import download
+from conftest import article_html
+
+
+def validated_page(etag=None, last_modified=None, body=None):
+    """ Page that answers with 304 whenever the request carries a matching validator. """
+    def page(path, request_headers):
+        if etag and request_headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+        if last_modified and request_headers.get("If-Modified-Since") == last_modified:
+            return 304, {"Last-Modified": last_modified}, b""
+        headers = {"Content-Type": "text/html; charset=utf-8"}
+        if etag:
+            headers["ETag"] = etag
+        if last_modified:
+            headers["Last-Modified"] = last_modified
+        return 200, headers, body if body is not None else article_html(path, 1).encode("utf-8")
+    return page
+
+
+@pytest.fixture
+def configured_http_cache(tmp_path):
+    http_cache.configure(tmp_path/"http_cache")
+    yield http_cache
+    http_cache.configure(None)
+
+
+class TestHttpCache(object):
+    def test_etag_revalidation(self, tmp_path, stand_in_server):
+        """ Asserts that a page with an ETag is revalidated with If-None-Match and served from disk on 304. """
+        stand_in_server.pages["/startseite"] = validated_page(etag='"v1"')
+        cache = HttpCache(tmp_path/"http_cache")
+        first = cache.get(f"{stand_in_server.url}/startseite")
+        second = cache.get(f"{stand_in_server.url}/startseite")
+        sent = stand_in_server.requests[-1][1].get("If-None-Match")
+        message = ("The second download sent If-None-Match {0} and came from the cache: {1}.".format(sent, getattr(second, "from_cache", False)))
+        assert sent == '"v1"' and second.from_cache and second.content == first.content, message
+
+    def test_last_modified_revalidation(self, tmp_path, stand_in_server):
+        """ Asserts that a page with Last-Modified is revalidated with If-Modified-Since. """
+        stand_in_server.pages["/startseite"] = validated_page(last_modified="Mon, 06 Jan 2025 10:00:00 GMT")
+        cache = HttpCache(tmp_path/"http_cache")
+        cache.get(f"{stand_in_server.url}/startseite")
+        second = cache.get(f"{stand_in_server.url}/startseite")
+        message = ("The page was not served from the cache after a 304.")
+        assert second.from_cache and cache.hits == 1 and cache.misses == 1, message
+
+    def test_changed_page_is_downloaded_again(self, tmp_path, stand_in_server):
+        """ Asserts that a page whose ETag changed is downloaded and stored again. """
+        stand_in_server.pages["/startseite"] = validated_page(etag='"v1"', body=b"<html>alt</html>")
+        cache = HttpCache(tmp_path/"http_cache")
+        cache.get(f"{stand_in_server.url}/startseite")
+        stand_in_server.pages["/startseite"] = validated_page(etag='"v2"', body=b"<html>neu</html>")
+        second = cache.get(f"{stand_in_server.url}/startseite")
+        third = cache.get(f"{stand_in_server.url}/startseite")
+        message = ("The changed page was not picked up: {0}, {1}.".format(second.content, third.content))
+        assert second.content == b"<html>neu</html>" and third.from_cache and third.content == b"<html>neu</html>", message
+
+    def test_interrupted_store_keeps_the_cached_body(self, tmp_path, stand_in_server):
+        """ Asserts that a body whose writing breaks off leaves the cached version and its validator intact,
+        so that a later 304 is not answered with a truncated page. """
+        stand_in_server.pages["/startseite"] = validated_page(etag='"v1"', body=b"<html>alt</html>")
+        cache = HttpCache(tmp_path/"http_cache")
+        cache.get(f"{stand_in_server.url}/startseite")
+        stand_in_server.pages["/startseite"] = validated_page(etag='"v2"', body=b"<html>neu</html>")
+        write_bytes = Path.write_bytes
+        def disk_full(path, data):
+            write_bytes(path, data[:len(data) // 2])
+            raise OSError("No space left on device")
+        with mock.patch("pathlib.Path.write_bytes", disk_full):
+            second = cache.get(f"{stand_in_server.url}/startseite")
+        stand_in_server.pages["/startseite"] = validated_page(etag='"v1"', body=b"<html>alt</html>")
+        third = cache.get(f"{stand_in_server.url}/startseite")
+        leftovers = [path.name for path in (tmp_path/"http_cache"/"bodies").glob("*.part")]
+        actual = (second.content, third.from_cache, third.content, leftovers)
+        expected = (b"<html>neu</html>", True, b"<html>alt</html>", [])
+        message = ("The downloads and leftovers were {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
+
+    def test_pages_without_validators_are_not_stored(self, tmp_path, stand_in_server):
+        """ Asserts that pages without ETag or Last-Modified are not kept on disk. """
+        cache = HttpCache(tmp_path/"http_cache")
+        cache.get(f"{stand_in_server.url}/politik/artikel-1")
+        message = ("{0} bytes were stored for a page without validators.".format(cache.size()))
+        assert cache.size() == 0, message
+
+    def test_least_recently_used_pages_are_evicted(self, tmp_path, stand_in_server):
+        """ Asserts that the least recently used pages are evicted once the cache is full. """
+        for name in ["a", "b", "c"]:
+            stand_in_server.pages[f"/{name}"] = validated_page(etag=f'"{name}"', body=b"x" * 100)
+        cache = HttpCache(tmp_path/"http_cache", max_bytes=250)
+        cache.get(f"{stand_in_server.url}/a")
+        cache.get(f"{stand_in_server.url}/b")
+        cache.get(f"{stand_in_server.url}/a")
+        cache.get(f"{stand_in_server.url}/c")
+        kept = [name for name in ["a", "b", "c"] if cache._lookup(f"{stand_in_server.url}/{name}")]
+        message = ("The cache kept {0} at {1} bytes.".format(kept, cache.size()))
+        assert kept == ["a", "c"] and cache.size() <= 250, message
+
+    def test_download_uses_cache(self, configured_http_cache, stand_in_server):
+        """ Asserts that the pipelines' download() revalidates through the configured cache. """
+        stand_in_server.pages["/politik/artikel-1"] = validated_page(etag='"v1"')
+        first = download(f"{stand_in_server.url}/politik/artikel-1")
+        second = download(f"{stand_in_server.url}/politik/artikel-1")
+        message = ("download() did not return the same page from the cache.")
+        assert "Artikel 1" in first and first == second and configured_http_cache.hits == 1, message
+
+    def test_decode_content_charset(self):
+        """ Asserts that pages are decoded with the charset from the header or the document. """
+        latin = "<html><head><meta charset=\"iso-8859-1\"></head><body>Straße</body></html>".encode("iso-8859-1")
+        message = ("The document's charset was not used for decoding.")
+        assert "Straße" in decode_content(latin, {}), message
@@ -1,6 +1,6 @@
 """ Test suite for newsfeedback.main
 """
-import pytest, re, yaml
+import pytest, re, time, yaml
 import pandas as pd
 from click.testing import CliRunner
 from _pytest.logging import LogCaptureFixture
@@ -10,9 +10,12 @@ from unittest import mock
 from newsfeedback.main import retrieve_config
 from newsfeedback.main import get_article_urls_trafilatura_pipeline, get_article_metadata_chain_trafilatura_pipeline
 from newsfeedback.main import get_article_urls_bs_pipeline, get_article_metadata_chain_bs_pipeline
-from newsfeedback.main import filter_urls
+from newsfeedback.main import filter_urls, fetch_articles, stream_articles, IN_FLIGHT_PER_WORKER
 from newsfeedback.main import chained_trafilatura_pipeline,  chained_beautifulsoup_pipeline
 from newsfeedback.main import pipeline_picker, write_in_homepage_config, copy_default_to_metadata_config, copy_default_to_homepage_config
+from newsfeedback.main import initiate_data_collection
+from newsfeedback.httpcache import CachedResponse
+from trafilatura import downloads, feeds
 from selenium.common.exceptions import TimeoutException
 from selenium import webdriver
 
@@ -105,6 +108,74 @@ class TestTrafilaturaPipeline(object):
         message = ("The exported dataframe is not empty, despite this being expected.")                
         assert df_from_file.shape[0] == 0, message
 
+class TestConcurrentFetching(object):
+    def test_fetch_articles_keeps_url_order(self, stand_in_server):
+        """ Asserts that downloads are returned in the order of the given URLs, even if
+        earlier URLs take longer to answer than later ones. """
+        article_url_list = stand_in_server.article_urls(6)
+        for number, article_url in enumerate(article_url_list):
+            stand_in_server.delays[article_url.replace(stand_in_server.url, "")] = 0.05 * (6 - number)
+        actual = fetch_articles(article_url_list, workers=6)
+        expected = [f"<title>Artikel {number} - Testzeitung</title>" for number in range(1, 7)]
+        message = ("fetch_articles(article_url_list) did not return the downloads in URL order.")
+        assert all(title in downloaded for title, downloaded in zip(expected, actual)), message
+
+    def test_fetch_articles_is_bounded(self, stand_in_server):
+        """ Asserts that no more than the given number of workers download at the same time. """
+        article_url_list = stand_in_server.article_urls(12)
+        for article_url in article_url_list:
+            stand_in_server.delays[article_url.replace(stand_in_server.url, "")] = 0.05
+        fetch_articles(article_url_list, workers=3)
+        message = ("{0} downloads ran at the same time, despite allowing only {1}.".format(stand_in_server.max_active, 3))
+        assert 1 < stand_in_server.max_active <= 3, message
+
+    def test_feed_discovery_downloads_through_the_session(self):
+        """ Asserts that trafilatura's feed discovery downloads the homepage with newsfeedback's session,
+        and that trafilatura's own fetch_url is back in place afterwards. """
+        homepage_url = "https://www.testzeitung.de/"
+        homepage = CachedResponse(homepage_url, 200, b"<html><body><p>Keine Feeds.</p></body></html>", {"Content-Type": "text/html; charset=utf-8"})
+        with mock.patch("newsfeedback.main.http_cache.get", return_value=homepage) as plain:
+            get_article_urls_trafilatura_pipeline(homepage_url)
+        actual = (plain.call_args_list[0][0][0], feeds.fetch_url is downloads.fetch_url)
+        expected = (homepage_url, True)
+        message = ("The feed discovery downloaded {0} and restored fetch_url: {1}.".format(*actual))
+        assert actual == expected, message
+
+    def test_stream_articles_runs_only_a_window_ahead(self):
+        """ Asserts that while the oldest article is still downloading, only a window of later ones is started,
+        however many articles there are. """
+        article_url_list = [f"https://www.testzeitung.de/politik/artikel-{number}" for number in range(1, 101)]
+        started = []
+        started_while_first_ran = []
+        def fetch(article_url):
+            started.append(article_url)
+            if article_url == article_url_list[0]:
+                time.sleep(0.3)
+                started_while_first_ran.append(len(started))
+            return "x" * 1000000
+        streamed = sum(1 for _ in stream_articles(article_url_list, workers=2, fetch=fetch))
+        message = ("{0} downloads were started while the first one ran, despite a window of {1}.".format(started_while_first_ran, 2 * IN_FLIGHT_PER_WORKER))
+        assert streamed == 100 and started_while_first_ran == [2 * IN_FLIGHT_PER_WORKER], message
+
+    def test_fetch_articles_failed_download(self, stand_in_server):
+        """ Asserts that a failing download is returned as None instead of stopping the others. """
+        article_url_list = stand_in_server.article_urls(2) + [f"{stand_in_server.url}/kaputt"]
+        actual = fetch_articles(article_url_list, workers=2)
+        message = ("fetch_articles(article_url_list) did not return None for the failed download.")
+        assert actual[2] is None and actual[0] is not None, message
+
+    def test_get_metadata_trafilatura_pipeline_local_order(self, stand_in_server):
+        """ Asserts that the metadata dataframe keeps the order of the article URLs
+        when the articles are downloaded concurrently. """
+        article_url_list = stand_in_server.article_urls(8)
+        for number, article_url in enumerate(article_url_list):
+            stand_in_server.delays[article_url.replace(stand_in_server.url, "")] = 0.02 * (8 - number)
+        actual = get_article_metadata_chain_trafilatura_pipeline(article_url_list, workers=4)
+        expected = [f"Artikel {number}" for number in range(1, 9)]
+        message = ("get_article_metadata_chain_trafilatura_pipeline(article_url_list) "
+                   "returned the titles {0}, despite expecting {1}.".format(list(actual['title']), expected))
+        assert list(actual['title']) == expected, message
+
 class TestBeautifulSoupPipeline(object):
     """ Due to the nature of BeautifulSoup, there are no 'bad URLs', unless they have no a hrefs."""
 
@@ -336,3 +407,34 @@ class TestPipelineFromConfig(object):
         runner.invoke(pipeline_picker, f"-u '{homepage_url}' \n")
         message = ("The given URL was already in the config file, despite being expected not to be.".format(caplog.text))                
         assert "ERROR" in caplog.text, message
+
+
+class TestDataCollection(object):
+    homepage_config = {'https://www.welt.de/': {}, 'https://www.spiegel.de/': {}, 'https://www.faz.net/': {}}
+
+    def fake_pipeline(self, homepage_url, output_folder, skip_seen=False, refetch_after=None, output_format='csv', escape=None):
+        time.sleep(0.3)
+        if homepage_url == 'https://www.spiegel.de/':
+            raise RuntimeError("Consent button timed out.")
+        return Path(output_folder)/f"{homepage_url}.csv"
+
+    def test_homepages_run_concurrently(self, tmp_path):
+        """ Asserts that with several workers, homepages are collected at the same time. """
+        with mock.patch("newsfeedback.main.retrieve_config", return_value=self.homepage_config), \
+             mock.patch("newsfeedback.main.get_pipeline_from_config", side_effect=self.fake_pipeline):
+            started = time.monotonic()
+            initiate_data_collection(tmp_path, workers=3)
+            elapsed = time.monotonic() - started
+        message = ("Collecting three homepages with three workers took {0:.2f}s.".format(elapsed))
+        assert elapsed < 0.8, message
+
+    def test_failing_homepage_is_isolated(self, tmp_path):
+        """ Asserts that an error on one homepage is reported in the run summary,
+        while the other homepages are still collected. """
+        with mock.patch("newsfeedback.main.retrieve_config", return_value=self.homepage_config), \
+             mock.patch("newsfeedback.main.get_pipeline_from_config", side_effect=self.fake_pipeline):
+            results = initiate_data_collection(tmp_path, workers=2)
+        statuses = {result['homepage']: result['status'] for result in results}
+        expected = {'https://www.welt.de/': 'ok', 'https://www.spiegel.de/': 'failed', 'https://www.faz.net/': 'ok'}
+        message = ("The run summary reported {0}, despite expecting {1}.".format(statuses, expected))
+        assert statuses == expected and list(statuses) == list(expected), message
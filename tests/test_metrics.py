@@ -0,0 +1,93 @@
+""" Test suite for newsfeedback.metrics
+"""
+import json
+import pytest
+from unittest import mock
+from newsfeedback.drivers import FakeDriver, driver_pool, new_chrome_driver, DEFAULT_POOL_SIZE, DEFAULT_MAX_PAGES
+from newsfeedback.httpcache import CachedResponse
+from newsfeedback.main import get_pipeline_from_config, retrieve_config
+from newsfeedback.metrics import Metrics, metrics
+from conftest import article_html
+
+HOMEPAGE_URL = "https://www.testzeitung.de/"
+ARTICLE_URLS = [f"https://www.testzeitung.de/politik/artikel-{number}" for number in (1, 2, 3)]
+CONSENT_HTML = ('<div id="sp_message_container_1" class="message-overlay">'
+                '<iframe id="sp_message_iframe_1"></iframe><button class="sp_choice_type_11">OK</button></div>')
+HOMEPAGE_HTML = "<html><body>" + "".join(f'<a href="{url[27:]}">Artikel</a>' for url in ARTICLE_URLS) + "</body></html>"
+
+
+def online_response(url, **kwargs):
+    if url == HOMEPAGE_URL:
+        return CachedResponse(url, 200, HOMEPAGE_HTML.encode("utf-8"), {"Content-Type": "text/html; charset=utf-8"})
+    if url == ARTICLE_URLS[1]: # only loads in the browser
+        return CachedResponse(url, 403, b"", {})
+    return CachedResponse(url, 200, article_html(url[26:], int(url[-1])).encode("utf-8"), {"Content-Type": "text/html; charset=utf-8"})
+
+
+@pytest.fixture
+def offline_setup():
+    homepage_config = {HOMEPAGE_URL: {'pipeline': 'beautifulsoup', 'filter': 'off'}}
+    driver_pool.configure(size=1, factory=lambda: FakeDriver({ARTICLE_URLS[1]: article_html("/politik/artikel-2", 2).replace("<body>", f"<body>{CONSENT_HTML}")}))
+    with mock.patch("newsfeedback.main.retrieve_config",
+                    side_effect=lambda type_config, *args: homepage_config if type_config == 'homepage' else retrieve_config(type_config, *args)), \
+         mock.patch("newsfeedback.main.BROWSER_SETTLE_TIME", 0), \
+         mock.patch("newsfeedback.main.POLITE_RATE", None), \
+         mock.patch("newsfeedback.main.http_cache.get", side_effect=online_response):
+        yield
+    driver_pool.shutdown()
+    driver_pool.configure(size=DEFAULT_POOL_SIZE, max_pages=DEFAULT_MAX_PAGES, factory=new_chrome_driver)
+    metrics.configure()
+    metrics.start_run()
+
+
+class TestMetrics(object):
+    def test_timer_records_per_host(self):
+        """ Asserts that timed blocks are reported per hostname and stage, and that a raising block counts as an error. """
+        collected = Metrics()
+        for number in range(3):
+            with collected.timer('article_fetch', f"https://www.faz.net/politik/artikel-{number}"):
+                pass
+        with pytest.raises(ValueError):
+            with collected.timer('extraction', "https://www.welt.de/politik/artikel-1"):
+                raise ValueError("broken")
+        collected.count('links_found', "https://www.faz.net/", 12)
+        hosts = collected.report()['hosts']
+        actual = (hosts['www.faz.net']['stages']['article_fetch']['count'], hosts['www.faz.net']['counters'],
+                  hosts['www.welt.de']['errors'])
+        expected = (3, {'links_found': 12}, {'extraction': 1})
+        message = ("The report held {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected and 'p90' in hosts['www.faz.net']['stages']['article_fetch'], message
+
+    def test_prometheus_file_adds_up_runs(self, tmp_path):
+        """ Asserts that the Prometheus file holds the totals of all finished runs with cumulative buckets,
+        while the JSON report only holds the last run. """
+        collected = Metrics()
+        collected.configure(tmp_path/"run.json", tmp_path/"newsfeedback.prom")
+        for seconds in (0.003, 0.2):
+            collected.observe('export', "https://www.faz.net/", seconds)
+            collected.finish_run()
+        text = (tmp_path/"newsfeedback.prom").read_text(encoding="utf-8")
+        report = json.loads((tmp_path/"run.json").read_text(encoding="utf-8"))
+        expected = ['newsfeedback_stage_seconds_bucket{host="www.faz.net",stage="export",le="0.005"} 1',
+                    'newsfeedback_stage_seconds_bucket{host="www.faz.net",stage="export",le="0.25"} 2',
+                    'newsfeedback_stage_seconds_count{host="www.faz.net",stage="export"} 2']
+        message = ("The Prometheus file read {0}, despite expecting the lines {1}.".format(text, expected))
+        assert all(line in text.splitlines() for line in expected), message
+        message = ("The run report counted {0} exports, despite expecting 1.".format(report['hosts']['www.faz.net']['stages']['export']['count']))
+        assert report['hosts']['www.faz.net']['stages']['export']['count'] == 1, message
+        message = ("Partly written files were left behind: {0}".format(sorted(path.name for path in tmp_path.iterdir())))
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["newsfeedback.prom", "run.json"], message
+
+    def test_pipeline_reports_its_stages(self, tmp_path, offline_setup):
+        """ Asserts that a run of the beautifulsoup pipeline times every one of its stages for the homepage's host,
+        and starting the browser for all of them. """
+        metrics.start_run()
+        get_pipeline_from_config(HOMEPAGE_URL, tmp_path)
+        hosts = metrics.finish_run()['hosts']
+        actual = sorted(hosts['www.testzeitung.de']['stages'])
+        expected = ['article_fetch', 'consent_click', 'export', 'extraction', 'filtering', 'homepage_fetch', 'link_extraction']
+        message = ("The run timed the stages {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected and list(hosts['all']['stages']) == ['browser_start'], message
+        counters = hosts['www.testzeitung.de']['counters']
+        message = ("The run counted {0}, despite expecting 3 links found, kept and exported.".format(counters))
+        assert counters == {'links_found': 3, 'links_kept': 3, 'articles_exported': 3}, message
@@ -0,0 +1,36 @@
+""" Test suite for newsfeedback.parsers
+"""
+import pytest
+from newsfeedback.parsers import anchor_hrefs, available_parsers, default_parser, PARSERS
+
+HOMEPAGE_HTML = """<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE html><html><head><title>Testzeitung</title><a href="/in-head">head</a></head><body>
+<A HREF="/politik/artikel-1.html">1</A>
+<p><a href=/wirtschaft/artikel-2.html>2</p>
+<a href="/kultur/artikel-3.html?seite=2&amp;ansicht=voll">3</a>
+<a name="anker">no href</a>
+<div><a href="https://www.testzeitung.de/sport/artikel-4.html"><span>4</span></a></div>
+<a href="/politik/artikel-1.html">1 again</a>
+<script>var a = '<a href="/in-script">';</script>
+</body></html>"""
+
+
+class TestAnchorHrefs(object):
+    def test_backends_agree(self):
+        """ Asserts that every installed backend finds the same hrefs, in document order. """
+        expected = anchor_hrefs(HOMEPAGE_HTML, 'html.parser')
+        actual = {parser: anchor_hrefs(HOMEPAGE_HTML, parser) for parser in available_parsers()}
+        message = ("The backends found {0}, despite expecting {1} from each.".format(actual, expected))
+        assert len(expected) == 6 and all(hrefs == expected for hrefs in actual.values()), message
+
+    def test_default_and_unknown_parser(self):
+        """ Asserts that lxml's streaming pass is the default where lxml is installed, and that an unknown
+        parser falls back to the default. """
+        actual = anchor_hrefs('<a href="/artikel">x</a>', 'html5lib')
+        message = ("The default parser was {0} and the unknown one found {1}.".format(default_parser(), actual))
+        assert default_parser() == PARSERS[0] and actual == ['/artikel'], message
+
+    def test_missing_document(self):
+        """ Asserts that a failed download raises TypeError, which makes the beautifulsoup pipeline retry with Selenium. """
+        with pytest.raises(TypeError):
+            anchor_hrefs(None)
@@ -0,0 +1,89 @@
+""" Test suite for newsfeedback.politeness
+"""
+import threading, time
+from unittest import mock
+from newsfeedback.httpcache import CachedResponse
+from newsfeedback.main import get_article_metadata_chain_bs_pipeline
+from newsfeedback.politeness import HostRateLimiter, rate_limiter
+from conftest import article_html
+
+
+class TestHostRateLimiter(object):
+    def test_same_host_is_spaced_out(self):
+        """ Asserts that consecutive requests to one host are at least 1/rate seconds apart. """
+        limiter = HostRateLimiter()
+        limiter.configure("https://www.spiegel.de/", rate=20, jitter=0)
+        started = time.monotonic()
+        for number in range(5):
+            with limiter.request(f"https://www.spiegel.de/politik/artikel-{number}"):
+                pass
+        elapsed = time.monotonic() - started
+        message = ("Five requests to the same host took {0:.3f}s, despite expecting at least 0.2s.".format(elapsed))
+        assert elapsed >= 0.2, message
+
+    def test_different_hosts_do_not_wait_for_each_other(self):
+        """ Asserts that a slow rate for one host does not delay requests to another host. """
+        limiter = HostRateLimiter()
+        limiter.configure("https://www.spiegel.de/", rate=1, jitter=0)
+        limiter.configure("https://www.welt.de/", rate=1, jitter=0)
+        limiter.wait("https://www.spiegel.de/a")
+        started = time.monotonic()
+        limiter.wait("https://www.welt.de/a")
+        elapsed = time.monotonic() - started
+        message = ("The first request to welt.de waited {0:.3f}s for spiegel.de.".format(elapsed))
+        assert elapsed < 0.1, message
+
+    def test_concurrent_callers_queue_up(self):
+        """ Asserts that threads hitting the same host at once are given consecutive slots. """
+        limiter = HostRateLimiter()
+        limiter.configure("https://www.welt.de/", rate=20, jitter=0)
+        stamps = []
+        def worker():
+            limiter.wait("https://www.welt.de/a")
+            stamps.append(time.monotonic())
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stamps.sort()
+        gaps = [later - earlier for earlier, later in zip(stamps, stamps[1:])]
+        message = ("Concurrent requests were not spaced out: {0}".format(gaps))
+        assert min(gaps) >= 0.04, message
+
+    def test_unconfigured_host_uses_default(self):
+        """ Asserts that unconfigured hosts are not limited, unless the caller passes a default rate. """
+        limiter = HostRateLimiter()
+        limiter.wait("https://www.faz.net/a")
+        unlimited = limiter.wait("https://www.faz.net/b")
+        limiter.wait("https://www.bild.de/a", 20, 0)
+        limited = limiter.wait("https://www.bild.de/b", 20, 0)
+        message = ("Waited {0:.3f}s without and {1:.3f}s with a default rate.".format(unlimited, limited))
+        assert unlimited == 0 and limited > 0, message
+
+    def test_stats_split_waiting_and_fetching(self):
+        """ Asserts that time spent waiting and fetching is reported per host. """
+        limiter = HostRateLimiter()
+        limiter.configure("https://www.zeit.de/", rate=20, jitter=0)
+        for _ in range(3):
+            with limiter.request("https://www.zeit.de/a"):
+                time.sleep(0.01)
+        stats = limiter.stats()["www.zeit.de"]
+        message = ("Unexpected stats for www.zeit.de: {0}".format(stats))
+        assert stats["requests"] == 3 and stats["waiting"] > 0 and stats["fetching"] >= 0.03, message
+
+    def test_bs_pipeline_is_spaced_out_without_rate_setting(self):
+        """ Asserts that the plain downloads of a beautifulsoup-pipeline site without a rate setting
+        are still spaced out by the polite default rate. """
+        article_url_list = [f"https://www.testzeitung.de/politik/artikel-{number}" for number in range(1, 5)]
+        page = lambda url, **kwargs: CachedResponse(url, 200, article_html(url[26:], int(url[-1])).encode("utf-8"),
+                                                    {"Content-Type": "text/html; charset=utf-8"})
+        with mock.patch("newsfeedback.main.http_cache.get", side_effect=page), \
+             mock.patch("newsfeedback.main.POLITE_RATE", 20), mock.patch("newsfeedback.main.POLITE_JITTER", 0):
+            started = time.monotonic()
+            df = get_article_metadata_chain_bs_pipeline(article_url_list)
+            stats = rate_limiter.stats()["www.testzeitung.de"]
+        actual = (df.shape[0], stats['requests'], stats['waiting'] >= 0.1)
+        expected = (4, 4, True)
+        message = ("Articles, requests and spacing were {0} after {1:.3f}s, despite expecting {2}.".format(actual, time.monotonic() - started, expected))
+        assert actual == expected, message
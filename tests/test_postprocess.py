@@ -0,0 +1,31 @@
+""" Test suite for newsfeedback.postprocess
+"""
+import pandas as pd
+from newsfeedback.postprocess import postprocess_metadata
+
+METADATA_WANTED = ['title', 'url', 'text', 'comments', 'datetime']
+EXTRACTED = [{'title': "Artikel 1", 'url': "https://www.faz.net/artikel-1", 'hostname': "www.faz.net",
+              'text': 'Er sagte: "Nein."\nDas war\'s.', 'comments': "", 'body': "<body/>"},
+             {'title': "Artikel 2", 'url': "https://www.faz.net/artikel-2", 'text': None, 'comments': "Gut.\n"}]
+
+
+class TestPostprocess(object):
+    def test_matches_per_article_processing(self):
+        """ Asserts that the frame-wide pass selects, stamps and escapes exactly like the former per-article code. """
+        actual = postprocess_metadata(pd.DataFrame(EXTRACTED), METADATA_WANTED, datetime="20250101-0600")
+        expected = [["Artikel 1", "https://www.faz.net/artikel-1", '"Er sagte: “Nein.“[¶]Das war’s."', '""', "20250101-0600"],
+                    ["Artikel 2", "https://www.faz.net/artikel-2", None, '"Gut.[¶]"', "20250101-0600"]]
+        message = ("postprocess_metadata() returned {0}, despite expecting {1}.".format(actual.values.tolist(), expected))
+        assert list(actual.columns) == METADATA_WANTED and actual.astype(object).where(actual.notna(), None).values.tolist() == expected, message
+
+    def test_escaping_is_optional(self):
+        """ Asserts that without escaping, text and comments are kept as extracted. """
+        actual = postprocess_metadata(pd.DataFrame(EXTRACTED), METADATA_WANTED, escape=False)
+        message = ("The text was changed to {0}.".format(actual['text'][0]))
+        assert actual['text'][0] == EXTRACTED[0]['text'] and actual['comments'][1] == "Gut.\n", message
+
+    def test_empty_frame(self):
+        """ Asserts that a run without articles still gets the configured columns. """
+        actual = postprocess_metadata(pd.DataFrame([], columns=METADATA_WANTED), METADATA_WANTED)
+        message = ("postprocess_metadata() returned the columns {0}.".format(list(actual.columns)))
+        assert list(actual.columns) == METADATA_WANTED and actual.shape[0] == 0, message
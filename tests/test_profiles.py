@@ -0,0 +1,114 @@
+""" Test suite for newsfeedback.profiles
+"""
+import pytest
+from unittest import mock
+from newsfeedback.drivers import FakeDriver, driver_pool, new_chrome_driver, DEFAULT_POOL_SIZE, DEFAULT_MAX_PAGES
+from newsfeedback.httpcache import CachedResponse
+from newsfeedback.main import get_article_metadata_chain_bs_pipeline, get_article_urls_bs_pipeline
+from newsfeedback.profiles import HostProfiles, LEARN_AFTER, RECHECK_AFTER
+from conftest import article_html
+
+HOMEPAGE_URL = "https://www.testzeitung.de/"
+ARTICLE_URLS = [f"https://www.testzeitung.de/politik/artikel-{number}" for number in range(1, 7)]
+CONSENT_HTML = ('<div id="sp_message_container_1" class="message-overlay">'
+                '<iframe id="sp_message_iframe_1"></iframe><button class="sp_choice_type_11">OK</button></div>')
+
+
+class FakeClock(object):
+    def __init__(self, now=1735725600.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def fake_browser():
+    pages = {url: article_html(url[26:], int(url[-1])).replace("<body>", f"<body>{CONSENT_HTML}") for url in ARTICLE_URLS}
+    pages[HOMEPAGE_URL] = "<html><body>" + "".join(f'<a href="{url[26:]}">Artikel</a>' for url in ARTICLE_URLS) + CONSENT_HTML + "</body></html>"
+    drivers = []
+    driver_pool.configure(size=1, factory=lambda: drivers.append(FakeDriver(pages)) or drivers[-1])
+    with mock.patch("newsfeedback.main.BROWSER_SETTLE_TIME", 0), mock.patch("newsfeedback.main.POLITE_RATE", None):
+        yield drivers
+    driver_pool.shutdown()
+    driver_pool.configure(size=DEFAULT_POOL_SIZE, max_pages=DEFAULT_MAX_PAGES, factory=new_chrome_driver)
+
+
+class TestHostProfiles(object):
+    def test_learned_profiles_are_saved_and_rechecked(self, host_profiles_file, tmp_path):
+        """ Asserts that a site goes straight to the browser only after LEARN_AFTER failed plain downloads in a row,
+        and skips the consent click only after LEARN_AFTER browsers found no banner in a row, that this is saved
+        for later runs, that it is tried out again after RECHECK_AFTER days, and that settings pinned in the
+        defaults are kept. """
+        clock = FakeClock()
+        defaults = tmp_path/"default_host_profiles.yaml"
+        defaults.write_text("'www.spiegel.de':\n  fetch: 'browser'\n", encoding="utf-8")
+        profiles = HostProfiles()
+        profiles.configure(host_profiles_file, defaults, clock=clock)
+        for worked in [False] * (LEARN_AFTER - 1) + [True] + [False] * LEARN_AFTER:
+            learned_too_early = profiles.needs_browser(ARTICLE_URLS[0])
+            profiles.plain_fetch(ARTICLE_URLS[0], worked)
+        for clicked in [False] * (LEARN_AFTER - 1) + [True] + [False] * LEARN_AFTER:
+            consent_too_early = profiles.needs_consent(ARTICLE_URLS[0])
+            profiles.consent_checked(ARTICLE_URLS[0], clicked)
+        profiles.save()
+        later_run = HostProfiles()
+        later_run.configure(host_profiles_file, defaults, clock=clock)
+        actual = [learned_too_early, consent_too_early, later_run.needs_browser(HOMEPAGE_URL), later_run.needs_consent(HOMEPAGE_URL),
+                  later_run.needs_browser("https://www.spiegel.de/"), later_run.needs_browser("https://www.zeit.de/")]
+        clock.now += (RECHECK_AFTER + 1) * 86400
+        actual += [later_run.needs_browser(HOMEPAGE_URL), later_run.needs_consent(HOMEPAGE_URL), later_run.needs_browser("https://www.spiegel.de/")]
+        expected = [False, True, True, False, True, False, False, None, True]
+        message = ("The learned profile answered {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
+
+    def test_plain_downloads_only_work_once_extracted(self, host_profiles_file):
+        """ Asserts that plain downloads from which no metadata could be extracted count as failed, and that
+        a plain download is not learned as working before its extraction says so. """
+        profiles = HostProfiles()
+        profiles.configure(host_profiles_file)
+        for url in ARTICLE_URLS[:LEARN_AFTER]:
+            profiles.plain_download(url, "<html><body><div id='app'></div></body></html>")
+            profiles.extracted(url, False)
+        learned = profiles.needs_browser(HOMEPAGE_URL)
+        profiles.configure(host_profiles_file)
+        profiles.plain_download(ARTICLE_URLS[0], article_html("/politik/artikel-1", 1))
+        unconfirmed = profiles.profile(HOMEPAGE_URL)
+        profiles.extracted(ARTICLE_URLS[0], True)
+        actual = (learned, unconfirmed, profiles.profile(HOMEPAGE_URL).get('fetch'))
+        expected = (True, {}, 'plain')
+        message = ("Learning from extractions gave {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
+
+
+class TestAdaptiveRouting(object):
+    def test_browser_sites_skip_the_plain_download(self, fake_browser):
+        """ Asserts that once the plain downloads of a site's articles keep failing, the remaining articles
+        go straight to the browser, and that the consent banner is clicked once per browser. """
+        with mock.patch("newsfeedback.main.http_cache.get", return_value=CachedResponse(ARTICLE_URLS[0], 403, b"", {})) as plain:
+            df = get_article_metadata_chain_bs_pipeline(ARTICLE_URLS)
+        actual = (plain.call_count, len(fake_browser[0].visited), fake_browser[0].clicks, list(df['title']))
+        expected = (LEARN_AFTER, len(ARTICLE_URLS), 1, [f"Artikel {number}" for number in range(1, 7)])
+        message = ("Plain downloads, browser loads, clicks and titles were {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
+
+    def test_javascript_walls_are_loaded_in_the_browser(self, fake_browser):
+        """ Asserts that articles whose plain download only asks for JavaScript are loaded in the browser
+        and count as failed plain downloads. """
+        wall = CachedResponse(ARTICLE_URLS[0], 200, b"<html><body><p>Bitte JavaScript aktivieren.</p></body></html>",
+                              {"Content-Type": "text/html; charset=utf-8"})
+        with mock.patch("newsfeedback.main.http_cache.get", return_value=wall) as plain:
+            df = get_article_metadata_chain_bs_pipeline(ARTICLE_URLS)
+        actual = (plain.call_count, len(fake_browser[0].visited), list(df['title']))
+        expected = (LEARN_AFTER, len(ARTICLE_URLS), [f"Artikel {number}" for number in range(1, 7)])
+        message = ("Plain downloads, browser loads and titles were {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
+
+    def test_homepages_without_links_are_loaded_in_the_browser(self, fake_browser):
+        """ Asserts that a homepage whose plain download holds no links is loaded in the browser instead. """
+        script_only = CachedResponse(HOMEPAGE_URL, 200, b"<html><body><noscript>Please enable JavaScript.</noscript></body></html>",
+                                     {"Content-Type": "text/html; charset=utf-8"})
+        with mock.patch("newsfeedback.main.http_cache.get", return_value=script_only):
+            article_url_list = get_article_urls_bs_pipeline(HOMEPAGE_URL)
+        message = ("The homepage gave {0}, despite expecting the links of the browser's page.".format(article_url_list))
+        assert article_url_list == ARTICLE_URLS, message
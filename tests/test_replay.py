@@ -0,0 +1,76 @@
+""" Test suite for newsfeedback.replay
+"""
+import pandas as pd
+import pytest
+from unittest import mock
+from newsfeedback.drivers import FakeDriver, driver_pool, new_chrome_driver, DEFAULT_POOL_SIZE, DEFAULT_MAX_PAGES
+from newsfeedback.httpcache import CachedResponse
+from newsfeedback.main import get_pipeline_from_config, retrieve_config, configure_recording
+from newsfeedback.politeness import rate_limiter
+from newsfeedback.replay import Recording, recording
+from conftest import article_html
+
+HOMEPAGE_URL = "https://www.testzeitung.de/"
+ARTICLE_URLS = [f"https://www.testzeitung.de/politik/artikel-{number}" for number in (1, 2, 3)]
+CONSENT_HTML = ('<div id="sp_message_container_1" class="message-overlay">'
+                '<iframe id="sp_message_iframe_1"></iframe><button class="sp_choice_type_11">OK</button></div>')
+HOMEPAGE_HTML = "<html><body>" + "".join(f'<a href="{url[27:]}">Artikel</a>' for url in ARTICLE_URLS) + "</body></html>"
+
+
+def online_response(url, **kwargs):
+    if url == HOMEPAGE_URL:
+        return CachedResponse(url, 200, HOMEPAGE_HTML.encode("utf-8"), {"Content-Type": "text/html; charset=utf-8"})
+    if url == ARTICLE_URLS[1]: # only loads in the browser
+        return CachedResponse(url, 403, b"", {})
+    return CachedResponse(url, 200, article_html(url[26:], int(url[-1])).encode("utf-8"), {"Content-Type": "text/html; charset=utf-8"})
+
+
+@pytest.fixture
+def offline_setup():
+    homepage_config = {HOMEPAGE_URL: {'pipeline': 'beautifulsoup', 'filter': 'off'}}
+    with mock.patch("newsfeedback.main.retrieve_config",
+                    side_effect=lambda type_config, *args: homepage_config if type_config == 'homepage' else retrieve_config(type_config, *args)), \
+         mock.patch("newsfeedback.main.BROWSER_SETTLE_TIME", 0), \
+         mock.patch("newsfeedback.main.POLITE_RATE", None):
+        yield
+    recording.configure()
+    rate_limiter.enabled = True
+    driver_pool.configure(size=DEFAULT_POOL_SIZE, max_pages=DEFAULT_MAX_PAGES, factory=new_chrome_driver)
+
+
+class TestRecording(object):
+    def test_round_trip(self, tmp_path):
+        """ Asserts that recorded responses and browser pages are replayed as they were, and unrecorded URLs as not found. """
+        recorder = Recording()
+        recorder.configure(tmp_path, 'record')
+        recorder.record_response("https://www.faz.net/", CachedResponse("https://www.faz.net/", 200, "Grüße".encode("utf-8"),
+                                                                        {"Content-Type": "text/html; charset=utf-8"}))
+        recorder.record_page("https://www.faz.net/", "<html>im Browser</html>")
+        recorder.configure(tmp_path, 'replay')
+        response = recorder.replay_response("https://www.faz.net/")
+        missing = recorder.replay_response("https://www.faz.net/fehlt")
+        actual = (response.status_code, response.text, recorder.replay_page("https://www.faz.net/"), missing.status_code)
+        expected = (200, "Grüße", "<html>im Browser</html>", 404)
+        message = ("The recording replayed {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected and recorder.missing == 1, message
+
+
+class TestReplay(object):
+    def test_pipeline_runs_offline(self, tmp_path, offline_setup):
+        """ Asserts that a recorded run of get_pipeline_from_config, including an article only a browser could load,
+        can be repeated from the recording without any download or browser. """
+        driver_pool.configure(size=1, factory=lambda: FakeDriver({ARTICLE_URLS[1]: article_html("/politik/artikel-2", 2).replace("<body>", f"<body>{CONSENT_HTML}")}))
+        configure_recording(record_folder=tmp_path/"recording")
+        with mock.patch("newsfeedback.main.http_cache.get", side_effect=online_response):
+            recorded = pd.read_csv(get_pipeline_from_config(HOMEPAGE_URL, tmp_path/"recorded"))
+        configure_recording(replay_folder=tmp_path/"recording")
+        with mock.patch("newsfeedback.main.http_cache.get", side_effect=AssertionError("went online")), \
+             mock.patch("newsfeedback.drivers.new_chrome_driver", side_effect=AssertionError("started Chrome")):
+            replayed = pd.read_csv(get_pipeline_from_config(HOMEPAGE_URL, tmp_path/"replayed"))
+        message = ("The replay returned the titles {0}, despite recording {1}.".format(list(replayed['title']), list(recorded['title'])))
+        assert recorded.shape[0] == 3 and recorded.drop(columns='datetime').equals(replayed.drop(columns='datetime')), message
+
+    def test_record_and_replay_exclude_each_other(self, tmp_path):
+        """ Asserts that recording and replaying at the same time is refused. """
+        with pytest.raises(Exception, match="cannot be combined"):
+            configure_recording(tmp_path, tmp_path)
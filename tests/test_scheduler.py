@@ -0,0 +1,99 @@
+""" Test suite for newsfeedback.scheduler
+"""
+import os, time
+import pytest
+from unittest import mock
+from newsfeedback.main import homepage_intervals
+from newsfeedback.scheduler import Scheduler, next_slot
+
+HOURLY_URL = "https://www.tagesschau.de/"
+DAILY_URL = "https://www.zeit.de/"
+
+
+def local_time(hour, minute=0, day=1):
+    return time.mktime((2025, 1, day, hour, minute, 0, 0, 0, -1))
+
+
+@pytest.fixture
+def berlin_time():
+    timezone = os.environ.get('TZ')
+    os.environ['TZ'] = 'Europe/Berlin'
+    time.tzset()
+    yield
+    if timezone is None:
+        del os.environ['TZ']
+    else:
+        os.environ['TZ'] = timezone
+    time.tzset()
+
+
+class FakeClock(object):
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestNextSlot(object):
+    def test_slots_follow_the_clock(self):
+        """ Asserts that slots fall on whole multiples of the interval since midnight. """
+        actual = [next_slot(6, local_time(7, 30)), next_slot(1, local_time(7, 30)), next_slot(24, local_time(7, 30)), next_slot(6, local_time(12))]
+        expected = [local_time(12), local_time(8), local_time(0, day=2), local_time(18)]
+        message = ("The next slots were {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
+
+    def test_slots_follow_the_clock_in_summer_time(self, berlin_time):
+        """ Asserts that slots stay on the wall clock in summer time and on the days summer time starts and ends. """
+        local = lambda timestamp: time.strftime(r"%m-%d %H:%M", time.localtime(timestamp))
+        summer = time.mktime((2025, 7, 1, 7, 30, 0, 0, 0, -1))
+        spring_forward = time.mktime((2025, 3, 30, 1, 0, 0, 0, 0, -1))
+        fall_back = time.mktime((2025, 10, 26, 1, 0, 0, 0, 0, -1))
+        actual = [local(next_slot(6, summer)), local(next_slot(24, summer)), local(next_slot(6, spring_forward)),
+                  local(next_slot(1, spring_forward)), local(next_slot(6, fall_back)), local(next_slot(24, fall_back))]
+        expected = ["07-01 12:00", "07-02 00:00", "03-30 06:00", "03-30 03:00", "10-26 06:00", "10-27 00:00"]
+        message = ("The next slots were {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
+
+
+class TestScheduler(object):
+    def test_homepages_keep_their_own_intervals(self):
+        """ Asserts that every homepage is collected right away and then at the slots of its own interval. """
+        clock = FakeClock(local_time(7, 30))
+        runs = []
+        scheduler = Scheduler(runs.append, lambda: {HOURLY_URL: 1, DAILY_URL: 24}, clock=clock)
+        scheduler.run_pending()
+        for now in (local_time(7, 59), local_time(8), local_time(9), local_time(0, day=2)):
+            clock.now = now
+            scheduler.run_pending()
+        expected = [[HOURLY_URL, DAILY_URL], [HOURLY_URL], [HOURLY_URL], [HOURLY_URL, DAILY_URL]]
+        message = ("The scheduler ran {0}, despite expecting {1}.".format(runs, expected))
+        assert runs == expected, message
+        clock.now = local_time(0, 15, day=2)
+        message = ("The scheduler would sleep {0}s, despite expecting 45 minutes.".format(scheduler.seconds_until_next()))
+        assert scheduler.seconds_until_next() == 45 * 60, message
+
+    def test_overlapping_runs_are_coalesced_or_skipped(self):
+        """ Asserts that slots missed during a long run lead to a single run right after it with catch-up,
+        and to waiting for the next slot with skip. """
+        due = {}
+        for missed_runs in ('catch-up', 'skip'):
+            clock = FakeClock(local_time(8))
+            def long_run(homepage_url_list):
+                clock.now += 2.5 * 3600
+            scheduler = Scheduler(long_run, lambda: {HOURLY_URL: 1}, missed_runs, clock=clock)
+            scheduler.run_pending()
+            due[missed_runs] = scheduler.due[HOURLY_URL][1]
+        expected = {'catch-up': local_time(10, 30), 'skip': local_time(11)}
+        message = ("The next runs were due at {0}, despite expecting {1}.".format(due, expected))
+        assert due == expected, message
+
+    def test_intervals_come_from_the_homepage_config(self):
+        """ Asserts that a homepage's interval setting overrides the default, unless it is not a positive number. """
+        homepage_config = {HOURLY_URL: {'pipeline': 'trafilatura', 'interval': 1}, DAILY_URL: {'pipeline': 'trafilatura', 'interval': 24},
+                           "https://www.welt.de/": {'pipeline': 'trafilatura'}, "https://www.faz.net/": {'pipeline': 'trafilatura', 'interval': 0}}
+        with mock.patch("newsfeedback.main.retrieve_config", return_value=homepage_config):
+            actual = homepage_intervals(6)
+        expected = {HOURLY_URL: 1, DAILY_URL: 24, "https://www.welt.de/": 6, "https://www.faz.net/": 6}
+        message = ("The intervals were {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
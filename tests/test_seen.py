@@ -0,0 +1,67 @@
+""" Test suite for newsfeedback.seen
+"""
+import pytest, time
+from unittest import mock
+from newsfeedback.seen import SeenIndex, SEEN_INDEX_NAME
+from newsfeedback.main import chained_trafilatura_pipeline, export_metadata
+
+
+class TestSeenIndex(object):
+    def test_split_skips_marked_urls(self, tmp_path):
+        """ Asserts that URLs marked as extracted are skipped, while unknown URLs are kept. """
+        seen_index = SeenIndex(tmp_path/SEEN_INDEX_NAME)
+        seen_index.mark(["https://www.welt.de/a", "https://www.welt.de/b"])
+        new_url_list, skipped_url_list = seen_index.split(["https://www.welt.de/a", "https://www.welt.de/c", "https://www.welt.de/b"])
+        message = ("split() returned {0} as new and {1} as skipped.".format(new_url_list, skipped_url_list))
+        assert new_url_list == ["https://www.welt.de/c"] and skipped_url_list == ["https://www.welt.de/a", "https://www.welt.de/b"], message
+
+    def test_index_persists_between_runs(self, tmp_path):
+        """ Asserts that the index is read back from disk by a later run. """
+        seen_index = SeenIndex(tmp_path/SEEN_INDEX_NAME)
+        seen_index.mark(["https://www.welt.de/a"])
+        seen_index.close()
+        reopened = SeenIndex(tmp_path/SEEN_INDEX_NAME)
+        new_url_list, _ = reopened.split(["https://www.welt.de/a"])
+        message = ("The URL marked in an earlier run was not skipped.")
+        assert new_url_list == [] and len(reopened) == 1, message
+
+    def test_refetch_after(self, tmp_path):
+        """ Asserts that URLs last fetched longer ago than refetch_after hours count as new again. """
+        seen_index = SeenIndex(tmp_path/SEEN_INDEX_NAME)
+        seen_index.mark(["https://www.welt.de/old", "https://www.welt.de/recent"])
+        with seen_index._connection:
+            seen_index._connection.execute("UPDATE seen SET last_fetched = ? WHERE url = ?", (time.time() - 7200, "https://www.welt.de/old"))
+        new_url_list, skipped_url_list = seen_index.split(["https://www.welt.de/old", "https://www.welt.de/recent"], refetch_after=1)
+        message = ("split() returned {0} as new and {1} as skipped.".format(new_url_list, skipped_url_list))
+        assert new_url_list == ["https://www.welt.de/old"] and skipped_url_list == ["https://www.welt.de/recent"], message
+
+    def test_chained_pipeline_skips_seen_articles(self, tmp_path, stand_in_server):
+        """ Asserts that a second run with skip_seen does not download the articles of the first run again. """
+        article_url_list = stand_in_server.article_urls(3)
+        output_folder = tmp_path/"newsfeedback"
+        output_folder.mkdir()
+        with mock.patch("newsfeedback.main.get_article_urls_trafilatura_pipeline", return_value=article_url_list):
+            chained_trafilatura_pipeline(stand_in_server.url, 'off', output_folder, skip_seen=True)
+            first_run = len(stand_in_server.requests)
+            chained_trafilatura_pipeline(stand_in_server.url, 'off', output_folder, skip_seen=True)
+            second_run = len(stand_in_server.requests) - first_run
+        message = ("The first run downloaded {0} and the second run {1} articles.".format(first_run, second_run))
+        assert first_run == 3 and second_run == 0, message
+
+    def test_urls_count_as_seen_once_the_export_is_complete(self, tmp_path):
+        """ Asserts that the articles of an interrupted export are not marked as seen, so that the next run
+        collects them again, and that those of a finished export are. """
+        def rows(fail):
+            yield "https://www.welt.de/a", {'title': "A", 'url': "https://www.welt.de/a"}
+            if fail:
+                raise RuntimeError("The run was interrupted.")
+            yield "https://www.welt.de/b", {'title': "B", 'url': "https://www.welt.de/b"}
+        seen_index = SeenIndex(tmp_path/SEEN_INDEX_NAME)
+        with pytest.raises(RuntimeError):
+            export_metadata(rows(True), "https://www.welt.de/", tmp_path, ['title', 'url', 'datetime'], seen_index=seen_index)
+        interrupted = len(seen_index)
+        export_metadata(rows(False), "https://www.welt.de/", tmp_path, ['title', 'url', 'datetime'], seen_index=seen_index)
+        actual = (interrupted, seen_index.split(["https://www.welt.de/a", "https://www.welt.de/b"])[1])
+        expected = (0, ["https://www.welt.de/a", "https://www.welt.de/b"])
+        message = ("The seen index held {0} URLs after the interrupted and {1} after the finished export.".format(*actual))
+        assert actual == expected, message
@@ -0,0 +1,38 @@
+""" Test suite for newsfeedback.sessions
+"""
+from newsfeedback.drivers import USER_AGENT
+from newsfeedback.sessions import new_session, get_session, configure_session, DEFAULT_CONNECTIONS_PER_HOST
+
+
+class TestSession(object):
+    def test_session_reuses_connections(self, stand_in_server):
+        """ Asserts that consecutive downloads from one host share a keep-alive connection. """
+        session = new_session()
+        for article_url in stand_in_server.article_urls(5):
+            session.get(article_url, timeout=5).close()
+        message = ("Five downloads opened {0} connections.".format(len(stand_in_server.connections)))
+        assert len(stand_in_server.connections) == 1, message
+
+    def test_session_sends_browser_user_agent(self, stand_in_server):
+        """ Asserts that the session identifies itself with the user agent of the Chrome options. """
+        new_session().get(stand_in_server.article_urls(1)[0], timeout=5)
+        sent = stand_in_server.requests[-1][1].get("User-Agent")
+        message = ("The session sent the user agent {0}.".format(sent))
+        assert sent == USER_AGENT, message
+
+    def test_session_retries_server_errors(self, stand_in_server):
+        """ Asserts that a 503 is retried and the following answer is returned. """
+        answers = [(503, {"Content-Type": "text/plain"}, b"busy"), (200, {"Content-Type": "text/plain"}, b"ok")]
+        stand_in_server.pages["/startseite"] = lambda path, headers: answers.pop(0)
+        response = new_session(retries=2, backoff=0).get(f"{stand_in_server.url}/startseite", timeout=5)
+        message = ("The retried download returned status {0}.".format(response.status_code))
+        assert response.status_code == 200 and response.content == b"ok", message
+
+    def test_configure_session_replaces_shared_session(self):
+        """ Asserts that reconfiguring the shared session hands out a new one with the new settings. """
+        before = get_session()
+        configure_session(connections_per_host=2)
+        after = get_session()
+        configure_session(connections_per_host=DEFAULT_CONNECTIONS_PER_HOST)
+        message = ("The shared session was not replaced after reconfiguring it.")
+        assert before is not after and after.get_adapter("https://www.spiegel.de/")._pool_maxsize == 2, message
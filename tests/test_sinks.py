@@ -0,0 +1,90 @@
+""" Test suite for newsfeedback.sinks
+"""
+import pandas as pd
+import pytest
+from unittest import mock
+from newsfeedback.sinks import open_sink
+from newsfeedback.main import chained_trafilatura_pipeline, export_dataframe, export_metadata
+
+COLUMNS = ['title', 'url', 'tags', 'datetime']
+
+
+def rows(count):
+    return [{'title': f"Artikel {number}", 'url': f"https://www.testzeitung.de/artikel-{number}", 'tags': ['a', 'b'],
+             'datetime': "20250101-1000"} for number in range(count)]
+
+
+class TestSinks(object):
+    def test_csv_sink_matches_to_csv(self, tmp_path):
+        """ Asserts that rows written in batches give the same CSV as writing the whole dataframe at once. """
+        with open_sink(tmp_path/"export", COLUMNS, 'csv', batch_size=3) as sink:
+            sink.write_many(rows(10))
+        pd.DataFrame(rows(10), columns=COLUMNS).to_csv(tmp_path/"expected.csv", index=False)
+        message = ("The streamed CSV differs from pandas' own export.")
+        assert sink.path.read_text() == (tmp_path/"expected.csv").read_text(), message
+
+    def test_rows_are_flushed_in_batches(self, tmp_path):
+        """ Asserts that full batches are on disk in the .part file before the export is finished,
+        and that the final file only appears once it is. """
+        sink = open_sink(tmp_path/"export", COLUMNS, 'csv', batch_size=4)
+        sink.write_many(rows(9))
+        written = pd.read_csv(sink.part_path).shape[0]
+        final_existed = sink.path.exists()
+        sink.close()
+        message = ("{0} rows were on disk before closing, the final file existed: {1}.".format(written, final_existed))
+        assert written == 8 and not final_existed and pd.read_csv(sink.path).shape[0] == 9, message
+
+    def test_interrupted_export_keeps_rows(self, tmp_path):
+        """ Asserts that rows extracted before a crash are kept in the .part file instead of being lost. """
+        def crashing_rows():
+            yield from rows(5)
+            raise RuntimeError("The browser crashed.")
+        with pytest.raises(RuntimeError):
+            with open_sink(tmp_path/"export", COLUMNS, 'csv', batch_size=2) as sink:
+                sink.write_many(crashing_rows())
+        message = ("The interrupted export did not keep its 5 rows in the .part file.")
+        assert not sink.path.exists() and pd.read_csv(sink.part_path).shape[0] == 5, message
+
+    def test_parquet_sink(self, tmp_path):
+        """ Asserts that the Parquet export holds every row, with tags as lists. """
+        pytest.importorskip("pyarrow")
+        with open_sink(tmp_path/"export", COLUMNS, 'parquet', batch_size=3) as sink:
+            sink.write_many(rows(7) + [{'title': None, 'url': "https://www.testzeitung.de/ohne-titel"}])
+        df = pd.read_parquet(sink.path)
+        message = ("The Parquet export holds {0} rows and the tags {1}.".format(df.shape[0], df['tags'][0]))
+        assert df.shape[0] == 8 and list(df['tags'][0]) == ['a', 'b'] and df['title'].isna().sum() == 1, message
+
+    def test_exports_within_a_minute_get_own_files(self, tmp_path):
+        """ Asserts that a second export of the same homepage within the same minute does not replace the first. """
+        df = pd.DataFrame(rows(2), columns=COLUMNS)
+        first = export_dataframe(df, "https://www.testzeitung.de/", tmp_path)
+        second = export_dataframe(df, "https://www.testzeitung.de/", tmp_path)
+        message = ("Both exports were written to {0}.".format(first))
+        assert first != second and first.exists() and second.exists(), message
+
+    def test_chained_pipeline_streams_into_parquet(self, tmp_path, stand_in_server):
+        """ Asserts that the chained pipeline writes the extracted articles into a Parquet file, in URL order. """
+        pytest.importorskip("pyarrow")
+        article_url_list = stand_in_server.article_urls(5)
+        with mock.patch("newsfeedback.main.get_article_urls_trafilatura_pipeline", return_value=article_url_list):
+            df_path = chained_trafilatura_pipeline("https://www.testzeitung.de/", 'off', tmp_path, workers=3, output_format='parquet')
+        actual = list(pd.read_parquet(df_path)['title'])
+        message = ("The Parquet export holds the titles {0}.".format(actual))
+        assert df_path.suffix == ".parquet" and actual == [f"Artikel {number}" for number in range(1, 6)], message
+
+    def test_escaping_can_be_chosen(self, tmp_path):
+        """ Asserts that CSV exports escape quotes and line breaks in the text by default, as before, and that
+        --escape and --no-escape override this for CSV and Parquet alike. """
+        pytest.importorskip("pyarrow")
+        text = 'Er sagte: "Ja."\nDann ging er.'
+        articles = lambda: [("https://www.testzeitung.de/artikel-1", {'title': "Artikel 1", 'text': text})]
+        exported = {}
+        for output_format, escape in [('csv', None), ('csv', True), ('csv', False), ('parquet', None), ('parquet', True)]:
+            df_path = export_metadata(articles(), "https://www.testzeitung.de/", tmp_path/f"{output_format}-{escape}",
+                                      ['title', 'text', 'datetime'], output_format, escape=escape)
+            df = pd.read_csv(df_path) if output_format == 'csv' else pd.read_parquet(df_path)
+            exported[(output_format, escape)] = df['text'][0]
+        escaped = '"Er sagte: “Ja.“[¶]Dann ging er."'
+        expected = {('csv', None): escaped, ('csv', True): escaped, ('csv', False): text, ('parquet', None): text, ('parquet', True): escaped}
+        message = ("The exports hold the texts {0}, despite expecting {1}.".format(exported, expected))
+        assert exported == expected, message
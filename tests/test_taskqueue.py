@@ -0,0 +1,111 @@
+""" Test suite for newsfeedback.taskqueue
+"""
+import pandas as pd
+import pytest
+from unittest import mock
+from newsfeedback.drivers import FakeDriver, driver_pool, browser_required, new_chrome_driver, DEFAULT_POOL_SIZE, DEFAULT_MAX_PAGES
+from newsfeedback.httpcache import CachedResponse
+from newsfeedback.main import enqueue_run, get_pipeline_from_config, retrieve_config, work_on_queue
+from newsfeedback.taskqueue import TaskQueue
+from conftest import article_html
+
+HOMEPAGE_URL = "https://www.testzeitung.de/"
+ARTICLE_URLS = [f"https://www.testzeitung.de/politik/artikel-{number}" for number in (1, 2, 3)]
+CONSENT_HTML = ('<div id="sp_message_container_1" class="message-overlay">'
+                '<iframe id="sp_message_iframe_1"></iframe><button class="sp_choice_type_11">OK</button></div>')
+HOMEPAGE_HTML = "<html><body>" + "".join(f'<a href="{url[27:]}">Artikel</a>' for url in ARTICLE_URLS) + "</body></html>"
+
+
+def online_response(url, **kwargs):
+    if url == HOMEPAGE_URL:
+        return CachedResponse(url, 200, HOMEPAGE_HTML.encode("utf-8"), {"Content-Type": "text/html; charset=utf-8"})
+    if url == ARTICLE_URLS[1]: # only loads in the browser
+        return CachedResponse(url, 403, b"", {})
+    return CachedResponse(url, 200, article_html(url[26:], int(url[-1])).encode("utf-8"), {"Content-Type": "text/html; charset=utf-8"})
+
+
+class FakeClock(object):
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def offline_setup():
+    homepage_config = {HOMEPAGE_URL: {'pipeline': 'beautifulsoup', 'filter': 'off'}}
+    with mock.patch("newsfeedback.main.retrieve_config",
+                    side_effect=lambda type_config, *args: homepage_config if type_config == 'homepage' else retrieve_config(type_config, *args)), \
+         mock.patch("newsfeedback.main.BROWSER_SETTLE_TIME", 0), \
+         mock.patch("newsfeedback.main.POLITE_RATE", None), \
+         mock.patch("newsfeedback.main.http_cache.get", side_effect=online_response):
+        yield
+    driver_pool.shutdown()
+    driver_pool.configure(size=DEFAULT_POOL_SIZE, max_pages=DEFAULT_MAX_PAGES, factory=new_chrome_driver)
+
+
+class TestTaskQueue(object):
+    def test_tasks_are_claimed_once(self, tmp_path):
+        """ Asserts that a task added twice is queued once, that no two workers hold it at the same time,
+        and that a worker whose lease expired can no longer complete it. """
+        clock = FakeClock()
+        first, second = TaskQueue(tmp_path/"queue.sqlite", lease=60, clock=clock), TaskQueue(tmp_path/"queue.sqlite", lease=60, clock=clock)
+        first.add("run", 'homepage', HOMEPAGE_URL)
+        second.add("run", 'homepage', HOMEPAGE_URL)
+        task = first.claim("first")
+        message = ("A second worker got {0} while the first still held it.".format(second.claim("second")))
+        assert task is not None and second.claim("second") is None, message
+        clock.now += 61
+        taken_over = second.claim("second")
+        actual = (taken_over.id == task.id, first.complete(task, 1), second.complete(taken_over, 2), first.counts())
+        expected = (True, False, True, {'done': 1})
+        message = ("Taking over an expired task gave {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
+
+    def test_browser_tasks_wait_for_browser_workers(self, tmp_path):
+        """ Asserts that a task handed back as needing a browser is only claimed by a worker with one, and that the
+        homepage's merge only becomes available once its articles are finished. """
+        task_queue = TaskQueue(tmp_path/"queue.sqlite")
+        task_queue.add_many([("run", 'article', HOMEPAGE_URL, url, position, {}, False) for position, url in enumerate(ARTICLE_URLS)]
+                            + [("run", 'merge', HOMEPAGE_URL, '', 0, {}, False)])
+        claimed = []
+        while True:
+            task = task_queue.claim("plain")
+            if task is None:
+                break
+            claimed.append(task.article_url)
+            if task.article_url == ARTICLE_URLS[1]:
+                task_queue.require_browser(task)
+            else:
+                task_queue.complete(task, {'title': task.article_url[-9:]})
+        message = ("A worker without a browser claimed {0}.".format(claimed))
+        assert claimed == [ARTICLE_URLS[0], ARTICLE_URLS[1], ARTICLE_URLS[2]], message
+        task = task_queue.claim("browser", browser=True)
+        task_queue.complete(task, {'title': task.article_url[-9:]})
+        merge = task_queue.claim("browser", browser=True)
+        actual = (task.article_url, merge.kind, [result['title'] for _, result in task_queue.results("run", HOMEPAGE_URL)])
+        expected = (ARTICLE_URLS[1], 'merge', ['artikel-1', 'artikel-2', 'artikel-3'])
+        message = ("The browser worker got {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
+
+
+class TestWorkers(object):
+    def test_workers_match_chained_pipeline(self, tmp_path, offline_setup):
+        """ Asserts that a queued run, collected by a worker without a browser and then by one with a browser,
+        ends up in the same per-homepage file as the chained pipeline. """
+        driver_pool.configure(size=1, factory=lambda: FakeDriver({ARTICLE_URLS[1]: article_html("/politik/artikel-2", 2).replace("<body>", f"<body>{CONSENT_HTML}")}))
+        expected = pd.read_csv(get_pipeline_from_config(HOMEPAGE_URL, tmp_path/"chained"))
+        browser_factory = driver_pool.factory
+        task_queue = TaskQueue(tmp_path/"queue.sqlite")
+        enqueue_run(task_queue, [HOMEPAGE_URL], tmp_path/"queued")
+        driver_pool.configure(factory=browser_required)
+        work_on_queue(task_queue, browser=False, exit_when_empty=True, owner="plain")
+        message = ("The worker without a browser left {0} on the queue.".format(task_queue.counts()))
+        assert task_queue.counts() == {'done': 3, 'pending': 2}, message
+        driver_pool.configure(factory=browser_factory)
+        work_on_queue(task_queue, browser=True, exit_when_empty=True, owner="browser")
+        merge = [path for path in (tmp_path/"queued").rglob("*.csv")]
+        actual = pd.read_csv(merge[0])
+        message = ("The workers collected the titles {0}, despite expecting {1}.".format(list(actual['title']), list(expected['title'])))
+        assert len(merge) == 1 and actual.drop(columns='datetime').equals(expected.drop(columns='datetime')), message
@@ -0,0 +1,62 @@
+""" Test suite for newsfeedback.urls
+"""
+from bs4 import BeautifulSoup
+from newsfeedback.urls import LinkNormalizer, canonical_url, unique_urls
+
+HOMEPAGE_HTML = """<html><body><header><a href="/">FAZ</a></header>
+<a href="/aktuell/politik/inland/artikel-1.html">1</a>
+<a href="https://www.faz.net/aktuell/wirtschaft/artikel-2.html">2</a>
+<a href="//www.faz.net/aktuell/sport/artikel-3.html">3</a>
+<a href="aktuell/feuilleton/artikel-4.html">4</a>
+<a href="/aktuell/politik/inland/artikel-1.html">1 again</a>
+<a href="https://www.faz.net/aktuell/politik/inland/artikel-1.html">1 once more</a>
+<a href="https://www.spiegel.de/politik/artikel-5.html">elsewhere</a>
+<a href="/aktuell/wissen/">Wissen</a>
+<a>no link</a>
+</body></html>"""
+
+
+def hrefs_of(html):
+    return [a.get('href') for a in BeautifulSoup(html, 'html.parser').find_all('a', href=True)]
+
+
+class TestLinkNormalizer(object):
+    def test_same_links_as_before(self):
+        """ Asserts that the links of a homepage are the ones the former per-anchor regexes found. """
+        actual = LinkNormalizer("https://www.faz.net/").links(hrefs_of(HOMEPAGE_HTML))
+        expected = ['https://www.faz.net/aktuell/politik/inland/artikel-1.html', 'https://www.faz.net/aktuell/wirtschaft/artikel-2.html',
+                    'https://www.faz.net/aktuell/sport/artikel-3.html', 'https://www.faz.net/aktuell/feuilleton/artikel-4.html',
+                    'https://www.faz.net/aktuell/wissen/']
+        message = ("LinkNormalizer.links() returned {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
+
+    def test_language_homepage(self):
+        """ Asserts that links of a /de/ homepage are resolved without doubling the language, and that
+        absolute links below it are kept while other languages are not. """
+        actual = LinkNormalizer("https://www.dw.com/de/").links(["/de/themen/artikel-6", "https://www.dw.com/de/artikel-7",
+                                                                 "https://www.dw.com/en/article-8", "themen/artikel-9"])
+        expected = ['https://www.dw.com/de/themen/artikel-6', 'https://www.dw.com/de/artikel-7', 'https://www.dw.com/de/themen/artikel-9']
+        message = ("LinkNormalizer.links() returned {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
+
+    def test_tracking_fragments_and_junk(self):
+        """ Asserts that tracking parameters and fragments are stripped before deduplicating, and that
+        the homepage itself, anchors, mail and JavaScript links are dropped. """
+        hrefs = ["/politik/artikel-1.html?utm_source=homepage&utm_medium=teaser", "/politik/artikel-1.html#kommentare",
+                 "/suche?q=klima&wt_mc=newsletter", "#top", "/", "javascript:void(0)", "mailto:leser@faz.net", "tel:+49123"]
+        actual = LinkNormalizer("https://www.faz.net/").links(hrefs)
+        expected = ['https://www.faz.net/politik/artikel-1.html', 'https://www.faz.net/suche?q=klima']
+        message = ("LinkNormalizer.links() returned {0}, despite expecting {1}.".format(actual, expected))
+        assert actual == expected, message
+
+
+class TestCanonicalUrl(object):
+    def test_dedup_keys(self):
+        """ Asserts that variants of the same article share a dedup key and keep the first spelling. """
+        variants = ["https://www.faz.net/artikel?a=1&b=2", "http://faz.net/artikel/?b=2&a=1#x",
+                    "HTTPS://WWW.FAZ.NET:443/artikel?a=1&utm_campaign=y&b=2"]
+        keys = {canonical_url(url) for url in variants}
+        actual = unique_urls(variants + ["https://www.faz.net/anderer-artikel", None, "mailto:leser@faz.net"])
+        expected = ["https://www.faz.net/artikel?a=1&b=2", "https://www.faz.net/anderer-artikel"]
+        message = ("unique_urls() returned {0} with the keys {1}, despite expecting {2}.".format(actual, keys, expected))
+        assert len(keys) == 1 and actual == expected, message